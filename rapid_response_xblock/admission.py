@@ -0,0 +1,187 @@
+"""
+Admission control for the staff handlers which aggregate the submissions of a problem.
+
+When the database is slow during a large session, polls from instructors' browsers pile up and each one
+adds another aggregate query. Each process only runs a limited number of these handlers at once, and every
+process together only runs a limited number for any one problem. A request which isn't admitted gets the last
+payload this process computed for the same request, marked as stale with a hint of when to try again, instead of
+adding to the load. The open status in a stale payload is always replaced with the current one.
+"""
+from contextlib import contextmanager
+from functools import wraps
+import json
+import threading
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.core.cache import cache
+from webob.response import Response
+
+from rapid_response_xblock.caches import get_open_run, make_cache_key
+
+
+LAST_GOOD_PAYLOAD_CACHE_SIZE = 512
+
+
+class AdmissionController:
+    """
+    Refuses new aggregate computations past the limits set with RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES,
+    which is counted for this process, and RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES_PER_PROBLEM, which is
+    counted in the shared cache for every process. The shared counts expire once no computation has started for
+    RAPID_RESPONSE_AGGREGATE_SLOT_SECONDS, so that the slots of a process which died are given back.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+
+    @staticmethod
+    def _acquire_shared(key):
+        """Take one of the slots for a key which are shared by every process, if there is one left"""
+        cache_key = make_cache_key('aggregate_slots', key)
+        timeout = settings.RAPID_RESPONSE_AGGREGATE_SLOT_SECONDS
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:
+            # Nothing is running for the key, or the count expired
+            count = 1 if cache.add(cache_key, 1, timeout) else cache.incr(cache_key)
+        if count > settings.RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES_PER_PROBLEM:
+            AdmissionController._release_shared(key)
+            return False
+        cache.touch(cache_key, timeout)
+        return True
+
+    @staticmethod
+    def _release_shared(key):
+        """Give back a slot taken with _acquire_shared"""
+        try:
+            cache.decr(make_cache_key('aggregate_slots', key))
+        except ValueError:
+            # The count expired while the computation was running
+            pass
+
+    def try_acquire(self, key):
+        """
+        Start a computation if there is room for it
+
+        Args:
+            key (str): Identifies what the computation is for, e.g. a problem
+
+        Returns:
+            bool: True if the computation may run, in which case release must be called once it's done
+        """
+        with self._lock:
+            if self._active >= settings.RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES:
+                return False
+            self._active += 1
+        if self._acquire_shared(key):
+            return True
+        with self._lock:
+            self._active -= 1
+        return False
+
+    def release(self, key):
+        """
+        Finish a computation which was started with try_acquire
+
+        Args:
+            key (str): The key passed to try_acquire
+        """
+        self._release_shared(key)
+        with self._lock:
+            self._active -= 1
+
+    @contextmanager
+    def admit(self, key):
+        """
+        Try to start a computation for the duration of a with block
+
+        Args:
+            key (str): Identifies what the computation is for, e.g. a problem
+
+        Yields:
+            bool: True if the computation may run
+        """
+        admitted = self.try_acquire(key)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(key)
+
+
+aggregate_admission = AdmissionController()
+# Maps (handler name, problem usage key, query string) => the body of the last successful response
+last_good_payloads = LRUCache(maxsize=LAST_GOOD_PAYLOAD_CACHE_SIZE)
+last_good_payloads_lock = threading.Lock()
+
+
+def forget_last_good_payloads(problem_usage_keys):
+    """
+    Drop the last good payloads this process has for some problems, since they were opened or closed
+
+    Args:
+        problem_usage_keys (iterable of UsageKey): The usage keys for the problems
+    """
+    problem_keys = {str(problem_usage_key) for problem_usage_key in problem_usage_keys}
+    with last_good_payloads_lock:
+        for payload_key in [payload_key for payload_key in last_good_payloads if payload_key[1] in problem_keys]:
+            del last_good_payloads[payload_key]
+
+
+def get_stale_response(payload_key, open_run):
+    """
+    Make the response for a request which wasn't admitted
+
+    Args:
+        payload_key (tuple): The key of the request in last_good_payloads
+        open_run (OpenRun): The current open run of the problem, or None if it's closed
+
+    Returns:
+        Response: The last good payload for the request with stale set to true, or a 503 if there isn't one.
+            Either way the Retry-After header says when to try again, and a poll_interval_millis in the payload
+            is raised to match. The open status of the runs in the payload is replaced with the current one.
+    """
+    retry_after_seconds = settings.RAPID_RESPONSE_RETRY_AFTER_SECONDS
+    with last_good_payloads_lock:
+        body = last_good_payloads.get(payload_key)
+    if body is None:
+        response = Response(status=503, json_body="Too many requests for this problem, please try again later")
+    else:
+        payload = json.loads(body)
+        payload['stale'] = True
+        payload['retry_after_seconds'] = retry_after_seconds
+        if 'poll_interval_millis' in payload:
+            payload['poll_interval_millis'] = max(payload['poll_interval_millis'], retry_after_seconds * 1000)
+        open_run_id = open_run.id if open_run is not None else None
+        if 'run_id' in payload:
+            payload['is_open'] = payload['run_id'] == open_run_id
+        elif 'is_open' in payload:
+            payload['is_open'] = open_run_id is not None
+        for run in payload.get('runs', []):
+            run['open'] = run['id'] == open_run_id
+        response = Response(json_body=payload)
+    response.headers['Retry-After'] = str(retry_after_seconds)
+    return response
+
+
+def admission_controlled(handler_method):
+    """
+    Wrapper for aside handlers which aggregate the submissions of a problem, so that only a limited
+    number of them run at once and the rest are answered with the last good payload
+    """
+    @wraps(handler_method)
+    def wrapper(aside_instance, request=None, suffix=None):
+        problem_key = str(aside_instance.wrapped_block_usage_key)
+        query_string = request.query_string if request is not None else ''
+        payload_key = (handler_method.__name__, problem_key, query_string)
+        with aggregate_admission.admit(problem_key) as admitted:
+            if admitted:
+                response = handler_method(aside_instance, request, suffix)
+                if response.status_code == 200:
+                    with last_good_payloads_lock:
+                        last_good_payloads[payload_key] = response.body
+                return response
+        return get_stale_response(
+            payload_key, get_open_run(aside_instance.course_key, aside_instance.wrapped_block_usage_key),
+        )
+    return wrapper
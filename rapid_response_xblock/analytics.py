@@ -0,0 +1,240 @@
+"""
+Course-wide summaries of rapid response submissions for end of term reports.
+
+The submissions of every run in a course are streamed once into NumPy arrays holding one value per
+submission, and the statistics for each problem are computed from the arrays with vectorized operations
+instead of a loop over the submissions. NumPy is imported when a summary is made rather than when this
+module is imported, since nothing else in the LMS needs it.
+"""
+from collections import defaultdict, namedtuple
+import csv
+from itertools import count, islice
+
+from rapid_response_xblock.archives import read_archived_submissions
+from rapid_response_xblock.backends import get_submission_backend
+from rapid_response_xblock.models import RapidResponseRun, RapidResponseRunArchive
+from rapid_response_xblock.routers import read_from_replica
+
+
+ANALYTICS_CHUNK_SIZE = 5000
+ANALYTICS_FIELDS = ['run_id', 'user_id', 'answer_id', 'correct']
+SUMMARY_COLUMNS = [
+    'problem_usage_key',
+    'num_runs',
+    'num_submissions',
+    'num_participants',
+    'percent_correct',
+    'choice_entropy',
+    'first_run_percent_correct',
+    'last_run_percent_correct',
+    'percent_correct_shift',
+    'answer_shift',
+]
+
+# One array per column with a value for each submission, and the runs, problems and answers the values refer to.
+# Runs are in the order they were created, and correct is NaN for submissions which weren't graded.
+CourseSubmissions = namedtuple(
+    'CourseSubmissions',
+    ['run_index', 'user_id', 'answer_index', 'correct', 'run_problem', 'problems', 'answer_ids'],
+)
+
+
+def iter_course_submission_values(run_ids, archives, chunk_size):
+    """
+    Iterate over the ANALYTICS_FIELDS of the submissions in some runs, followed by those of some archived runs
+
+    Args:
+        run_ids (list of int): The ids of runs whose submissions are in the submission backend
+        archives (iterable of RapidResponseRunArchive): The archives of the other runs
+        chunk_size (int): How many submissions to read from the backend at a time
+
+    Returns:
+        generator of tuple: The values for each submission
+    """
+    yield from get_submission_backend().iter_submission_values(run_ids, ANALYTICS_FIELDS, chunk_size=chunk_size)
+    for archive in archives:
+        for submission in read_archived_submissions(archive):
+            yield archive.run_id, submission['user_id'], submission['answer_id'], submission['correct']
+
+
+def load_course_submissions(course_key, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Read the submissions of every run in a course into arrays
+
+    Args:
+        course_key (CourseKey): The course
+        chunk_size (int): How many submissions to convert to arrays at a time
+
+    Returns:
+        CourseSubmissions: The submissions
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    with read_from_replica():
+        runs = list(
+            RapidResponseRun.objects.filter(course_key=course_key).order_by('created', 'id').values_list(
+                'id', 'problem_usage_key'
+            )
+        )
+        archives = list(RapidResponseRunArchive.objects.filter(run__course_key=course_key).order_by('run_id'))
+        archived_run_ids = {archive.run_id for archive in archives}
+        rows = iter_course_submission_values(
+            [run_id for run_id, _ in runs if run_id not in archived_run_ids],
+            archives,
+            chunk_size,
+        )
+
+        problem_indexes = defaultdict(count().__next__)
+        run_problem = np.array([problem_indexes[problem_usage_key] for _, problem_usage_key in runs], dtype=np.intp)
+        run_ids = np.array([run_id for run_id, _ in runs], dtype=np.int64)
+        run_sorter = np.argsort(run_ids)
+        answer_indexes = defaultdict(count().__next__)
+
+        columns = defaultdict(list)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            chunk_run_ids, chunk_user_ids, chunk_answer_ids, chunk_correct = zip(*chunk)
+            columns['run_index'].append(
+                run_sorter[np.searchsorted(run_ids, np.array(chunk_run_ids, dtype=np.int64), sorter=run_sorter)]
+            )
+            # Users who were deleted have no id, which becomes NaN here and -1 below
+            user_ids = np.array(chunk_user_ids, dtype=np.float64)
+            columns['user_id'].append(np.where(np.isnan(user_ids), -1, user_ids).astype(np.int64))
+            columns['answer_index'].append(
+                np.fromiter(map(answer_indexes.__getitem__, chunk_answer_ids), dtype=np.intp, count=len(chunk))
+            )
+            columns['correct'].append(np.array(chunk_correct, dtype=np.float64))
+
+    empty = {
+        'run_index': np.empty(0, dtype=np.intp),
+        'user_id': np.empty(0, dtype=np.int64),
+        'answer_index': np.empty(0, dtype=np.intp),
+        'correct': np.empty(0, dtype=np.float64),
+    }
+    return CourseSubmissions(
+        run_problem=run_problem,
+        problems=list(problem_indexes),
+        answer_ids=list(answer_indexes),
+        **{
+            name: np.concatenate(columns[name]) if columns[name] else empty_array
+            for name, empty_array in empty.items()
+        }
+    )
+
+
+def summarize_submissions(submissions):
+    """
+    Compute the statistics for each problem in a course
+
+    Args:
+        submissions (CourseSubmissions): The submissions of the course
+
+    Returns:
+        list of dict: The SUMMARY_COLUMNS for each problem, in the order the problems were first run.
+            Statistics which can't be computed for a problem, such as the shift for a problem
+            which was only run once, are None.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    num_problems = len(submissions.problems)
+    num_runs = len(submissions.run_problem)
+    num_answers = max(len(submissions.answer_ids), 1)
+    submission_problem = submissions.run_problem[submissions.run_index]
+
+    # Each (problem, user) pair is combined into one integer, and the distinct pairs are counted after sorting
+    known_users = submissions.user_id >= 0
+    user_id_limit = submissions.user_id.max(initial=0) + 1
+    participants = np.sort(
+        submission_problem[known_users].astype(np.int64) * user_id_limit + submissions.user_id[known_users]
+    )
+    participants = participants[np.flatnonzero(np.diff(participants, prepend=-1))]
+    num_participants = np.bincount(participants // user_id_limit, minlength=num_problems)
+
+    graded = ~np.isnan(submissions.correct)
+    problem_correct = np.bincount(
+        submission_problem[graded], weights=submissions.correct[graded], minlength=num_problems
+    )
+    problem_graded = np.bincount(submission_problem[graded], minlength=num_problems)
+    run_correct = np.bincount(
+        submissions.run_index[graded], weights=submissions.correct[graded], minlength=num_runs
+    )
+    run_graded = np.bincount(submissions.run_index[graded], minlength=num_runs)
+
+    problem_answer_counts = np.bincount(
+        submission_problem * num_answers + submissions.answer_index, minlength=num_problems * num_answers
+    ).reshape(num_problems, num_answers)
+    run_answer_counts = np.bincount(
+        submissions.run_index * num_answers + submissions.answer_index, minlength=num_runs * num_answers
+    ).reshape(num_runs, num_answers)
+    run_totals = run_answer_counts.sum(axis=1)
+
+    # The first and last runs of each problem which have any submissions. Runs are in the order they were created.
+    answered_runs = np.flatnonzero(run_totals)
+    first_run = np.full(num_problems, num_runs, dtype=np.intp)
+    last_run = np.full(num_problems, -1, dtype=np.intp)
+    np.minimum.at(first_run, submissions.run_problem[answered_runs], answered_runs)
+    np.maximum.at(last_run, submissions.run_problem[answered_runs], answered_runs)
+    has_shift = (last_run > first_run) & (last_run >= 0)
+    first_run = np.where(has_shift, first_run, 0)
+    last_run = np.where(has_shift, last_run, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent_correct = 100 * problem_correct / problem_graded
+        run_percent_correct = 100 * run_correct / run_graded
+        problem_distribution = problem_answer_counts / problem_answer_counts.sum(axis=1, keepdims=True)
+        run_distribution = run_answer_counts / run_totals[:, np.newaxis]
+        # Shannon entropy in bits of the answers to each problem, over all of its runs
+        choice_entropy = np.where(
+            problem_distribution > 0, -problem_distribution * np.log2(problem_distribution), 0
+        ).sum(axis=1)
+    choice_entropy[problem_answer_counts.sum(axis=1) == 0] = np.nan
+
+    first_run_percent_correct = np.where(has_shift, run_percent_correct[first_run], np.nan)
+    last_run_percent_correct = np.where(has_shift, run_percent_correct[last_run], np.nan)
+    # The total variation distance between the answers in the first and last runs, from 0 to 1
+    answer_shift = np.where(
+        has_shift,
+        0.5 * np.abs(run_distribution[last_run] - run_distribution[first_run]).sum(axis=1),
+        np.nan,
+    )
+
+    columns = {
+        'num_runs': np.bincount(submissions.run_problem, minlength=num_problems),
+        'num_submissions': np.bincount(submission_problem, minlength=num_problems),
+        'num_participants': num_participants,
+        'percent_correct': percent_correct,
+        'choice_entropy': choice_entropy,
+        'first_run_percent_correct': first_run_percent_correct,
+        'last_run_percent_correct': last_run_percent_correct,
+        'percent_correct_shift': last_run_percent_correct - first_run_percent_correct,
+        'answer_shift': answer_shift,
+    }
+    values = {
+        name: [
+            None if np.isnan(value) else round(value, 4) for value in column.tolist()
+        ] if column.dtype.kind == 'f' else column.tolist()
+        for name, column in columns.items()
+    }
+    return [
+        dict(
+            {name: column[index] for name, column in values.items()},
+            problem_usage_key=str(problem_usage_key),
+        ) for index, problem_usage_key in enumerate(submissions.problems)
+    ]
+
+
+def write_course_summary(summary, summary_file):
+    """
+    Write the statistics for each problem as CSV
+
+    Args:
+        summary (list of dict): The output of summarize_submissions
+        summary_file (file): A text file to write to
+    """
+    writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_COLUMNS)
+    writer.writeheader()
+    writer.writerows(
+        {name: '' if value is None else value for name, value in row.items()} for row in summary
+    )
@@ -31,3 +31,7 @@ class RapidResponseAppConfig(AppConfig):
             }
         },
     }
+
+    def ready(self):
+        """Connect signal handlers"""
+        import rapid_response_xblock.signals  # pylint: disable=unused-import, import-outside-toplevel
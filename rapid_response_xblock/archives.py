@@ -0,0 +1,198 @@
+"""
+Archiving the submissions of runs which were closed a long time ago.
+
+The submissions of an archived run are written to a gzipped JSON lines file in storage and deleted
+from RapidResponseSubmission, which keeps the table that ingestion writes to small. The aggregate counts
+of the run are kept on its RapidResponseRunArchive so that charts and the run index don't need the file,
+and exports and reports read the file when they need the individual submissions. Since every reader prefers
+the archive of a run, runs are only archived when the database submission backend stores the submissions.
+"""
+from datetime import datetime, timedelta
+import gzip
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from rapid_response_xblock.backends import DatabaseSubmissionBackend, get_submission_backend
+from rapid_response_xblock.models import (
+    RapidResponseRun,
+    RapidResponseRunArchive,
+    RapidResponseSubmission,
+)
+from rapid_response_xblock.routers import get_write_database
+
+
+log = logging.getLogger(__name__)
+ARCHIVE_DIRECTORY = 'rapid_response_archives'
+ARCHIVE_FIELDS = [
+    'id',
+    'user_id',
+    'created',
+    'modified',
+    'answer_id',
+    'answer_text',
+    'correct',
+    'seconds_to_answer',
+    'cohort',
+    'enrollment_track',
+    'event',
+]
+ARCHIVE_DATETIME_FIELDS = ('created', 'modified')
+ARCHIVE_WRITE_CHUNK_SIZE = 2000
+
+
+def encode_value(value):
+    """Encode values for JSON which the json module can't, keeping the full precision of datetimes"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unable to encode {value!r}")
+
+
+def get_archive_storage():
+    """
+    Get the storage which archives are written to
+
+    Returns:
+        django.core.files.storage.Storage: The storage configured with RAPID_RESPONSE_ARCHIVE_STORAGE,
+            or the default storage if that isn't set
+    """
+    storage_class = settings.RAPID_RESPONSE_ARCHIVE_STORAGE
+    if storage_class:
+        return import_string(storage_class)()
+    return default_storage
+
+
+def is_archiving_supported():
+    """
+    Check whether the configured submission backend stores submissions in RapidResponseSubmission,
+    which is the only place runs are archived from
+
+    Returns:
+        bool: True if runs can be archived
+    """
+    return isinstance(get_submission_backend(), DatabaseSubmissionBackend)
+
+
+def get_archive_path(run):
+    """The path in storage of the archive for a run"""
+    course_directory = str(run.course_key).replace(':', '_').replace('+', '_')
+    return f"{ARCHIVE_DIRECTORY}/{course_directory}/run-{run.id}.jsonl.gz"
+
+
+def get_archivable_runs(days, course_key=None):
+    """
+    Get the runs which were closed more than a number of days ago and haven't been archived yet
+
+    Args:
+        days (int): The number of days since the run was closed
+        course_key (CourseKey): If set, only get runs for this course
+
+    Returns:
+        QuerySet: The runs, oldest first
+    """
+    runs = RapidResponseRun.objects.filter(
+        open=False,
+        modified__lt=timezone.now() - timedelta(days=days),
+        archive__isnull=True,
+    )
+    if course_key is not None:
+        runs = runs.filter(course_key=course_key)
+    return runs.order_by('id')
+
+
+def archive_run(run, storage=None):
+    """
+    Move the submissions of a closed run into an archive file and record a snapshot of its counts
+
+    Args:
+        run (RapidResponseRun): A closed run
+        storage (django.core.files.storage.Storage): The storage to write to, or None to use the configured storage
+
+    Returns:
+        RapidResponseRunArchive: The archive record for the run
+    """
+    if not is_archiving_supported():
+        # The archive would be empty, and would hide the submissions in the backend from every reader
+        raise ImproperlyConfigured("Runs can only be archived with the database submission backend")
+    storage = storage or get_archive_storage()
+    submissions = RapidResponseSubmission.objects.filter(run_id=run.id)
+    stats = submissions.aggregate(
+        num_submissions=Count('id'),
+        num_users=Count('user', distinct=True),
+        num_correct=Count('id', filter=Q(correct=True)),
+    )
+    answer_counts = dict(submissions.values_list('answer_id').annotate(count=Count('id')).order_by())
+
+    archive_path = get_archive_path(run)
+    with tempfile.TemporaryFile() as archive_file:
+        with gzip.GzipFile(fileobj=archive_file, mode='wb') as lines:
+            rows = submissions.order_by('id').values(*ARCHIVE_FIELDS)
+            for submission in rows.iterator(chunk_size=ARCHIVE_WRITE_CHUNK_SIZE):
+                lines.write(json.dumps(submission, default=encode_value).encode('utf-8') + b"\n")
+        archive_file.seek(0)
+        # The file may have been written before an interruption which happened before the database was updated
+        if storage.exists(archive_path):
+            storage.delete(archive_path)
+        archive_path = storage.save(archive_path, File(archive_file, name=os.path.basename(archive_path)))
+
+    with transaction.atomic(using=get_write_database()):
+        archive = RapidResponseRunArchive.objects.create(
+            run=run,
+            archive_path=archive_path,
+            answer_counts=answer_counts,
+            **stats,
+        )
+        submissions.delete()
+    return archive
+
+
+def archive_closed_runs(days, course_key=None, storage=None):
+    """
+    Archive every run which was closed more than a number of days ago
+
+    Args:
+        days (int): The number of days since the run was closed
+        course_key (CourseKey): If set, only archive runs for this course
+        storage (django.core.files.storage.Storage): The storage to write to, or None to use the configured storage
+
+    Returns:
+        list of RapidResponseRunArchive: The new archive records
+    """
+    storage = storage or get_archive_storage()
+    archives = []
+    for run in get_archivable_runs(days, course_key=course_key).iterator():
+        archives.append(archive_run(run, storage=storage))
+        log.info("Archived %d submissions for rapid response run %s", archives[-1].num_submissions, run.id)
+    return archives
+
+
+def read_archived_submissions(archive, storage=None):
+    """
+    Read the submissions in the archive for a run
+
+    Args:
+        archive (RapidResponseRunArchive): The archive record for a run
+        storage (django.core.files.storage.Storage): The storage to read from, or None to use the configured storage
+
+    Returns:
+        generator of dict: The archived values of each submission, in order of id
+    """
+    storage = storage or get_archive_storage()
+    with storage.open(archive.archive_path, 'rb') as archive_file:
+        with gzip.GzipFile(fileobj=archive_file, mode='rb') as lines:
+            for line in lines:
+                submission = json.loads(line)
+                for field in ARCHIVE_DATETIME_FIELDS:
+                    submission[field] = parse_datetime(submission[field])
+                yield submission
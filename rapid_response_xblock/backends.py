@@ -0,0 +1,407 @@
+"""
+Backends which store rapid response submissions.
+
+The backend is chosen with RAPID_RESPONSE_SUBMISSION_BACKEND. DatabaseSubmissionBackend, the default, stores
+submissions in RapidResponseSubmission. LogSubmissionBackend appends them to a log file which every LMS process
+can read, and keeps the counts in memory, so recording a submission never touches the database.
+"""
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime
+from functools import lru_cache
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from rapid_response_xblock.models import RapidResponseSubmission
+from rapid_response_xblock.routers import get_write_database
+from rapid_response_xblock.segments import (
+    SEGMENT_COHORT,
+    SEGMENT_ENROLLMENT_TRACK,
+    SEGMENT_TYPES,
+    get_segmented_counts,
+    get_submission_segments,
+    update_answer_counts,
+)
+
+
+# event_id identifies the tracking event of a submission, so that a copy of the same event delivered again
+# can be recognized. It is None for submissions which don't come from a tracking event.
+SubmissionRecord = namedtuple(
+    'SubmissionRecord',
+    ['run_id', 'user_id', 'answer_id', 'answer_text', 'correct', 'seconds_to_answer', 'segments', 'event', 'event_id'],
+    defaults=[None],
+)
+# The values of each submission returned by SubmissionBackend.list_submissions
+SUBMISSION_FIELDS = [
+    'id',
+    'run_id',
+    'user_id',
+    'created',
+    'answer_id',
+    'answer_text',
+    'correct',
+    'seconds_to_answer',
+    'event',
+]
+
+
+class SubmissionBackend:
+    """
+    The interface for storing submissions. Each user has at most one submission in a run,
+    so recording a submission replaces the user's previous submission in that run. A submission
+    with the same event_id as the user's current submission in the run is a duplicate and is skipped.
+    """
+    def record_submission(self, record):
+        """
+        Store a submission, replacing the user's previous submission in the same run
+
+        Args:
+            record (SubmissionRecord): The submission
+
+        Returns:
+            bool: False if the submission was skipped as a duplicate
+        """
+        raise NotImplementedError
+
+    def record_submissions(self, records):
+        """
+        Store many submissions at once, each one replacing the user's previous submission in the same run.
+        If a user has more than one submission for a run in records, the last one is kept.
+
+        Args:
+            records (list of SubmissionRecord): The submissions
+
+        Returns:
+            int: The number of submissions stored, leaving out duplicates
+        """
+        return sum(self.record_submission(record) for record in records)
+
+    def count_answers(self, run_ids):
+        """
+        Count the submissions for each answer in some runs
+
+        Args:
+            run_ids (list of int): Run ids
+
+        Returns:
+            dict: A mapping of (answer id, run id) => count, leaving out answers without submissions
+        """
+        raise NotImplementedError
+
+    def count_segmented_answers(self, run_ids):
+        """
+        Count the submissions for each answer in some runs, split by the segments of the learners
+
+        Args:
+            run_ids (list of int): Run ids
+
+        Returns:
+            dict: A mapping of segment type => segment name => answer id => run id => count
+        """
+        raise NotImplementedError
+
+    def list_submissions(self, run_ids, after_id=0, limit=None, fields=None):
+        """
+        List the submissions in some runs in order of id, so that they can be exported a chunk at a time
+
+        Args:
+            run_ids (list of int): Run ids
+            after_id (int): Only list submissions with an id greater than this
+            limit (int): The maximum number of submissions to list, or None for no limit
+            fields (list of str): Names from SUBMISSION_FIELDS to list, or None for all of them
+
+        Returns:
+            list of dict: The values of fields for each submission
+        """
+        raise NotImplementedError
+
+    def iter_submission_values(self, run_ids, fields, chunk_size=2000):
+        """
+        Iterate over some of the values of every submission in some runs, for reports which
+        read a lot of submissions and don't need the whole of each one
+
+        Args:
+            run_ids (list of int): Run ids
+            fields (list of str): Names from SUBMISSION_FIELDS
+            chunk_size (int): How many submissions to read at a time
+
+        Returns:
+            generator of tuple: The values of fields for each submission, in order of id
+        """
+        after_id = 0
+        while True:
+            submissions = self.list_submissions(
+                run_ids, after_id=after_id, limit=chunk_size, fields=['id', *fields],
+            )
+            for submission in submissions:
+                yield tuple(submission[field] for field in fields)
+            if len(submissions) < chunk_size:
+                return
+            after_id = submissions[-1]['id']
+
+
+def is_duplicate(record, current_event_id):
+    """
+    Check whether a submission comes from the same tracking event as the user's current submission in the run
+
+    Args:
+        record (SubmissionRecord): A new submission
+        current_event_id (str): The event_id of the user's current submission, or None if there isn't one
+
+    Returns:
+        bool: True if the new submission is a copy of the current one
+    """
+    return record.event_id is not None and record.event_id == current_event_id
+
+
+class DatabaseSubmissionBackend(SubmissionBackend):
+    """Stores submissions in the RapidResponseSubmission table"""
+
+    def record_submission(self, record):
+        return self.record_submissions([record]) > 0
+
+    def record_submissions(self, records):
+        records_by_run = defaultdict(dict)
+        for record in records:
+            records_by_run[record.run_id][record.user_id] = record
+
+        num_recorded = 0
+        with transaction.atomic(using=get_write_database()):
+            for run_id, run_records in records_by_run.items():
+                previous_submissions = list(RapidResponseSubmission.objects.filter(
+                    run_id=run_id,
+                    user_id__in=list(run_records),
+                ).values('id', 'user_id', 'answer_id', 'event_id', *SEGMENT_TYPES))
+                duplicate_user_ids = {
+                    previous['user_id'] for previous in previous_submissions
+                    if is_duplicate(run_records[previous['user_id']], previous['event_id'])
+                }
+                run_records = {
+                    user_id: record for user_id, record in run_records.items() if user_id not in duplicate_user_ids
+                }
+                if not run_records:
+                    continue
+                replaced_submissions = [
+                    previous for previous in previous_submissions if previous['user_id'] in run_records
+                ]
+
+                # Each (segments, answer) pair only needs one update, however many learners it applies to
+                segment_deltas = Counter()
+                for previous in replaced_submissions:
+                    segments = tuple(sorted(get_submission_segments(previous).items()))
+                    segment_deltas[(segments, previous['answer_id'])] -= 1
+                if replaced_submissions:
+                    RapidResponseSubmission.objects.filter(
+                        id__in=[previous['id'] for previous in replaced_submissions]
+                    ).delete()
+                RapidResponseSubmission.objects.bulk_create([
+                    RapidResponseSubmission(
+                        user_id=record.user_id,
+                        run_id=run_id,
+                        event=record.event,
+                        answer_id=record.answer_id,
+                        answer_text=record.answer_text,
+                        correct=record.correct,
+                        seconds_to_answer=record.seconds_to_answer,
+                        cohort=record.segments.get(SEGMENT_COHORT),
+                        enrollment_track=record.segments.get(SEGMENT_ENROLLMENT_TRACK),
+                        event_id=record.event_id,
+                    ) for record in run_records.values()
+                ])
+                num_recorded += len(run_records)
+                for record in run_records.values():
+                    segment_deltas[(tuple(sorted(record.segments.items())), record.answer_id)] += 1
+                for (segments, answer_id), delta in segment_deltas.items():
+                    if segments and delta:
+                        update_answer_counts(run_id, dict(segments), answer_id, delta)
+        return num_recorded
+
+    def count_answers(self, run_ids):
+        response_data = RapidResponseSubmission.objects.filter(
+            run__id__in=run_ids
+        ).values('answer_id', 'run').annotate(count=Count('answer_id'))
+        return {(item['answer_id'], item['run']): item['count'] for item in response_data}
+
+    def count_segmented_answers(self, run_ids):
+        return get_segmented_counts(run_ids)
+
+    def list_submissions(self, run_ids, after_id=0, limit=None, fields=None):
+        submissions = RapidResponseSubmission.objects.filter(
+            run_id__in=run_ids,
+            id__gt=after_id,
+        ).order_by('id').values(*(fields or SUBMISSION_FIELDS))
+        if limit is not None:
+            submissions = submissions[:limit]
+        return list(submissions)
+
+    def iter_submission_values(self, run_ids, fields, chunk_size=2000):
+        return RapidResponseSubmission.objects.filter(
+            run_id__in=run_ids,
+        ).order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def encode_log_value(value):
+    """Encode values for the submission log which the json module can't"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unable to encode {value!r}")
+
+
+class LogSubmissionBackend(SubmissionBackend):
+    """
+    Appends submissions to the file at RAPID_RESPONSE_SUBMISSION_LOG_PATH, one JSON object per line.
+    Every process keeps its own counts in memory, bringing them up to date by reading the lines
+    added to the log since it last read it. The id of a submission is its position in the log.
+
+    The in-memory state covers everything in the log, so the log should be rotated between terms.
+    """
+    def __init__(self, path=None):
+        self.path = path or settings.RAPID_RESPONSE_SUBMISSION_LOG_PATH
+        self._lock = threading.Lock()
+        # How far into the log this process has read
+        self._offset = 0
+        # (run id, user id) => (submission id, answer id, segments, event id) of the user's latest submission
+        self._latest = {}
+        # (answer id, run id) => count
+        self._counts = defaultdict(int)
+        # (run id, segment type, segment, answer id) => count
+        self._segment_counts = defaultdict(int)
+
+    def record_submission(self, record):
+        return self.record_submissions([record]) > 0
+
+    def record_submissions(self, records):
+        if any(record.event_id is not None for record in records):
+            self.catch_up()
+            with self._lock:
+                records = [
+                    record for record in records
+                    if not is_duplicate(record, self._latest.get((record.run_id, record.user_id), (None,) * 4)[3])
+                ]
+        if not records:
+            return 0
+        created = timezone.now()
+        lines = b"".join(
+            json.dumps(dict(record._asdict(), created=created), default=encode_log_value).encode('utf-8') + b"\n"
+            for record in records
+        )
+        # A single write to a file opened for appending adds all of the lines at the end of the file,
+        # even with other processes writing to the same file
+        log_fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(log_fd, lines)
+        finally:
+            os.close(log_fd)
+        return len(records)
+
+    def _apply(self, submission_id, entry):
+        """Update the in-memory state for a submission read from the log"""
+        key = (entry['run_id'], entry['user_id'])
+        previous = self._latest.get(key)
+        if previous is not None:
+            _, previous_answer_id, previous_segments, _ = previous
+            self._counts[(previous_answer_id, entry['run_id'])] -= 1
+            for segment_type, segment in previous_segments.items():
+                self._segment_counts[(entry['run_id'], segment_type, segment, previous_answer_id)] -= 1
+        self._latest[key] = (submission_id, entry['answer_id'], entry['segments'], entry.get('event_id'))
+        self._counts[(entry['answer_id'], entry['run_id'])] += 1
+        for segment_type, segment in entry['segments'].items():
+            self._segment_counts[(entry['run_id'], segment_type, segment, entry['answer_id'])] += 1
+
+    def catch_up(self):
+        """Read the submissions added to the log since the last time it was read"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'rb') as log_file:
+                log_file.seek(self._offset)
+                for line in log_file:
+                    if not line.endswith(b"\n"):
+                        # The line is still being written
+                        break
+                    self._apply(self._offset + 1, json.loads(line))
+                    self._offset += len(line)
+
+    def count_answers(self, run_ids):
+        self.catch_up()
+        run_ids = set(run_ids)
+        with self._lock:
+            return {
+                (answer_id, run_id): count
+                for (answer_id, run_id), count in self._counts.items()
+                if run_id in run_ids and count > 0
+            }
+
+    def count_segmented_answers(self, run_ids):
+        self.catch_up()
+        run_ids = set(run_ids)
+        segmented_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+        with self._lock:
+            for (run_id, segment_type, segment, answer_id), count in self._segment_counts.items():
+                if run_id in run_ids and count > 0:
+                    segmented_counts[segment_type][segment][answer_id][run_id] = count
+        return segmented_counts
+
+    def list_submissions(self, run_ids, after_id=0, limit=None, fields=None):
+        fields = fields or SUBMISSION_FIELDS
+        self.catch_up()
+        run_ids = set(run_ids)
+        with self._lock:
+            latest_ids = {
+                submission_id for (run_id, _), (submission_id, *_) in self._latest.items() if run_id in run_ids
+            }
+            end = self._offset
+
+        submissions = []
+        if not latest_ids:
+            return submissions
+        with open(self.path, 'rb') as log_file:
+            # Submission ids are one more than the position of the line, so this is where the line after_id starts
+            offset = max(after_id - 1, 0)
+            log_file.seek(offset)
+            if after_id > 0:
+                offset += len(log_file.readline())
+            while offset < end and (limit is None or len(submissions) < limit):
+                line = log_file.readline()
+                submission_id = offset + 1
+                offset += len(line)
+                if submission_id not in latest_ids:
+                    continue
+                entry = json.loads(line)
+                entry['id'] = submission_id
+                if 'created' in fields:
+                    entry['created'] = parse_datetime(entry['created'])
+                submissions.append({field: entry[field] for field in fields})
+        return submissions
+
+
+@lru_cache(maxsize=None)
+def load_submission_backend(backend_path):
+    """
+    Create the backend for a dotted path. Each process uses one instance of each backend,
+    since a backend may keep state in memory.
+
+    Args:
+        backend_path (str): The dotted path of a SubmissionBackend subclass
+
+    Returns:
+        SubmissionBackend: The backend
+    """
+    return import_string(backend_path)()
+
+
+def get_submission_backend():
+    """
+    Get the backend configured with RAPID_RESPONSE_SUBMISSION_BACKEND
+
+    Returns:
+        SubmissionBackend: The backend
+    """
+    return load_submission_backend(settings.RAPID_RESPONSE_SUBMISSION_BACKEND)
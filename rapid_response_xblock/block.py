@@ -1,25 +1,40 @@
 """Rapid-response functionality"""
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
 import logging
 from functools import wraps
-import pkg_resources
+import threading
+import time
 
+from cachetools import cached, LRUCache
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Count
-from django.template import Context, Template
+from django.db.models.functions import Floor, TruncSecond
 from django.utils.translation import gettext_lazy as _
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
 import pytz
 from web_fragments.fragment import Fragment
 from webob.response import Response
 from xblock.core import XBlock, XBlockAside
-from xblock.fields import Scope, Boolean
+from xblock.fields import Scope, ScopeIds, Boolean
 from xmodule.modulestore.django import modulestore
 
+from rapid_response_xblock.admission import admission_controlled, forget_last_good_payloads
+from rapid_response_xblock.backends import get_submission_backend
+from rapid_response_xblock.caches import get_open_run, is_read_pinned, make_cache_key, publish_open_runs
+from rapid_response_xblock.constants import BLOCK_PROBLEM_CATEGORY, MULTIPLE_CHOICE_TYPE
+from rapid_response_xblock.ingestion import MAX_EXTERNAL_SUBMISSIONS, record_external_submissions
 from rapid_response_xblock.models import (
     RapidResponseRun,
+    RapidResponseRunArchive,
     RapidResponseSubmission,
 )
+from rapid_response_xblock.routers import get_write_database, read_from_replica
+from rapid_response_xblock.runs import get_close_at, set_runs_open_status
+from rapid_response_xblock.segments import seed_answer_counts
 
 log = logging.getLogger(__name__)
 
@@ -34,6 +49,9 @@ def get_resource_bytes(path):
     Returns:
         unicode: The unicode contents of the resource at the given path
     """
+    # Only needed for rendering, and slow to import
+    import pkg_resources  # pylint: disable=import-outside-toplevel
+
     resource_contents = pkg_resources.resource_string(__name__, path)
     return resource_contents.decode('utf-8')
 
@@ -42,12 +60,67 @@ def render_template(template_path, context=None):
     """
     Evaluate a template by resource path, applying the provided context.
     """
+    from django.template import Context, Template  # pylint: disable=import-outside-toplevel
+
     context = context or {}
     template_str = get_resource_bytes(template_path)
     template = Template(template_str)
     return template.render(Context(context))
 
 
+def get_int_param(request, name, default=None, minimum=None, maximum=None):
+    """
+    Read an integer from the query parameters of a request
+
+    Args:
+        request (webob.Request): A request
+        name (str): The name of the query parameter
+        default (int): The value to use if the parameter is missing
+        minimum (int): If set, values below this are raised to it
+        maximum (int): If set, values above this are lowered to it
+
+    Returns:
+        int: The value of the parameter
+
+    Raises:
+        ValueError: If the parameter is not an integer
+    """
+    value = request.params.get(name) if request is not None else None
+    if value in (None, ''):
+        return default
+    value = int(value)
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+
+def get_archived_run_response(run_ids):
+    """
+    Make the response for a handler which reads the individual submissions of some runs, if any of them were
+    archived. Those submissions are no longer in the database, so the handler would otherwise return empty data.
+
+    Args:
+        run_ids (list of int): The ids of the runs the handler reads
+
+    Returns:
+        Response: A 410 naming the archived runs, or None if none of the runs were archived
+    """
+    archived_run_ids = sorted(
+        RapidResponseRunArchive.objects.filter(run_id__in=run_ids).values_list('run_id', flat=True)
+    )
+    if not archived_run_ids:
+        return None
+    return Response(
+        status=410,
+        json_body={
+            'error': "The submissions of these runs were archived and are only available in exports",
+            'archived_runs': archived_run_ids,
+        },
+    )
+
+
 def staff_only(handler_method):
     """
     Wrapper that ensures a handler method is enabled for staff users only
@@ -63,8 +136,153 @@ def staff_only(handler_method):
     return wrapper
 
 
-BLOCK_PROBLEM_CATEGORY = 'problem'
-MULTIPLE_CHOICE_TYPE = 'multiplechoiceresponse'
+RAPID_RESPONSE_ASIDE_TYPE = 'rapid_response_xblock'
+# The containers which can be opened or closed all at once with set_problems_open_status
+SESSION_SCOPES = ('unit', 'sequential')
+TIMELINE_BUCKET_SECONDS = 10
+TIMELINE_MAX_BUCKET_SECONDS = 60 * 60
+LATENCY_BIN_SECONDS = 10
+LATENCY_PERCENTILES = (25, 50, 75, 90, 95)
+SHOULD_APPLY_CACHE_SIZE = 4096
+# Maps a version of a problem to whether or not the aside applies to it
+should_apply_cache = LRUCache(maxsize=SHOULD_APPLY_CACHE_SIZE)
+CHOICES_CACHE_SIZE = 1024
+# Maps a version of a problem to its parsed choices
+choices_cache = LRUCache(maxsize=CHOICES_CACHE_SIZE)
+# How long the instructor's browser should wait between polls of the responses handler: while answers are
+# coming in, once they stop, and when the server is struggling to answer the polls
+POLL_INTERVAL_ACTIVE_MILLIS = 2000
+POLL_INTERVAL_IDLE_MILLIS = 6000
+POLL_INTERVAL_BUSY_MILLIS = 20000
+# An open run is active for this long after the last time its number of answers changed
+POLL_ACTIVE_SECONDS = 15
+# Reading the counts taking longer than this means the database is under pressure
+POLL_BUSY_QUERY_SECONDS = 1.0
+POLL_ACTIVITY_CACHE_TIMEOUT = 60 * 60
+
+
+def get_poll_interval_millis(open_run_id, total_count, query_seconds):
+    """
+    Recommend how long to wait before polling for responses again. The number of answers seen by the
+    last poll of any instructor is kept in the cache, so every open tab backs off once the answers stop.
+
+    Args:
+        open_run_id (int): The id of the open run, or None if the problem is closed
+        total_count (int): The number of answers in the open run
+        query_seconds (float): How long it took to read the runs and counts for this poll
+
+    Returns:
+        int: The number of milliseconds to wait
+    """
+    if query_seconds > POLL_BUSY_QUERY_SECONDS:
+        return POLL_INTERVAL_BUSY_MILLIS
+    if open_run_id is None:
+        return POLL_INTERVAL_IDLE_MILLIS
+
+    key = make_cache_key('poll_activity', open_run_id)
+    now = time.time()
+    activity = cache.get(key)
+    if activity is None or activity[0] != total_count:
+        activity = (total_count, now)
+        cache.set(key, activity, POLL_ACTIVITY_CACHE_TIMEOUT)
+    _, last_changed = activity
+    if now - last_changed < POLL_ACTIVE_SECONDS:
+        return POLL_INTERVAL_ACTIVE_MILLIS
+    return POLL_INTERVAL_IDLE_MILLIS
+
+
+def get_block_version_key(block):
+    """
+    Make a key which identifies a specific version of a block. A new definition is created
+    whenever the content of a problem changes, so the definition id changes along with it.
+
+    Args:
+        block (XBlock): A block
+
+    Returns:
+        tuple: A hashable key for this version of the block, or None if the block doesn't have real scope ids
+    """
+    scope_ids = getattr(block, 'scope_ids', None)
+    if not isinstance(scope_ids, ScopeIds):
+        return None
+    return (
+        str(scope_ids.usage_id),
+        str(scope_ids.def_id),
+        str(getattr(block, 'edited_on', None)),
+    )
+
+
+def cached_per_version(version_cache):
+    """
+    Decorator for functions of a block which caches their result for each version of the block.
+    Blocks which don't have real scope ids aren't cached.
+
+    Args:
+        version_cache (cachetools.Cache): The cache to keep the results in
+
+    Returns:
+        function: A decorator
+    """
+    def decorator(func):
+        """Wrap a function of a block"""
+        cached_func = cached(version_cache, key=get_block_version_key, lock=threading.Lock())(func)
+
+        @wraps(func)
+        def wrapper(block):
+            if get_block_version_key(block) is None:
+                return func(block)
+            return cached_func(block)
+        return wrapper
+    return decorator
+
+
+@cached_per_version(choices_cache)
+def get_problem_choices(problem):
+    """
+    Look up choices from the XML of a problem along with whether each one is correct. Parsing the problem
+    is expensive, so the choices are cached for each version of the problem.
+
+    Args:
+        problem (ProblemBlock): A problem
+
+    Returns:
+        list of dict: A list of answer id/answer text/correct dicts, in the order the choices are listed in the XML
+    """
+    tree = problem.lcp.tree
+    choice_elements = tree.xpath('//choicegroup/choice')
+    return [
+        {
+            'answer_id': choice.get('name'),
+            'answer_text': list(choice.itertext())[0] if list(choice.itertext()) else "",
+            'correct': choice.get('correct', '').lower() == 'true',
+        }
+        for choice in choice_elements
+    ]
+
+
+def warm_up_open_runs(course_key, runs):
+    """
+    Get ready for the burst of answers and polls which follows opening some problems, by parsing and caching
+    the choices of each problem and creating zero counts for its answers. A problem which can't be warmed up
+    is skipped, since the answers and polls can still do the same work themselves.
+
+    Args:
+        course_key (CourseKey): The course key for the problems
+        runs (dict): A mapping of problem usage key => the most recent RapidResponseRun for the problem
+    """
+    run_answer_ids = {}
+    store = modulestore()
+    with store.bulk_operations(course_key):
+        for problem_usage_key, run in runs.items():
+            if not run.is_open:
+                continue
+            try:
+                choices = get_problem_choices(store.get_item(problem_usage_key))
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Unable to warm up the caches for rapid response problem %s", problem_usage_key)
+                continue
+            run_answer_ids[run.id] = [choice['answer_id'] for choice in choices]
+    seed_answer_counts(course_key, run_answer_ids)
 
 
 class RapidResponseAside(XBlockAside):
@@ -81,19 +299,14 @@ class RapidResponseAside(XBlockAside):
     @XBlockAside.aside_for('student_view')
     def student_view_aside(self, block, context=None):  # pylint: disable=unused-argument
         """
-        Renders the aside contents for the student view
+        Renders the aside contents for the student view. Rendering doesn't touch the database, so pages with
+        many rapid response problems render just as fast. The open status and responses are loaded by rapid.js
+        with its first request to the responses handler.
         """
         fragment = Fragment('')
         if not self.is_staff() or not self.enabled:
             return fragment
-        fragment.add_content(
-            render_template(
-                "static/html/rapid.html",
-                {
-                    'is_open': self.has_open_run
-                }
-            )
-        )
+        fragment.add_content(render_template("static/html/rapid.html"))
         fragment.add_css(get_resource_bytes("static/css/rapid.css"))
         fragment.add_javascript(get_resource_bytes("static/js/src/rapid.js"))
         fragment.add_javascript(get_resource_bytes("static/js/lib/d3.v4.min.js"))
@@ -120,29 +333,164 @@ class RapidResponseAside(XBlockAside):
     @staff_only
     def toggle_block_open_status(self, request=None, suffix=None):  # pylint: disable=unused-argument
         """
-        Toggles the open/closed status for the rapid-response-enabled block
+        Toggles the open/closed status for the rapid-response-enabled block. Opening the problem also warms up
+        the caches used by the first answers and polls. Query parameters:
+
+            close_after: If set when opening the problem, close it automatically after this many minutes
         """
-        with transaction.atomic():
+        try:
+            close_after_minutes = get_int_param(request, 'close_after', minimum=1)
+        except ValueError as ex:
+            return Response(status=400, json_body=f"Invalid request: {ex}")
+
+        with transaction.atomic(using=get_write_database()):
             run = RapidResponseRun.objects.filter(
                 problem_usage_key=self.wrapped_block_usage_key,
                 course_key=self.course_key,
             ).first()
 
-            if run and run.open:
+            was_open = run is not None and run.is_open
+            if run is not None and run.open:
+                # A run which is past its close_at time is closed here too, and a new run is opened in its place
                 run.open = False
                 run.save()
-            else:
+            if not was_open:
                 run = RapidResponseRun.objects.create(
                     problem_usage_key=self.wrapped_block_usage_key,
                     course_key=self.course_key,
                     open=True,
+                    close_at=get_close_at(close_after_minutes),
                 )
+        runs = {self.wrapped_block_usage_key: run}
+        publish_open_runs(self.course_key, runs)
+        forget_last_good_payloads(runs)
+        if run.open:
+            warm_up_open_runs(self.course_key, runs)
         return Response(
             json_body={
                 'is_open': run.open,
+                'close_at': run.close_at.isoformat() if run.open and run.close_at else None,
             }
         )
 
+    @XBlock.handler
+    @staff_only
+    def set_problems_open_status(self, request=None, suffix=None):  # pylint: disable=unused-argument
+        """
+        Opens or closes the runs for many rapid-response-enabled problems at once, either for the given
+        problems or for every enabled problem in the unit or sequential which contains this problem.
+
+        Expects a JSON body like {"open": true, "scope": "unit"} or {"open": false, "usage_keys": [...]}.
+        When opening, "close_after" can be set to close the problems automatically after that many minutes.
+        Given problems which don't exist or don't have rapid response enabled are left alone and listed
+        under "skipped".
+        """
+        # problems imports this module
+        # pylint: disable=import-outside-toplevel
+        from rapid_response_xblock.problems import get_enabled_problems, is_enabled_problem
+
+        try:
+            body = request.json
+            is_open = body['open']
+            if not isinstance(is_open, bool):
+                raise ValueError("open must be a boolean")
+            scope = body.get('scope', SESSION_SCOPES[0])
+            if scope not in SESSION_SCOPES:
+                raise ValueError(f"scope must be one of {SESSION_SCOPES}")
+            usage_keys = [UsageKey.from_string(key) for key in body.get('usage_keys', [])]
+            close_after_minutes = body.get('close_after')
+            if close_after_minutes is not None and (
+                not isinstance(close_after_minutes, int) or isinstance(close_after_minutes, bool)
+                or close_after_minutes < 1
+            ):
+                raise ValueError("close_after must be a positive number of minutes")
+        except (AttributeError, ValueError, TypeError, KeyError, InvalidKeyError) as ex:
+            return Response(status=400, json_body=f"Invalid request: {ex}")
+
+        skipped = []
+        if usage_keys:
+            if any(usage_key.course_key != self.course_key for usage_key in usage_keys):
+                return Response(status=400, json_body="Problems must belong to this course")
+            store = modulestore()
+            with store.bulk_operations(self.course_key):
+                enabled_keys = [
+                    usage_key for usage_key in usage_keys
+                    if store.has_item(usage_key) and is_enabled_problem(store.get_item(usage_key))
+                ]
+            skipped = [usage_key for usage_key in usage_keys if usage_key not in enabled_keys]
+            usage_keys = enabled_keys
+        else:
+            container = modulestore().get_item(self.wrapped_block_usage_key).get_parent()
+            if scope == 'sequential':
+                container = container.get_parent()
+            usage_keys = [problem.location for problem in get_enabled_problems(container)]
+
+        runs = set_runs_open_status(self.course_key, usage_keys, is_open, close_after_minutes=close_after_minutes)
+        forget_last_good_payloads(usage_keys)
+        if is_open:
+            warm_up_open_runs(self.course_key, runs)
+        return Response(json_body={
+            'is_open': is_open,
+            'runs': {
+                str(problem_usage_key): run.id for problem_usage_key, run in runs.items()
+            },
+            'skipped': [str(usage_key) for usage_key in skipped],
+        })
+
+    @XBlock.handler
+    @staff_only
+    def course_problems(self, request=None, suffix=None):  # pylint: disable=unused-argument
+        """
+        Lists every problem in this course which rapid response can be applied to,
+        and whether each one has rapid response enabled
+        """
+        # problems imports this module
+        from rapid_response_xblock.problems import get_course_problems  # pylint: disable=import-outside-toplevel
+
+        return Response(json_body={'problems': get_course_problems(self.course_key)})
+
+    @XBlock.handler
+    @staff_only
+    def submit_external_answers(self, request=None, suffix=None):  # pylint: disable=unused-argument
+        """
+        Records a batch of answers collected outside of the LMS, such as by classroom clickers, in the open run
+        of this problem. Services calling this need a user with staff access to the course.
+
+        Expects a JSON body like {"source": "clickers", "answers": [{"user": "a username or email",
+        "answer_id": "choice_0"}, ...]}
+        """
+        try:
+            body = request.json
+            answers = body['answers']
+            source = str(body.get('source', ''))
+            if not isinstance(answers, list):
+                raise ValueError("answers must be a list")
+            if len(answers) > MAX_EXTERNAL_SUBMISSIONS:
+                raise ValueError(f"at most {MAX_EXTERNAL_SUBMISSIONS} answers can be sent at once")
+            for answer in answers:
+                if not isinstance(answer.get('user'), str) or not isinstance(answer.get('answer_id'), str):
+                    raise ValueError("each answer must have a user and an answer_id")
+        except (AttributeError, ValueError, TypeError, KeyError) as ex:
+            return Response(status=400, json_body=f"Invalid request: {ex}")
+
+        open_run = get_open_run(self.course_key, self.wrapped_block_usage_key)
+        if open_run is None:
+            return Response(status=400, json_body="Problem is not open")
+
+        recorded, errors = record_external_submissions(
+            open_run,
+            self.course_key,
+            self.wrapped_block_usage_key,
+            self.get_choices_with_correctness(),
+            answers,
+            source=source,
+        )
+        return Response(json_body={
+            'run_id': open_run.id,
+            'recorded': recorded,
+            'errors': errors,
+        })
+
     @XBlock.handler
     def toggle_block_enabled(self, request=None, suffix=None):  # pylint: disable=unused-argument
         """
@@ -153,23 +501,32 @@ class RapidResponseAside(XBlockAside):
 
     @XBlock.handler
     @staff_only
+    @admission_controlled
     def responses(self, request=None, suffix=None):  # pylint: disable=unused-argument
         """
-        Returns student responses for rapid-response-enabled block
+        Returns student responses for rapid-response-enabled block. These are read from the replica if one
+        is configured, unless the problem was opened or closed moments ago. poll_interval_millis recommends
+        when to poll again.
         """
-        run_querysets = RapidResponseRun.objects.filter(
-            problem_usage_key=self.wrapped_block_usage_key,
-            course_key=self.course_key,
-        )
-        runs = self.serialize_runs(run_querysets)
+        choices = self.choices
+        query_start = time.monotonic()
+        with read_from_replica(pinned=is_read_pinned(self.course_key, self.wrapped_block_usage_key)):
+            run_querysets = RapidResponseRun.objects.filter(
+                problem_usage_key=self.wrapped_block_usage_key,
+                course_key=self.course_key,
+            )
+            runs = self.serialize_runs(run_querysets)
+            counts = self.get_counts_for_problem(
+                [run['id'] for run in runs],
+                choices,
+            )
+            segmented_counts = get_submission_backend().count_segmented_answers(
+                [run['id'] for run in runs]
+            ) if settings.RAPID_RESPONSE_SEGMENT_TYPES else {}
+        query_seconds = time.monotonic() - query_start
         # Only the most recent run should possibly be open
         # If other runs are marked open due to some race condition, look at only the first.
         is_open = runs[0]['open'] if runs else False
-        choices = self.choices
-        counts = self.get_counts_for_problem(
-            [run['id'] for run in runs],
-            choices,
-        )
 
         total_counts = {
             run['id']: sum(
@@ -183,9 +540,148 @@ class RapidResponseAside(XBlockAside):
             'choices': choices,
             'counts': counts,
             'total_counts': total_counts,
+            'segmented_counts': segmented_counts,
+            'server_now': datetime.now(tz=pytz.utc).isoformat(),
+            'poll_interval_millis': get_poll_interval_millis(
+                runs[0]['id'] if is_open else None,
+                total_counts[runs[0]['id']] if is_open else 0,
+                query_seconds,
+            ),
+        })
+
+    @XBlock.handler
+    @staff_only
+    @admission_controlled
+    def timeline(self, request=None, suffix=None):  # pylint: disable=unused-argument
+        """
+        Returns the number of submissions for each answer in each time bucket of a run, so that a chart can
+        show answers arriving over time. Query parameters:
+
+            run_id: The run to look at (defaults to the most recent run)
+            bucket_seconds: The length of each bucket in seconds (defaults to 10)
+            since: Only return buckets with this index or later, so that a chart polling an open run
+                only needs to replace its last bucket and append the new ones
+
+        Archived runs get a 410, since their submissions are no longer in the database.
+        """
+        try:
+            bucket_seconds = get_int_param(
+                request, 'bucket_seconds', TIMELINE_BUCKET_SECONDS, minimum=1, maximum=TIMELINE_MAX_BUCKET_SECONDS,
+            )
+            since = get_int_param(request, 'since', 0, minimum=0)
+            run = self._get_run_for_request(request)
+        except ValueError as ex:
+            return Response(status=400, json_body=f"Invalid request: {ex}")
+        except RapidResponseRun.DoesNotExist:
+            return Response(status=404, json_body="Run not found")
+        archived_response = get_archived_run_response([run.id])
+        if archived_response is not None:
+            return archived_response
+
+        return Response(json_body={
+            'run_id': run.id,
+            'is_open': run.is_open,
+            'start': run.created.isoformat(),
+            'bucket_seconds': bucket_seconds,
+            'since': since,
+            'buckets': self.get_timeline_for_run(run, bucket_seconds, since),
             'server_now': datetime.now(tz=pytz.utc).isoformat(),
         })
 
+    @XBlock.handler
+    @staff_only
+    @admission_controlled
+    def latency(self, request=None, suffix=None):  # pylint: disable=unused-argument
+        """
+        Returns how long students took to answer after a run was opened, overall and for each choice.
+        Query parameters:
+
+            run_id: The run to look at (defaults to the most recent run)
+            bin_seconds: The width of each histogram bin in seconds (defaults to 10)
+
+        Archived runs get a 410, since their submissions are no longer in the database.
+        """
+        try:
+            bin_seconds = get_int_param(
+                request, 'bin_seconds', LATENCY_BIN_SECONDS, minimum=1, maximum=TIMELINE_MAX_BUCKET_SECONDS,
+            )
+            run = self._get_run_for_request(request)
+        except ValueError as ex:
+            return Response(status=400, json_body=f"Invalid request: {ex}")
+        except RapidResponseRun.DoesNotExist:
+            return Response(status=404, json_body="Run not found")
+        archived_response = get_archived_run_response([run.id])
+        if archived_response is not None:
+            return archived_response
+
+        return Response(json_body={
+            'run_id': run.id,
+            'is_open': run.is_open,
+            'bin_seconds': bin_seconds,
+            **self.get_latency_for_run(run.id, bin_seconds),
+        })
+
+    @XBlock.handler
+    @staff_only
+    @admission_controlled
+    def transitions(self, request=None, suffix=None):  # pylint: disable=unused-argument
+        """
+        Returns how many students moved from each choice in one run to each choice in another run of the problem,
+        for example before and after a peer discussion. Query parameters:
+
+            from_run: The earlier run
+            to_run: The later run
+
+        If either run was archived the response is a 410, since its submissions are no longer in the database.
+        """
+        try:
+            if get_int_param(request, 'from_run') is None or get_int_param(request, 'to_run') is None:
+                raise ValueError("from_run and to_run are required")
+            from_run = self._get_run_for_request(request, 'from_run')
+            to_run = self._get_run_for_request(request, 'to_run')
+        except ValueError as ex:
+            return Response(status=400, json_body=f"Invalid request: {ex}")
+        except RapidResponseRun.DoesNotExist:
+            return Response(status=404, json_body="Run not found")
+        archived_response = get_archived_run_response([from_run.id, to_run.id])
+        if archived_response is not None:
+            return archived_response
+
+        choices = self.choices
+        return Response(json_body={
+            'from_run': from_run.id,
+            'to_run': to_run.id,
+            'choices': choices,
+            **self.get_transitions_between_runs(from_run.id, to_run.id, choices),
+        })
+
+    def _get_run_for_request(self, request, param='run_id'):
+        """
+        Look up the run of this problem which a request asks for
+
+        Args:
+            request (webob.Request): A request to one of the handlers
+            param (str): The query parameter with the id of the run. If it's missing, the most recent run is used.
+
+        Returns:
+            RapidResponseRun: The run
+
+        Raises:
+            ValueError: If the parameter isn't an integer
+            RapidResponseRun.DoesNotExist: If this problem has no such run
+        """
+        run_id = get_int_param(request, param)
+        runs = RapidResponseRun.objects.filter(
+            problem_usage_key=self.wrapped_block_usage_key,
+            course_key=self.course_key,
+        )
+        if run_id is not None:
+            runs = runs.filter(id=run_id)
+        run = runs.first()
+        if run is None:
+            raise RapidResponseRun.DoesNotExist(f"No run {run_id} for {self.wrapped_block_usage_key}")
+        return run
+
     @classmethod
     def should_apply_to_block(cls, block):
         """
@@ -193,10 +689,26 @@ class RapidResponseAside(XBlockAside):
         apply to a given block.
 
         Due to the different ways that the Studio and LMS runtimes construct XBlock instances,
-        the problem type of the given block needs to be retrieved in different ways.
+        the problem type of the given block needs to be retrieved in different ways. Reading the
+        problem types may require parsing the problem, so the result is cached for each version of a block.
         """
         if getattr(block, 'category', None) != BLOCK_PROBLEM_CATEGORY:
             return False
+        return cls.has_only_multiple_choice(block)
+
+    @staticmethod
+    @cached_per_version(should_apply_cache)
+    def has_only_multiple_choice(block):
+        """
+        Check whether a problem block has a single multiple choice problem type. The result is
+        cached for each version of the block.
+
+        Args:
+            block (XBlock): A problem block
+
+        Returns:
+            bool: True if the only problem type is multiple choice
+        """
         block_problem_types = None
         # LMS passes in the block instance with `problem_types` as a property of `descriptor`
         if hasattr(block, 'descriptor'):
@@ -243,11 +755,7 @@ class RapidResponseAside(XBlockAside):
         """
         Check if there is an open run for this problem
         """
-        run = RapidResponseRun.objects.filter(
-            problem_usage_key=self.wrapped_block_usage_key,
-            course_key=self.course_key,
-        ).order_by('-created').first()
-        return run and run.open
+        return get_open_run(self.course_key, self.wrapped_block_usage_key) is not None
 
     @property
     def choices(self):
@@ -257,17 +765,20 @@ class RapidResponseAside(XBlockAside):
         Returns:
             list of dict: A list of answer id/answer text dicts, in the order the choices are listed in the XML
         """
-        problem = modulestore().get_item(self.wrapped_block_usage_key)
-        tree = problem.lcp.tree
-        choice_elements = tree.xpath('//choicegroup/choice')
         return [
-            {
-                'answer_id': choice.get('name'),
-                'answer_text': list(choice.itertext())[0] if list(choice.itertext()) else ""
-            }
-            for choice in choice_elements
+            {'answer_id': choice['answer_id'], 'answer_text': choice['answer_text']}
+            for choice in self.get_choices_with_correctness()
         ]
 
+    def get_choices_with_correctness(self):
+        """
+        Look up choices from the problem XML along with whether each one is correct
+
+        Returns:
+            list of dict: A list of answer id/answer text/correct dicts, in the order the choices are listed in the XML
+        """
+        return get_problem_choices(modulestore().get_item(self.wrapped_block_usage_key))
+
     @staticmethod
     def serialize_runs(runs):
         """
@@ -283,14 +794,149 @@ class RapidResponseAside(XBlockAside):
             {
                 'id': run.id,
                 'created': run.created.isoformat(),
-                'open': run.open,
+                'open': run.is_open,
             } for run in runs
         ]
 
+    @staticmethod
+    def get_timeline_for_run(run, bucket_seconds, since=0):
+        """
+        Produce per-answer submission counts for each time bucket of a run. Submissions are counted
+        per second in the database, and those counts are then added up into buckets.
+
+        Args:
+            run (RapidResponseRun): A run
+            bucket_seconds (int): The length of each bucket in seconds
+            since (int): Leave out buckets before this index
+
+        Returns:
+            list of list: [bucket index, answer id, count] for every bucket and answer with submissions,
+                ordered by bucket. Bucket 0 starts when the run was opened.
+        """
+        run_start = run.created.replace(microsecond=0)
+        submissions = RapidResponseSubmission.objects.filter(run_id=run.id)
+        if since:
+            submissions = submissions.filter(created__gte=run_start + timedelta(seconds=since * bucket_seconds))
+        per_second = submissions.annotate(
+            second=TruncSecond('created')
+        ).values('second', 'answer_id').annotate(count=Count('id')).order_by('second')
+
+        buckets = defaultdict(int)
+        for item in per_second:
+            bucket = max(0, int((item['second'] - run_start).total_seconds()) // bucket_seconds)
+            buckets[(bucket, item['answer_id'])] += item['count']
+        return [
+            [bucket, answer_id, count]
+            for (bucket, answer_id), count in sorted(buckets.items(), key=lambda item: (item[0][0], str(item[0][1])))
+        ]
+
+    @staticmethod
+    def summarize_latency(per_second, bin_seconds):
+        """
+        Compute percentiles and a histogram from submission counts per whole second
+
+        Args:
+            per_second (list of tuple): (second, count) pairs ordered by second
+            bin_seconds (int): The width of each histogram bin in seconds
+
+        Returns:
+            dict: The number of submissions, the percentiles (to the second) and the histogram
+                as a list of [bin index, count]
+        """
+        total = sum(count for _, count in per_second)
+        percentiles = {}
+        histogram = defaultdict(int)
+        seen = 0
+        remaining = list(LATENCY_PERCENTILES)
+        for second, count in per_second:
+            seen += count
+            # Nearest-rank percentiles: the first second at which enough submissions were made
+            while remaining and seen * 100 >= remaining[0] * total:
+                percentiles[str(remaining.pop(0))] = second
+            histogram[second // bin_seconds] += count
+        return {
+            'count': total,
+            'percentiles': percentiles,
+            'histogram': [[index, count] for index, count in sorted(histogram.items())],
+        }
+
+    @classmethod
+    def get_latency_for_run(cls, run_id, bin_seconds):
+        """
+        Produce latency statistics for a run. Submissions are counted per answer and whole second
+        in a single aggregate query, which the (run, answer_id, seconds_to_answer) index covers.
+
+        Args:
+            run_id (int): The id of a run
+            bin_seconds (int): The width of each histogram bin in seconds
+
+        Returns:
+            dict: Statistics for all submissions under 'overall' and for each answer id under 'choices'
+        """
+        per_answer_second = RapidResponseSubmission.objects.filter(
+            run_id=run_id,
+            seconds_to_answer__isnull=False,
+        ).annotate(
+            second=Floor('seconds_to_answer')
+        ).values_list('answer_id', 'second').annotate(count=Count('id')).order_by('second')
+
+        overall = defaultdict(int)
+        by_answer = defaultdict(list)
+        for answer_id, second, count in per_answer_second:
+            second = int(second)
+            overall[second] += count
+            by_answer[answer_id].append((second, count))
+
+        return {
+            'overall': cls.summarize_latency(sorted(overall.items()), bin_seconds),
+            'choices': {
+                answer_id: cls.summarize_latency(per_second, bin_seconds)
+                for answer_id, per_second in by_answer.items()
+            },
+        }
+
+    @staticmethod
+    def get_transitions_between_runs(from_run_id, to_run_id, choices):
+        """
+        Count the students who answered in both runs, grouped by their answer in each run. The submissions of
+        the later run are joined to the same user's submission in the earlier run in one aggregate query.
+
+        Args:
+            from_run_id (int): The id of the earlier run
+            to_run_id (int): The id of the later run
+            choices (list of dict): Serialized choices
+
+        Returns:
+            dict:
+                'matrix' is a mapping of answer id in the earlier run => answer id in the later run => count,
+                and 'total' is the number of students who answered in both runs
+        """
+        transition_data = RapidResponseSubmission.objects.filter(
+            run_id=to_run_id,
+            user__rapidresponsesubmission__run_id=from_run_id,
+        ).values_list(
+            'user__rapidresponsesubmission__answer_id', 'answer_id'
+        ).annotate(count=Count('id')).order_by()
+        transition_counts = {
+            (from_answer_id, to_answer_id): count for from_answer_id, to_answer_id, count in transition_data
+        }
+
+        return {
+            'matrix': {
+                from_choice['answer_id']: {
+                    to_choice['answer_id']: transition_counts.get(
+                        (from_choice['answer_id'], to_choice['answer_id']), 0
+                    )
+                    for to_choice in choices
+                } for from_choice in choices
+            },
+            'total': sum(transition_counts.values()),
+        }
+
     @staticmethod
     def get_counts_for_problem(run_ids, choices):
         """
-        Produce histogram count data for a given problem
+        Produce histogram count data for a given problem. The counts for archived runs come from their snapshots.
 
         Args:
             run_ids (list of int): Serialized run id for the problem
@@ -300,12 +946,14 @@ class RapidResponseAside(XBlockAside):
             dict:
                 A mapping of answer id => run id => count for that run
         """
-        response_data = RapidResponseSubmission.objects.filter(
-            run__id__in=run_ids
-        ).values('answer_id', 'run').annotate(count=Count('answer_id'))
-        # Make sure every answer has a count and convert to JSON serializable format
-        response_counts = {(item['answer_id'], item['run']): item['count'] for item in response_data}
+        response_counts = get_submission_backend().count_answers(run_ids)
+        for run_id, answer_counts in RapidResponseRunArchive.objects.filter(
+            run_id__in=run_ids
+        ).values_list('run_id', 'answer_counts'):
+            for answer_id, count in answer_counts.items():
+                response_counts[(answer_id, run_id)] = count
 
+        # Make sure every answer has a count and convert to JSON serializable format
         return {
             choice['answer_id']: {
                 run_id: response_counts.get((choice['answer_id'], run_id), 0)
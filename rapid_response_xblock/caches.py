@@ -0,0 +1,158 @@
+"""
+Caching for the lookups made when recording submissions.
+
+Every LMS process needs to know whether a problem currently has an open run, so that state
+is kept in the shared Django cache. It is republished when runs are opened or closed by an instructor,
+and invalidated whenever they are changed in any other way.
+"""
+from collections import namedtuple
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from rapid_response_xblock.models import RapidResponseRun
+from rapid_response_xblock.routers import get_write_database
+
+
+OPEN_RUN_CACHE_TIMEOUT = 60 * 5
+# Stored in the cache to remember that a problem has no open run. None can't be used
+# since it is what the cache returns for a missing key.
+NO_OPEN_RUN = 0
+OpenRun = namedtuple('OpenRun', ['id', 'created', 'close_at'])
+
+
+def make_cache_key(prefix, *parts):
+    """
+    Make a cache key which is safe to use with any cache backend, regardless of the length
+    or characters of the parts (e.g. opaque keys)
+
+    Args:
+        prefix (str): A prefix describing what is cached
+        *parts (any): Values which identify the cached item
+
+    Returns:
+        str: A cache key
+    """
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f"rapid_response.{prefix}.{digest}"
+
+
+def open_run_cache_key(course_key, problem_usage_key):
+    """Cache key for the open run of a problem"""
+    return make_cache_key('open_run', course_key, problem_usage_key)
+
+
+def get_open_run(course_key, problem_usage_key):
+    """
+    Look up the open run for a problem, using the shared cache if possible. A run which is past its
+    close_at time counts as closed, even before close_expired_runs has closed it.
+
+    Args:
+        course_key (CourseKey): The course key for the problem
+        problem_usage_key (UsageKey): The usage key for the problem
+
+    Returns:
+        OpenRun: The id, creation time and closing time of the open run, or None if the latest run is closed
+    """
+    key = open_run_cache_key(course_key, problem_usage_key)
+    open_run = cache.get(key)
+    if open_run is None:
+        run = RapidResponseRun.objects.filter(
+            problem_usage_key=problem_usage_key,
+            course_key=course_key,
+        ).order_by('-created').values('id', 'created', 'open', 'close_at').first()
+        open_run = OpenRun(
+            id=run['id'], created=run['created'], close_at=run['close_at'],
+        ) if run and run['open'] else NO_OPEN_RUN
+        cache.set(key, open_run, OPEN_RUN_CACHE_TIMEOUT)
+    if open_run and open_run.close_at is not None and open_run.close_at <= timezone.now():
+        return None
+    return open_run or None
+
+
+def invalidate_open_runs(course_key, problem_usage_keys):
+    """
+    Remove cached open runs for some problems. This should be called once after runs are changed.
+
+    Args:
+        course_key (CourseKey): The course key for the problems
+        problem_usage_keys (iterable of UsageKey): The usage keys for the problems
+    """
+    keys = [open_run_cache_key(course_key, problem_usage_key) for problem_usage_key in problem_usage_keys]
+
+    def delete_keys():
+        """Delete the cached open runs"""
+        cache.delete_many(keys)
+
+    # Deleting right away keeps this process consistent, and deleting again after the commit
+    # prevents another process from caching the state from before the change in the meantime.
+    delete_keys()
+    transaction.on_commit(delete_keys, using=get_write_database())
+
+
+def publish_open_runs(course_key, runs):
+    """
+    Put the new state of some problems in the cache after their runs were opened or closed, so that
+    the first submissions and polls on every LMS process don't have to look it up in the database
+
+    Args:
+        course_key (CourseKey): The course key for the problems
+        runs (dict): A mapping of problem usage key => the most recent RapidResponseRun for the problem,
+            or None if it has never been opened
+    """
+    open_runs = {
+        open_run_cache_key(course_key, problem_usage_key): OpenRun(
+            id=run.id, created=run.created, close_at=run.close_at,
+        ) if run is not None and run.open else NO_OPEN_RUN
+        for problem_usage_key, run in runs.items()
+    }
+
+    def set_open_runs():
+        """Cache the open runs"""
+        cache.set_many(open_runs, OPEN_RUN_CACHE_TIMEOUT)
+
+    # Other processes must not see a run before it is committed, so the old state is removed
+    # right away and the new one is only published once the change is committed.
+    cache.delete_many(list(open_runs))
+    transaction.on_commit(set_open_runs, using=get_write_database())
+
+
+def read_pin_cache_key(course_key, problem_usage_key=None):
+    """Cache key which marks that reads for a problem, or for any problem in a course, should not go to the replica"""
+    return make_cache_key('read_pin', course_key, problem_usage_key)
+
+
+def pin_reads_to_database(course_key, problem_usage_keys):
+    """
+    Send reads for some problems to the database instead of the replica for a short time after their runs
+    were changed, so that staff see their own changes even if the replica is lagging behind
+
+    Args:
+        course_key (CourseKey): The course key for the problems
+        problem_usage_keys (iterable of UsageKey): The usage keys for the problems
+    """
+    if not settings.RAPID_RESPONSE_READ_DATABASE:
+        return
+    pins = {read_pin_cache_key(course_key, problem_usage_key): True for problem_usage_key in problem_usage_keys}
+    pins[read_pin_cache_key(course_key)] = True
+    cache.set_many(pins, settings.RAPID_RESPONSE_READ_PIN_SECONDS)
+
+
+def is_read_pinned(course_key, problem_usage_key=None):
+    """
+    Check whether the reads for a problem should go to the database instead of the replica
+
+    Args:
+        course_key (CourseKey): The course key for the problem
+        problem_usage_key (UsageKey): The usage key for the problem, or None to check for reads
+            across the whole course
+
+    Returns:
+        bool: True if the runs for the problem, or for any problem in the course, were changed moments ago
+    """
+    if not settings.RAPID_RESPONSE_READ_DATABASE:
+        return False
+    return bool(cache.get(read_pin_cache_key(course_key, problem_usage_key)))
@@ -6,5 +6,11 @@ def plugin_settings(settings):
     Populate CMS settings
     """
     settings.ENABLE_RAPID_RESPONSE_AUTHOR_VIEW = False
+    # See settings.py
+    settings.RAPID_RESPONSE_DATABASE = 'default'
+    settings.RAPID_RESPONSE_READ_DATABASE = None
+    settings.RAPID_RESPONSE_READ_PIN_SECONDS = 10
+    settings.RAPID_RESPONSE_SUBMISSION_BACKEND = 'rapid_response_xblock.backends.DatabaseSubmissionBackend'
+    settings.RAPID_RESPONSE_SUBMISSION_LOG_PATH = None
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
@@ -0,0 +1,8 @@
+"""
+Constants shared by the aside and the submission recorder.
+
+The tracking backend which records submissions is loaded in every LMS process, so this module
+must not import anything from XBlock, the modulestore or the templating code.
+"""
+BLOCK_PROBLEM_CATEGORY = 'problem'
+MULTIPLE_CHOICE_TYPE = 'multiplechoiceresponse'
@@ -0,0 +1,369 @@
+"""
+Course-wide exports of rapid response submissions.
+
+Exports are written in chunks so that only one chunk of rows is ever held in memory. Each chunk
+is saved as a separate part file, and the progress is recorded on the RapidResponseExportJob after
+every chunk, so an interrupted export picks up where it left off. The submissions of archived runs
+are exported after the ones in the submission backend, one run at a time and in chunks of the same size, which are
+streamed from the archive. Once every chunk is written the parts are combined into a single zip archive.
+"""
+import csv
+from datetime import datetime
+import io
+from itertools import dropwhile, islice
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.module_loading import import_string
+
+from rapid_response_xblock.archives import read_archived_submissions
+from rapid_response_xblock.backends import get_submission_backend
+from rapid_response_xblock.models import (
+    RapidResponseExportJob,
+    RapidResponseRun,
+    RapidResponseRunArchive,
+)
+from rapid_response_xblock.routers import get_write_database, read_from_replica
+
+
+log = logging.getLogger(__name__)
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_DIRECTORY = 'rapid_response_exports'
+EXPORT_COLUMNS = [
+    ('id', 'submission_id'),
+    ('run_id', 'run_id'),
+    ('run__problem_usage_key', 'problem_usage_key'),
+    ('run__created', 'run_created'),
+    ('created', 'created'),
+    ('answer_id', 'answer_id'),
+    ('answer_text', 'answer_text'),
+    ('user__username', 'username'),
+    ('user__email', 'email'),
+    ('correct', 'correct'),
+]
+# The values of each submission needed for the rows, leaving out the event which can be large
+EXPORT_SUBMISSION_FIELDS = ['id', 'run_id', 'user_id', 'created', 'answer_id', 'answer_text', 'correct']
+
+
+def format_value(value):
+    """Format a value from the database for a CSV file"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def get_export_storage():
+    """
+    Get the storage which exports are written to
+
+    Returns:
+        django.core.files.storage.Storage: The storage configured with RAPID_RESPONSE_EXPORT_STORAGE,
+            or the default storage if that isn't set
+    """
+    storage_class = settings.RAPID_RESPONSE_EXPORT_STORAGE
+    if storage_class:
+        return import_string(storage_class)()
+    return default_storage
+
+
+def get_export_directory(job):
+    """The directory in storage where the files for an export job are kept"""
+    course_directory = str(job.course_key).replace(':', '_').replace('+', '_')
+    return f"{EXPORT_DIRECTORY}/{course_directory}/{job.id}"
+
+
+def get_part_path(job, part_number):
+    """The path in storage of a part file for an export job"""
+    return f"{get_export_directory(job)}/part-{part_number:05d}.csv"
+
+
+def get_export_runs(job):
+    """
+    Get the runs whose submissions are still stored by the submission backend for an export job
+
+    Args:
+        job (RapidResponseExportJob): An export job
+
+    Returns:
+        QuerySet: The runs for the job which haven't been archived, with only the fields which are exported
+    """
+    runs = RapidResponseRun.objects.filter(
+        course_key=job.course_key, archive__isnull=True,
+    ).only('id', 'problem_usage_key', 'created')
+    if job.runs_created_after is not None:
+        runs = runs.filter(created__gte=job.runs_created_after)
+    if job.runs_created_before is not None:
+        runs = runs.filter(created__lt=job.runs_created_before)
+    return runs
+
+
+def get_export_archives(job):
+    """
+    Get the archived runs which should be exported for a job, in the order they are exported
+
+    Args:
+        job (RapidResponseExportJob): An export job
+
+    Returns:
+        QuerySet: The RapidResponseRunArchive records for the job
+    """
+    archives = RapidResponseRunArchive.objects.filter(run__course_key=job.course_key)
+    if job.runs_created_after is not None:
+        archives = archives.filter(run__created__gte=job.runs_created_after)
+    if job.runs_created_before is not None:
+        archives = archives.filter(run__created__lt=job.runs_created_before)
+    return archives.select_related('run').order_by('run_id')
+
+
+def get_export_rows(submissions, runs):
+    """
+    Build the rows to export for some submissions
+
+    Args:
+        submissions (list of dict): Submissions with the values of EXPORT_SUBMISSION_FIELDS
+        runs (dict): A mapping of run id => RapidResponseRun for every run of the submissions
+
+    Returns:
+        list of list: The rows, with the columns in EXPORT_COLUMNS
+    """
+    users = {
+        user_id: (username, email) for user_id, username, email in get_user_model().objects.filter(
+            id__in={submission['user_id'] for submission in submissions}
+        ).values_list('id', 'username', 'email')
+    }
+    rows = []
+    for submission in submissions:
+        run = runs[submission['run_id']]
+        username, email = users.get(submission['user_id'], (None, None))
+        values = {
+            'id': submission['id'],
+            'run_id': run.id,
+            'run__problem_usage_key': run.problem_usage_key,
+            'run__created': run.created,
+            'created': submission['created'],
+            'answer_id': submission['answer_id'],
+            'answer_text': submission['answer_text'],
+            'user__username': username,
+            'user__email': email,
+            'correct': submission['correct'],
+        }
+        rows.append([values[field] for field, _ in EXPORT_COLUMNS])
+    return rows
+
+
+def get_archived_export_rows(archive, after_id, limit):
+    """
+    Read the next rows to export for an archived run, without reading the rest of the archive into memory
+
+    Args:
+        archive (RapidResponseRunArchive): The archive record for a run
+        after_id (int): Only read submissions with an id greater than this
+        limit (int): The maximum number of rows to read
+
+    Returns:
+        list of list: The rows, with the same columns as the rows exported from the submission backend
+    """
+    submissions = [
+        dict(submission, run_id=archive.run_id) for submission in islice(
+            dropwhile(lambda submission: submission['id'] <= after_id, read_archived_submissions(archive)),
+            limit,
+        )
+    ]
+    return get_export_rows(submissions, {archive.run_id: archive.run})
+
+
+def start_export_job(course_key, runs_created_after=None, runs_created_before=None):
+    """
+    Create an export job for the runs of a course and start it in the background
+
+    Args:
+        course_key (CourseKey): The course to export
+        runs_created_after (datetime): If set, only export runs created at or after this time
+        runs_created_before (datetime): If set, only export runs created before this time
+
+    Returns:
+        RapidResponseExportJob: The new export job
+    """
+    # Importing the task here since tasks imports this module
+    from rapid_response_xblock.tasks import export_course_runs  # pylint: disable=import-outside-toplevel
+
+    job = RapidResponseExportJob.objects.create(
+        course_key=course_key,
+        runs_created_after=runs_created_after,
+        runs_created_before=runs_created_before,
+    )
+    # The worker must not look for the job before it is committed
+    transaction.on_commit(lambda: export_course_runs.delay(job.id), using=get_write_database())
+    return job
+
+
+def write_export_part(job, storage, rows):
+    """
+    Write rows to the next part file of an export job. The job is updated but not saved.
+
+    Args:
+        job (RapidResponseExportJob): An export job
+        storage (django.core.files.storage.Storage): The storage to write to
+        rows (list of list): The rows to write
+    """
+    content = io.StringIO()
+    csv.writer(content).writerows([format_value(value) for value in row] for row in rows)
+    part_path = get_part_path(job, job.num_parts)
+    # The part may have been written before an interruption which happened before the job was saved
+    if storage.exists(part_path):
+        storage.delete(part_path)
+    storage.save(part_path, io.BytesIO(content.getvalue().encode('utf-8')))
+
+    job.processed_rows += len(rows)
+    job.num_parts += 1
+
+
+def write_export_chunk(job, storage, chunk_size, runs):
+    """
+    Write the next chunk of submissions for an export job to a new part file and record the progress.
+    Once the submissions in the backend are all written, the chunks are read from the archived runs.
+
+    Args:
+        job (RapidResponseExportJob): An export job
+        storage (django.core.files.storage.Storage): The storage to write to
+        chunk_size (int): The maximum number of rows to write
+        runs (dict): A mapping of run id => RapidResponseRun for the runs returned by get_export_runs
+
+    Returns:
+        bool: True if a chunk was written, False if there were no rows left to export
+    """
+    with read_from_replica():
+        submissions = get_submission_backend().list_submissions(
+            list(runs), after_id=job.last_submission_id, limit=chunk_size, fields=EXPORT_SUBMISSION_FIELDS,
+        ) if runs else []
+        rows = get_export_rows(submissions, runs)
+    if rows:
+        write_export_part(job, storage, rows)
+        job.last_submission_id = rows[-1][0]
+        job.save()
+        return True
+
+    with read_from_replica():
+        archive = get_export_archives(job).filter(run_id__gt=job.last_archived_run_id).first()
+    if archive is None:
+        return False
+    rows = get_archived_export_rows(archive, job.last_archived_submission_id, chunk_size)
+    if rows:
+        write_export_part(job, storage, rows)
+    if len(rows) < chunk_size:
+        job.last_archived_run_id = archive.run_id
+        job.last_archived_submission_id = 0
+    else:
+        job.last_archived_submission_id = rows[-1][0]
+    job.save()
+    return True
+
+
+def write_export_archive(job, storage):
+    """
+    Combine the part files of an export job into one zip archive containing a single CSV file,
+    then delete the parts
+
+    Args:
+        job (RapidResponseExportJob): An export job which has written all of its parts
+        storage (django.core.files.storage.Storage): The storage to write to
+
+    Returns:
+        str: The path of the archive in storage
+    """
+    archive_path = f"{get_export_directory(job)}.zip"
+    with tempfile.TemporaryFile() as archive_file:
+        with zipfile.ZipFile(archive_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open('submissions.csv', 'w') as csv_file:
+                header = io.StringIO()
+                csv.writer(header).writerow([column for _, column in EXPORT_COLUMNS])
+                csv_file.write(header.getvalue().encode('utf-8'))
+                for part_number in range(job.num_parts):
+                    with storage.open(get_part_path(job, part_number), 'rb') as part:
+                        shutil.copyfileobj(part, csv_file)
+        archive_file.seek(0)
+        if storage.exists(archive_path):
+            storage.delete(archive_path)
+        archive_path = storage.save(archive_path, File(archive_file, name=os.path.basename(archive_path)))
+
+    for part_number in range(job.num_parts):
+        storage.delete(get_part_path(job, part_number))
+    return archive_path
+
+
+def process_export_job(job_id, storage=None, chunk_size=EXPORT_CHUNK_SIZE, max_chunks=None):
+    """
+    Run or resume an export job
+
+    Args:
+        job_id (int): The id of a RapidResponseExportJob
+        storage (django.core.files.storage.Storage): The storage to write to, or None to use the configured storage
+        chunk_size (int): The number of rows in each chunk
+        max_chunks (int): If set, stop after writing this many chunks so the job can be continued later
+
+    Returns:
+        RapidResponseExportJob: The export job
+    """
+    job = RapidResponseExportJob.objects.get(id=job_id)
+    if job.status == RapidResponseExportJob.STATUS_COMPLETE:
+        return job
+    storage = storage or get_export_storage()
+
+    try:
+        with read_from_replica():
+            runs = get_export_runs(job).in_bulk()
+        if job.total_rows is None:
+            with read_from_replica():
+                job.total_rows = sum(get_submission_backend().count_answers(list(runs)).values()) + (
+                    get_export_archives(job).aggregate(total=Sum('num_submissions'))['total'] or 0
+                )
+        job.status = RapidResponseExportJob.STATUS_RUNNING
+        job.error = ''
+        job.save()
+
+        chunks_written = 0
+        while max_chunks is None or chunks_written < max_chunks:
+            if not write_export_chunk(job, storage, chunk_size, runs):
+                job.archive_path = write_export_archive(job, storage)
+                job.status = RapidResponseExportJob.STATUS_COMPLETE
+                job.save()
+                break
+            chunks_written += 1
+    except Exception as ex:
+        log.exception("Unable to export rapid response submissions for job %s", job_id)
+        job.status = RapidResponseExportJob.STATUS_FAILED
+        job.error = str(ex)
+        job.save()
+        raise
+    return job
+
+
+def serialize_export_job(job):
+    """
+    Serialize an export job so that its progress can be polled
+
+    Args:
+        job (RapidResponseExportJob): An export job
+
+    Returns:
+        dict: The serialized export job
+    """
+    return {
+        'id': job.id,
+        'course_key': str(job.course_key),
+        'status': job.status,
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'archive_path': job.archive_path,
+        'error': job.error,
+    }
@@ -0,0 +1,122 @@
+"""
+Recording answers which come from outside the LMS, such as classroom clickers or a separate mobile app.
+
+The answers are recorded in the open run of a problem just like answers recorded by SubmissionRecorder,
+but a whole batch is written at once instead of one problem_check event at a time.
+"""
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from rapid_response_xblock.backends import get_submission_backend, SubmissionRecord
+from rapid_response_xblock.constants import MULTIPLE_CHOICE_TYPE
+from rapid_response_xblock.segments import get_many_segments_for_run
+from common.djangoapps.student.models import CourseEnrollment
+
+
+EXTERNAL_SUBMISSION_EVENT_NAME = 'rapid_response.external_submission'
+MAX_EXTERNAL_SUBMISSIONS = 1000
+
+
+def get_users_by_identifier(identifiers):
+    """
+    Look up users by username, or by email for identifiers which aren't a username
+
+    Args:
+        identifiers (iterable of str): Usernames or emails
+
+    Returns:
+        dict: A mapping of identifier => user id, leaving out identifiers which don't match a user
+    """
+    identifiers = set(identifiers)
+    users = dict(get_user_model().objects.filter(username__in=identifiers).values_list('username', 'id'))
+    emails = identifiers - set(users)
+    if emails:
+        users.update(get_user_model().objects.filter(email__in=emails).values_list('email', 'id'))
+    return users
+
+
+def get_enrolled_user_ids(course_key, user_ids):
+    """
+    Find which users are actively enrolled in a course
+
+    Args:
+        course_key (CourseKey): The course
+        user_ids (iterable of int): User ids
+
+    Returns:
+        set of int: The ids of the users who are enrolled
+    """
+    return set(CourseEnrollment.objects.filter(
+        course_id=course_key,
+        user_id__in=set(user_ids),
+        is_active=True,
+    ).values_list('user_id', flat=True))
+
+
+def record_external_submissions(open_run, course_key, problem_usage_key, choices, answers, source=''):
+    """
+    Record answers from an external source in the open run of a problem. Each answer replaces the
+    user's previous answer in the run, and if a user answers more than once in a batch the last answer is kept.
+    Answers from users who aren't enrolled in the course are reported as errors.
+
+    Args:
+        open_run (OpenRun): The open run of the problem
+        course_key (CourseKey): The course of the problem
+        problem_usage_key (UsageKey): The problem
+        choices (list of dict): The choices of the problem, with a correct flag for each one
+        answers (list of dict): Answers with a user (a username or email) and an answer_id
+        source (str): A description of where the answers came from, stored with each submission
+
+    Returns:
+        (int, list of dict): The number of answers recorded, and an error with the index of each answer
+            which wasn't recorded
+    """
+    choices_by_id = {choice['answer_id']: choice for choice in choices}
+    user_ids = get_users_by_identifier(answer['user'] for answer in answers)
+    enrolled_user_ids = get_enrolled_user_ids(course_key, user_ids.values())
+    segments = get_many_segments_for_run(enrolled_user_ids, course_key, open_run.id)
+    seconds_to_answer = max(0.0, (timezone.now() - open_run.created).total_seconds())
+
+    records = []
+    errors = []
+    for index, answer in enumerate(answers):
+        choice = choices_by_id.get(answer['answer_id'])
+        user_id = user_ids.get(answer['user'])
+        if choice is None:
+            errors.append({'index': index, 'error': f"Unknown answer_id {answer['answer_id']}"})
+            continue
+        if user_id is None:
+            errors.append({'index': index, 'error': f"Unknown user {answer['user']}"})
+            continue
+        if user_id not in enrolled_user_ids:
+            errors.append({'index': index, 'error': f"User {answer['user']} is not enrolled in the course"})
+            continue
+        records.append(SubmissionRecord(
+            run_id=open_run.id,
+            user_id=user_id,
+            answer_id=choice['answer_id'],
+            answer_text=choice['answer_text'],
+            correct=choice['correct'],
+            seconds_to_answer=seconds_to_answer,
+            segments=segments[user_id],
+            # Shaped like a problem_check event so that reports can read it the same way
+            event={
+                'name': EXTERNAL_SUBMISSION_EVENT_NAME,
+                'context': {'user_id': user_id, 'course_id': str(course_key)},
+                'event': {
+                    'problem_id': str(problem_usage_key),
+                    'source': source,
+                    'answers': {choice['answer_id']: choice['answer_id']},
+                    'submission': {
+                        choice['answer_id']: {
+                            'answer': choice['answer_text'],
+                            'correct': choice['correct'],
+                            'response_type': MULTIPLE_CHOICE_TYPE,
+                        },
+                    },
+                },
+            },
+        ))
+
+    get_submission_backend().record_submissions(records)
+    return len(records), errors
@@ -1,27 +1,98 @@
 """
 Capture events
+
+This module is loaded with the tracking backends in every LMS process, so it only imports what is
+needed to record submissions. Nothing here may import rapid_response_xblock.block, which pulls in XBlock,
+the modulestore and the templating code.
 """
+import hashlib
+import json
 import logging
 from collections import namedtuple
+from functools import lru_cache
+import threading
 
-from django.db import transaction
+from cachetools import LRUCache
+from django.utils import timezone
 from opaque_keys.edx.keys import UsageKey
 from opaque_keys.edx.locator import CourseLocator
-from rapid_response_xblock.models import (
-    RapidResponseRun,
-    RapidResponseSubmission,
-)
-from rapid_response_xblock.block import MULTIPLE_CHOICE_TYPE
+from rapid_response_xblock.caches import get_open_run
+from rapid_response_xblock.backends import get_submission_backend, SubmissionRecord
+from rapid_response_xblock.constants import MULTIPLE_CHOICE_TYPE
+from rapid_response_xblock.segments import get_segments_for_run
 from common.djangoapps.track.backends import BaseBackend
 
 
 log = logging.getLogger(__name__)
+PROBLEM_CHECK_EVENT_NAME = 'problem_check'
+# The same handful of problem and course ids show up over and over during a lecture,
+# so the parsed opaque keys are kept around instead of being re-parsed on every event.
+OPAQUE_KEY_CACHE_SIZE = 1024
+# How many (run, user) pairs to remember the latest recorded event for, so that duplicate deliveries
+# of an event which was just recorded are dropped without touching the database
+RECENT_EVENTS_CACHE_SIZE = 4096
 SubmissionEvent = namedtuple(
     'SubmissionEvent',
-    ['raw_data', 'user_id', 'problem_usage_key', 'course_key', 'answer_text', 'answer_id']
+    ['raw_data', 'user_id', 'problem_usage_key', 'course_key', 'answer_text', 'answer_id', 'correct']
 )
 
 
+@lru_cache(maxsize=OPAQUE_KEY_CACHE_SIZE)
+def parse_usage_key(usage_key_string):
+    """
+    Parse a usage key string, reusing the result for strings which were seen recently
+
+    Args:
+        usage_key_string (str): A serialized usage key
+
+    Returns:
+        opaque_keys.edx.keys.UsageKey: The parsed usage key
+    """
+    return UsageKey.from_string(usage_key_string)
+
+
+@lru_cache(maxsize=OPAQUE_KEY_CACHE_SIZE)
+def parse_course_key(course_key_string):
+    """
+    Parse a course key string, reusing the result for strings which were seen recently
+
+    Args:
+        course_key_string (str): A serialized course key
+
+    Returns:
+        opaque_keys.edx.locator.CourseLocator: The parsed course key
+    """
+    return CourseLocator.from_string(course_key_string)
+
+
+def get_event_id(event):
+    """
+    Make an identity for a tracking event which is the same for every copy of the event, so that an event
+    which is delivered more than once (e.g. on a retry) can be recognized
+
+    Args:
+        event (dict): Raw event data
+
+    Returns:
+        str: The identity of the event, or None if the event has no timestamp to tell it apart
+            from a later submission of the same answer
+    """
+    context = event.get('context') or {}
+    timestamp = event.get('time') or context.get('time')
+    if not timestamp:
+        return None
+    event_data = event.get('data') or {}
+    identity = [
+        context.get('user_id'),
+        context.get('course_id'),
+        event_data.get('problem_id'),
+        event_data.get('attempts'),
+        event_data.get('answers'),
+        timestamp,
+    ]
+    return hashlib.md5(json.dumps(identity, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
 class SubmissionRecorder(BaseBackend):
     """
     Record events emitted by blocks.
@@ -31,6 +102,14 @@ class SubmissionRecorder(BaseBackend):
     http://edx.readthedocs.io/projects/devdata/en/stable/
     internal_data_formats/tracking_logs.html
     """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # (run id, user id) => the identity of the event last recorded for that user in that run
+        self.recent_events = LRUCache(maxsize=RECENT_EVENTS_CACHE_SIZE)
+        self.recent_events_lock = threading.Lock()
+        # The number of duplicate events which were not recorded by this process
+        self.suppressed_duplicates = 0
+
     @staticmethod
     def parse_submission_event(event):
         """
@@ -45,7 +124,7 @@ class SubmissionRecorder(BaseBackend):
              SubmissionEvent: The parsed submission event data (or None)
         """
         # Ignore if this event was not the submission of an answer
-        if event.get('name') != 'problem_check':
+        if event.get('name') != PROBLEM_CHECK_EVENT_NAME:
             return None
         # Ignore if there were multiple or no submissions represented in this single event
         event_data = event.get('data')
@@ -53,10 +132,10 @@ class SubmissionRecorder(BaseBackend):
             return None
 
         event_submissions = event_data.get('submission')
-        if len(event_submissions) != 1:
+        if not isinstance(event_submissions, dict) or len(event_submissions) != 1:
             return None
 
-        submission_key, submission = list(event_submissions.items())[0]
+        submission_key, submission = next(iter(event_submissions.items()))
         # Ignore if the problem being answered has a blank submission or is not multiple choice
         if not submission or submission.get('response_type') != MULTIPLE_CHOICE_TYPE:
             return None
@@ -65,42 +144,74 @@ class SubmissionRecorder(BaseBackend):
             return SubmissionEvent(
                 raw_data=event,
                 user_id=event['context']['user_id'],
-                problem_usage_key=UsageKey.from_string(
-                    event_data['problem_id']
-                ),
-                course_key=CourseLocator.from_string(
-                    event['context']['course_id']
-                ),
+                problem_usage_key=parse_usage_key(event_data['problem_id']),
+                course_key=parse_course_key(event['context']['course_id']),
                 answer_text=submission['answer'],
-                answer_id=event_data['answers'][submission_key]
+                answer_id=event_data['answers'][submission_key],
+                correct=submission.get('correct'),
             )
         except:  # pylint: disable=bare-except
             log.exception("Unable to parse event data as a submission: %s", event)
 
     def send(self, event):
+        # Almost every event emitted by the LMS is something other than an answer submission,
+        # so reject those before doing any other work.
+        if event.get('name') != PROBLEM_CHECK_EVENT_NAME:
+            return
+
         sub = self.parse_submission_event(event)
         # If the event could not be parsed or was the wrong type, ignore it
         if sub is None:
             return
 
-        open_run = RapidResponseRun.objects.filter(
-            problem_usage_key=sub.problem_usage_key,
-            course_key=sub.course_key
-        ).order_by('-created').first()
-        if not open_run or not open_run.open:
+        open_run = get_open_run(sub.course_key, sub.problem_usage_key)
+        if open_run is None:
             # Problem is not open
             return
 
-        # Delete any older responses for the user
-        with transaction.atomic():
-            RapidResponseSubmission.objects.filter(
-                user_id=sub.user_id,
-                run=open_run,
-            ).delete()
-            RapidResponseSubmission.objects.create(
-                user_id=sub.user_id,
-                run=open_run,
-                event=sub.raw_data,
-                answer_id=sub.answer_id,
-                answer_text=sub.answer_text,
-            )
+        # Stored with the submission so that latency statistics don't need to compute it for every row
+        seconds_to_answer = max(0.0, (timezone.now() - open_run.created).total_seconds())
+
+        event_id = get_event_id(event)
+        recent_key = (open_run.id, sub.user_id)
+        if event_id is not None:
+            with self.recent_events_lock:
+                recent_event_id = self.recent_events.get(recent_key)
+            if recent_event_id == event_id:
+                self.suppress_duplicate(sub)
+                return
+
+        segments = get_segments_for_run(sub.user_id, sub.course_key, open_run.id)
+
+        # Replaces any older response for the user, unless the backend already has this event
+        recorded = get_submission_backend().record_submission(SubmissionRecord(
+            run_id=open_run.id,
+            user_id=sub.user_id,
+            answer_id=sub.answer_id,
+            answer_text=sub.answer_text,
+            correct=sub.correct,
+            seconds_to_answer=seconds_to_answer,
+            segments=segments,
+            event=sub.raw_data,
+            event_id=event_id,
+        ))
+        if event_id is not None:
+            with self.recent_events_lock:
+                self.recent_events[recent_key] = event_id
+        if not recorded:
+            self.suppress_duplicate(sub)
+
+    def suppress_duplicate(self, sub):
+        """
+        Count a duplicate delivery of a submission event which was already recorded
+
+        Args:
+            sub (SubmissionEvent): The duplicate submission
+        """
+        self.suppressed_duplicates += 1
+        log.debug(
+            "Ignored a duplicate submission event from user %s for %s (%d so far)",
+            sub.user_id,
+            sub.problem_usage_key,
+            self.suppressed_duplicates,
+        )
@@ -0,0 +1,46 @@
+"""Management command to archive the submissions of rapid response runs which were closed long ago"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from rapid_response_xblock.archives import archive_closed_runs, get_archivable_runs, is_archiving_supported
+
+
+class Command(BaseCommand):
+    """
+    Move the submissions of runs which were closed more than a number of days ago into compressed
+    files in storage. The counts for each run are kept in the database.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Archive runs closed more than this many days ago (defaults to RAPID_RESPONSE_ARCHIVE_AFTER_DAYS)',
+        )
+        parser.add_argument('--course', help='Only archive runs for this course')
+        parser.add_argument('--dry-run', action='store_true', help='List the runs which would be archived')
+
+    def handle(self, *args, **options):
+        if not is_archiving_supported():
+            raise CommandError("Runs can only be archived with the database submission backend")
+        days = options['days'] if options['days'] is not None else settings.RAPID_RESPONSE_ARCHIVE_AFTER_DAYS
+        if days < 0:
+            raise CommandError("--days must not be negative")
+        course_key = None
+        if options['course']:
+            try:
+                course_key = CourseKey.from_string(options['course'])
+            except InvalidKeyError as ex:
+                raise CommandError(f"Invalid course key: {options['course']}") from ex
+
+        if options['dry_run']:
+            run_ids = list(get_archivable_runs(days, course_key=course_key).values_list('id', flat=True))
+            self.stdout.write(f"Would archive {len(run_ids)} runs: {run_ids}")
+            return
+
+        archives = archive_closed_runs(days, course_key=course_key)
+        num_submissions = sum(archive.num_submissions for archive in archives)
+        self.stdout.write(f"Archived {num_submissions} submissions from {len(archives)} runs")
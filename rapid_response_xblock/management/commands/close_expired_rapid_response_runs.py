@@ -0,0 +1,16 @@
+"""Management command to close rapid response runs which are past their closing time"""
+from django.core.management.base import BaseCommand
+
+from rapid_response_xblock.runs import close_expired_runs
+
+
+class Command(BaseCommand):
+    """
+    Close every open run which was opened with a time limit that has passed. Run this regularly,
+    for example from cron, or schedule the close_expired_rapid_response_runs celery task instead.
+    """
+    help = __doc__
+
+    def handle(self, *args, **options):
+        num_closed = close_expired_runs()
+        self.stdout.write(f"Closed {num_closed} expired runs")
@@ -0,0 +1,52 @@
+"""Management command to export the rapid response submissions of a course"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from rapid_response_xblock.exports import EXPORT_CHUNK_SIZE, process_export_job
+from rapid_response_xblock.models import RapidResponseExportJob
+
+
+def parse_datetime_option(value):
+    """Parse an ISO 8601 datetime passed on the command line"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f"Invalid datetime: {value}")
+    return parsed
+
+
+class Command(BaseCommand):
+    """
+    Export every run of a course (or the runs created in a date range) to one archive in file storage.
+    Pass --job-id to resume an export which was interrupted.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_key', nargs='?', help='The course to export')
+        parser.add_argument('--after', help='Only export runs created at or after this ISO 8601 datetime')
+        parser.add_argument('--before', help='Only export runs created before this ISO 8601 datetime')
+        parser.add_argument('--job-id', type=int, help='Resume an existing export job')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows per chunk')
+
+    def handle(self, *args, **options):
+        if options['job_id']:
+            if not RapidResponseExportJob.objects.filter(id=options['job_id']).exists():
+                raise CommandError(f"No export job with id {options['job_id']}")
+            job_id = options['job_id']
+        else:
+            if not options['course_key']:
+                raise CommandError("A course key or --job-id is required")
+            try:
+                course_key = CourseKey.from_string(options['course_key'])
+            except InvalidKeyError as ex:
+                raise CommandError(f"Invalid course key: {options['course_key']}") from ex
+            job_id = RapidResponseExportJob.objects.create(
+                course_key=course_key,
+                runs_created_after=parse_datetime_option(options['after']) if options['after'] else None,
+                runs_created_before=parse_datetime_option(options['before']) if options['before'] else None,
+            ).id
+
+        job = process_export_job(job_id, chunk_size=options['chunk_size'])
+        self.stdout.write(f"Exported {job.processed_rows} submissions to {job.archive_path} (job {job.id})")
@@ -0,0 +1,50 @@
+"""Management command to summarize the rapid response submissions of a course for end of term reports"""
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from rapid_response_xblock.analytics import (
+    ANALYTICS_CHUNK_SIZE,
+    load_course_submissions,
+    summarize_submissions,
+    write_course_summary,
+)
+
+
+class Command(BaseCommand):
+    """
+    Write a CSV file with one row per problem of a course, covering every run of the problem: participation,
+    choice entropy, percent correct, and the shift in answers between the first and last runs. Requires NumPy.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_key', help='The course to summarize')
+        parser.add_argument('--output', help='The file to write the summary to (defaults to standard output)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=ANALYTICS_CHUNK_SIZE, help='Submissions to read at a time'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_key'])
+        except InvalidKeyError as ex:
+            raise CommandError(f"Invalid course key: {options['course_key']}") from ex
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        try:
+            submissions = load_course_submissions(course_key, chunk_size=options['chunk_size'])
+        except ImportError as ex:
+            raise CommandError("NumPy is required to summarize a course") from ex
+        summary = summarize_submissions(submissions)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as summary_file:
+                write_course_summary(summary, summary_file)
+            self.stdout.write(
+                f"Summarized {len(submissions.run_index)} submissions for {len(summary)} problems "
+                f"to {options['output']}"
+            )
+        else:
+            write_course_summary(summary, self.stdout)
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def get_correct(event):
+    """Read whether the answer was correct from a raw problem_check event"""
+    event_data = event.get('event', {}) or event.get('data', {})
+    try:
+        correct = list(event_data['submission'].values())[0]['correct']
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+    if isinstance(correct, str):
+        return correct.lower() == 'true'
+    return bool(correct)
+
+
+def backfill_correct(apps, schema_editor):
+    """Fill in the correct column for existing submissions"""
+    RapidResponseSubmission = apps.get_model('rapid_response_xblock', 'RapidResponseSubmission')
+    batch = []
+    for submission in RapidResponseSubmission.objects.filter(
+        correct__isnull=True
+    ).only('id', 'event').iterator(chunk_size=BATCH_SIZE):
+        submission.correct = get_correct(submission.event or {})
+        batch.append(submission)
+        if len(batch) == BATCH_SIZE:
+            RapidResponseSubmission.objects.bulk_update(batch, ['correct'])
+            batch = []
+    if batch:
+        RapidResponseSubmission.objects.bulk_update(batch, ['correct'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0005_remove_run_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponsesubmission',
+            name='correct',
+            field=models.BooleanField(null=True),
+        ),
+        migrations.RunPython(backfill_correct, migrations.RunPython.noop),
+    ]
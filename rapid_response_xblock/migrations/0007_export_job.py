@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:58
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+import opaque_keys.edx.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0006_submission_correct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RapidResponseExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('course_key', opaque_keys.edx.django.models.CourseKeyField(db_index=True, max_length=255)),
+                ('runs_created_after', models.DateTimeField(blank=True, null=True)),
+                ('runs_created_before', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('total_rows', models.IntegerField(blank=True, null=True)),
+                ('processed_rows', models.IntegerField(default=0)),
+                ('num_parts', models.IntegerField(default=0)),
+                ('last_submission_id', models.IntegerField(default=0)),
+                ('archive_path', models.CharField(blank=True, max_length=1024)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_seconds_to_answer(apps, schema_editor):
+    """Fill in the seconds_to_answer column for existing submissions which belong to a run"""
+    RapidResponseSubmission = apps.get_model('rapid_response_xblock', 'RapidResponseSubmission')
+    batch = []
+    for submission in RapidResponseSubmission.objects.filter(
+        seconds_to_answer__isnull=True, run__isnull=False,
+    ).select_related('run').only('id', 'created', 'run__created').iterator(chunk_size=BATCH_SIZE):
+        submission.seconds_to_answer = max(0.0, (submission.created - submission.run.created).total_seconds())
+        batch.append(submission)
+        if len(batch) == BATCH_SIZE:
+            RapidResponseSubmission.objects.bulk_update(batch, ['seconds_to_answer'])
+            batch = []
+    if batch:
+        RapidResponseSubmission.objects.bulk_update(batch, ['seconds_to_answer'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0007_export_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponsesubmission',
+            name='seconds_to_answer',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='rapidresponsesubmission',
+            index=models.Index(fields=['run', 'answer_id', 'seconds_to_answer'], name='rapid_respo_run_id_9934f0_idx'),
+        ),
+        migrations.RunPython(backfill_seconds_to_answer, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0008_submission_seconds_to_answer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponsesubmission',
+            name='cohort',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='rapidresponsesubmission',
+            name='enrollment_track',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='RapidResponseAnswerCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment_type', models.CharField(max_length=32)),
+                ('segment', models.CharField(max_length=255)),
+                ('answer_id', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rapid_response_xblock.rapidresponserun')),
+            ],
+            options={
+                'unique_together': {('run', 'segment_type', 'segment', 'answer_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import jsonfield.fields
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0009_answer_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponseexportjob',
+            name='last_archived_run_id',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='RapidResponseRunArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('archive_path', models.CharField(max_length=1024)),
+                ('num_submissions', models.IntegerField(default=0)),
+                ('num_users', models.IntegerField(default=0)),
+                ('num_correct', models.IntegerField(default=0)),
+                ('answer_counts', jsonfield.fields.JSONField(default=dict)),
+                ('run', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='rapid_response_xblock.rapidresponserun')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
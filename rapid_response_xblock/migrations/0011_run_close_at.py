@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0010_run_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponserun',
+            name='close_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='rapidresponserun',
+            index=models.Index(fields=['open', 'close_at'], name='rapid_respo_open_99c096_idx'),
+        ),
+    ]
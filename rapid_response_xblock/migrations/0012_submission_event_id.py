@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0011_run_close_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponsesubmission',
+            name='event_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
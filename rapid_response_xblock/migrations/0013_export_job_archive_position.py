@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0012_submission_event_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapidresponseexportjob',
+            name='last_archived_submission_id',
+            field=models.IntegerField(default=0),
+        ),
+    ]
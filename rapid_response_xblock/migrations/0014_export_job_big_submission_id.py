@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapid_response_xblock', '0013_export_job_archive_position'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rapidresponseexportjob',
+            name='last_submission_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -5,6 +5,7 @@ Rapid Response block models
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from jsonfield import JSONField
 from model_utils.models import TimeStampedModel
@@ -21,12 +22,22 @@ class RapidResponseRun(models.Model):
     problem_usage_key = UsageKeyField(db_index=True, max_length=255)
     course_key = CourseKeyField(db_index=True, max_length=255)
     open = models.BooleanField(default=False, null=False)
+    # If set, the run is closed automatically at this time
+    close_at = models.DateTimeField(null=True, blank=True)
 
     created = models.DateTimeField(auto_now_add=True, db_index=True)
     modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['open', 'close_at']),
+        ]
+
+    @property
+    def is_open(self):
+        """Whether the run is open. A run which is past its close_at time is closed, even before it is updated."""
+        return self.open and (self.close_at is None or self.close_at > timezone.now())
 
     def __str__(self):
         return (
@@ -60,7 +71,20 @@ class RapidResponseSubmission(TimeStampedModel):
     )
     answer_id = models.CharField(null=True, max_length=255)
     answer_text = models.CharField(null=True, max_length=4096)
+    correct = models.BooleanField(null=True)
+    # Seconds between the run being opened and this answer being submitted
+    seconds_to_answer = models.FloatField(null=True)
+    # The learner's cohort and enrollment track when the answer was submitted, None if they weren't captured
+    cohort = models.CharField(null=True, max_length=255)
+    enrollment_track = models.CharField(null=True, max_length=100)
     event = JSONField()
+    # Identifies the tracking event, so that a copy of the event which is delivered again isn't recorded twice
+    event_id = models.CharField(null=True, blank=True, max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run', 'answer_id', 'seconds_to_answer']),
+        ]
 
     def __str__(self):
         return (
@@ -70,3 +94,102 @@ class RapidResponseSubmission(TimeStampedModel):
                 answer_id=self.answer_id,
             )
         )
+
+
+class RapidResponseAnswerCount(models.Model):
+    """
+    Stores the number of submissions for an answer in a run from the learners in one segment,
+    for example one cohort, so that counts can be split by segment without joining to other tables
+    """
+    run = models.ForeignKey(RapidResponseRun, on_delete=models.CASCADE)
+    segment_type = models.CharField(max_length=32)
+    segment = models.CharField(max_length=255)
+    answer_id = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('run', 'segment_type', 'segment', 'answer_id')
+
+    def __str__(self):
+        return (
+            "run={run_id} {segment_type}={segment} answer_id={answer_id} count={count}".format(
+                run_id=self.run_id,
+                segment_type=self.segment_type,
+                segment=self.segment,
+                answer_id=self.answer_id,
+                count=self.count,
+            )
+        )
+
+
+class RapidResponseRunArchive(TimeStampedModel):
+    """
+    Records that the submissions of a closed run were moved out of RapidResponseSubmission into a
+    compressed JSON lines file in storage, along with a snapshot of the run's aggregate counts
+    """
+    run = models.OneToOneField(RapidResponseRun, on_delete=models.CASCADE, related_name='archive')
+    archive_path = models.CharField(max_length=1024)
+    num_submissions = models.IntegerField(default=0)
+    num_users = models.IntegerField(default=0)
+    num_correct = models.IntegerField(default=0)
+    # A mapping of answer id => number of submissions
+    answer_counts = JSONField(default=dict)
+
+    def __str__(self):
+        return "run={run_id} archive_path={archive_path} num_submissions={num_submissions}".format(
+            run_id=self.run_id,
+            archive_path=self.archive_path,
+            num_submissions=self.num_submissions,
+        )
+
+
+class RapidResponseExportJob(TimeStampedModel):
+    """
+    Tracks the progress of exporting the submissions for the runs of a course to file storage
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETE = 'complete'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETE, 'Complete'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    course_key = CourseKeyField(db_index=True, max_length=255)
+    runs_created_after = models.DateTimeField(null=True, blank=True)
+    runs_created_before = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_rows = models.IntegerField(null=True, blank=True)
+    processed_rows = models.IntegerField(default=0)
+    num_parts = models.IntegerField(default=0)
+    # Submissions are exported in order of id, so this is where to resume after an interruption. The ids of
+    # LogSubmissionBackend are positions in the log file, which can go past the range of an IntegerField.
+    last_submission_id = models.BigIntegerField(default=0)
+    # Archived runs are exported after the submissions which are still in the database, in order of run id
+    last_archived_run_id = models.IntegerField(default=0)
+    # Where to resume within the archive of the run after last_archived_run_id
+    last_archived_submission_id = models.IntegerField(default=0)
+    archive_path = models.CharField(max_length=1024, blank=True)
+    error = models.TextField(blank=True)
+
+    @property
+    def progress(self):
+        """The fraction of rows which have been exported so far"""
+        if self.status == self.STATUS_COMPLETE:
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(1.0, self.processed_rows / self.total_rows)
+
+    def __str__(self):
+        return (
+            "id={id} course_key={course_key} status={status} processed_rows={processed_rows}".format(
+                id=self.id,
+                course_key=self.course_key,
+                status=self.status,
+                processed_rows=self.processed_rows,
+            )
+        )
@@ -0,0 +1,121 @@
+"""Helpers for finding the problems which rapid response can be used with"""
+
+from django.core.cache import cache
+from openedx.core.lib.xblock_utils import get_aside_from_xblock
+from xmodule.modulestore.django import modulestore
+
+from rapid_response_xblock.block import (
+    BLOCK_PROBLEM_CATEGORY,
+    RAPID_RESPONSE_ASIDE_TYPE,
+    RapidResponseAside,
+)
+from rapid_response_xblock.caches import make_cache_key
+
+
+COURSE_PROBLEMS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def iter_descendant_problems(block):
+    """
+    Walk the course tree below a block (including the block itself) and yield every problem
+
+    Args:
+        block (XBlock): A block from the modulestore, e.g. a section, subsection or unit
+
+    Yields:
+        XBlock: Problem blocks in course order
+    """
+    if getattr(block, 'category', None) == BLOCK_PROBLEM_CATEGORY:
+        yield block
+        return
+    if not getattr(block, 'has_children', False):
+        return
+    for child in block.get_children():
+        yield from iter_descendant_problems(child)
+
+
+def get_eligible_problems(block):
+    """
+    Find all problems below a block which rapid response can be applied to
+
+    Args:
+        block (XBlock): A block from the modulestore, e.g. a section, subsection or unit
+
+    Returns:
+        list of XBlock: The multiple choice problems below the block
+    """
+    return [
+        problem for problem in iter_descendant_problems(block)
+        if RapidResponseAside.should_apply_to_block(problem)
+    ]
+
+
+def get_enabled_problems(block):
+    """
+    Find all problems below a block which have rapid response enabled
+
+    Args:
+        block (XBlock): A block from the modulestore, e.g. a section, subsection or unit
+
+    Returns:
+        list of XBlock: The rapid-response-enabled problems below the block
+    """
+    return [
+        problem for problem in iter_descendant_problems(block)
+        if is_enabled_problem(problem)
+    ]
+
+
+def is_enabled_problem(problem):
+    """
+    Check whether rapid response can be applied to a problem and is enabled for it
+
+    Args:
+        problem (XBlock): A problem block from the modulestore
+
+    Returns:
+        bool: True if the problem has rapid response enabled
+    """
+    return (
+        RapidResponseAside.should_apply_to_block(problem) and
+        get_aside_from_xblock(problem, RAPID_RESPONSE_ASIDE_TYPE).enabled
+    )
+
+
+def get_course_problems(course_key):
+    """
+    List every problem in a course which rapid response can be applied to, and whether it is enabled.
+    The problems are read with one modulestore query inside a bulk operation, and the list is cached
+    for each version of the course, so it is only built again after the course is changed.
+
+    Args:
+        course_key (CourseKey): The course
+
+    Returns:
+        list of dict: The usage key, display name and enabled status of each eligible problem,
+            or an empty list if the course doesn't exist
+    """
+    store = modulestore()
+    with store.bulk_operations(course_key):
+        course = store.get_course(course_key, depth=0)
+        if course is None:
+            return []
+        course_version = getattr(course, 'course_version', None)
+        cache_key = make_cache_key('course_problems', course_key, course_version)
+        if course_version is not None:
+            problems = cache.get(cache_key)
+            if problems is not None:
+                return problems
+
+        problems = [
+            {
+                'usage_key': str(problem.location),
+                'display_name': problem.display_name_with_default,
+                'enabled': get_aside_from_xblock(problem, RAPID_RESPONSE_ASIDE_TYPE).enabled,
+            }
+            for problem in store.get_items(course_key, qualifiers={'category': BLOCK_PROBLEM_CATEGORY})
+            if RapidResponseAside.should_apply_to_block(problem)
+        ]
+    if course_version is not None:
+        cache.set(cache_key, problems, COURSE_PROBLEMS_CACHE_TIMEOUT)
+    return problems
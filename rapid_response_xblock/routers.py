@@ -0,0 +1,83 @@
+"""
+Database routing for rapid response.
+
+Add 'rapid_response_xblock.routers.RapidResponseRouter' to DATABASE_ROUTERS to send the tables of this app
+to the RAPID_RESPONSE_DATABASE alias instead of the default database, and to let the read-only paths
+(the responses handler, exports and the run data for the instructor dashboard) read from the
+RAPID_RESPONSE_READ_DATABASE alias, typically a replica. Every other read goes to RAPID_RESPONSE_DATABASE.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+APP_LABEL = 'rapid_response_xblock'
+# The alias which reads are sent to while inside read_from_replica, or None outside of it
+_read_database = ContextVar('rapid_response_read_database', default=None)
+
+
+def get_write_database():
+    """The alias of the database which holds the rapid response tables"""
+    return settings.RAPID_RESPONSE_DATABASE
+
+
+def get_read_database(pinned=False):
+    """
+    Get the alias to use for a read-only query
+
+    Args:
+        pinned (bool): If True the data was changed moments ago, so the replica may not have the change yet
+
+    Returns:
+        str: The replica alias if one is configured and the read isn't pinned, otherwise the database alias
+    """
+    replica = settings.RAPID_RESPONSE_READ_DATABASE
+    if replica and not pinned:
+        return replica
+    return get_write_database()
+
+
+@contextmanager
+def read_from_replica(pinned=False):
+    """
+    Send the reads of rapid response models made inside this context to the replica, if one is configured
+
+    Args:
+        pinned (bool): If True read from the database instead, since the data was changed moments ago
+    """
+    token = _read_database.set(get_read_database(pinned=pinned))
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+class RapidResponseRouter:
+    """
+    Routes the models of this app to the rapid response database, with reads going to the replica inside
+    read_from_replica. Models of other apps are left to the other routers.
+    """
+    def db_for_read(self, model, **hints):  # pylint: disable=unused-argument
+        """Pick the database for reading a model"""
+        if model._meta.app_label != APP_LABEL:
+            return None
+        return _read_database.get() or get_write_database()
+
+    def db_for_write(self, model, **hints):  # pylint: disable=unused-argument
+        """Pick the database for writing a model"""
+        if model._meta.app_label != APP_LABEL:
+            return None
+        return get_write_database()
+
+    def allow_relation(self, obj1, obj2, **hints):  # pylint: disable=unused-argument
+        """Allow relations between rapid response models and the users they refer to"""
+        if APP_LABEL in (obj1._meta.app_label, obj2._meta.app_label):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):  # pylint: disable=unused-argument
+        """Only create the rapid response tables in the rapid response database"""
+        if app_label != APP_LABEL:
+            return None
+        return db == get_write_database()
@@ -0,0 +1,134 @@
+"""Opening and closing rapid response runs"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from rapid_response_xblock.caches import invalidate_open_runs, pin_reads_to_database, publish_open_runs
+from rapid_response_xblock.models import RapidResponseRun
+from rapid_response_xblock.routers import get_write_database
+
+
+def get_latest_runs(course_key, problem_usage_keys):
+    """
+    Look up the most recent run for each of some problems. Like every other lookup of the latest run,
+    the most recently created run is the latest one.
+
+    Args:
+        course_key (CourseKey): The course key for the problems
+        problem_usage_keys (iterable of UsageKey): The usage keys for the problems
+
+    Returns:
+        dict: A mapping of problem usage key => most recent RapidResponseRun. Problems which
+            have never been opened are left out.
+    """
+    latest_run_id = RapidResponseRun.objects.filter(
+        course_key=OuterRef('course_key'),
+        problem_usage_key=OuterRef('problem_usage_key'),
+    ).order_by('-created', '-id').values('id')[:1]
+    return {
+        run.problem_usage_key: run
+        for run in RapidResponseRun.objects.filter(
+            course_key=course_key,
+            problem_usage_key__in=list(problem_usage_keys),
+            id=Subquery(latest_run_id),
+        )
+    }
+
+
+def get_close_at(close_after_minutes):
+    """
+    Get the time a run opened now should be closed automatically
+
+    Args:
+        close_after_minutes (int): The number of minutes the run should stay open, or None to leave it open
+
+    Returns:
+        datetime: The time to close the run, or None
+    """
+    if close_after_minutes is None:
+        return None
+    return timezone.now() + timedelta(minutes=close_after_minutes)
+
+
+def set_runs_open_status(course_key, problem_usage_keys, is_open, close_after_minutes=None):
+    """
+    Open or close the runs for many problems of a course at once. Problems are opened by creating
+    a new run for each problem which doesn't already have an open one, and closed by closing their
+    most recent run. All changes are made with bulk inserts and updates, and the new open runs
+    are published to the cache once for the whole batch.
+
+    Args:
+        course_key (CourseKey): The course key for the problems
+        problem_usage_keys (iterable of UsageKey): The usage keys for the problems
+        is_open (bool): Whether the problems should be opened or closed
+        close_after_minutes (int): If set, newly opened runs are closed automatically after this many minutes
+
+    Returns:
+        dict: A mapping of problem usage key => most recent RapidResponseRun for that problem.
+            Problems which are being closed and have never been opened are left out.
+    """
+    problem_usage_keys = set(problem_usage_keys)
+    with transaction.atomic(using=get_write_database()):
+        latest_runs = get_latest_runs(course_key, problem_usage_keys)
+        if is_open:
+            to_open = [
+                problem_usage_key for problem_usage_key in problem_usage_keys
+                if problem_usage_key not in latest_runs or not latest_runs[problem_usage_key].is_open
+            ]
+            if to_open:
+                # Runs which are past their close_at time are closed before new runs are opened in their place
+                RapidResponseRun.objects.filter(id__in=[
+                    latest_runs[problem_usage_key].id for problem_usage_key in to_open
+                    if problem_usage_key in latest_runs and latest_runs[problem_usage_key].open
+                ]).update(open=False, modified=timezone.now())
+                RapidResponseRun.objects.bulk_create([
+                    RapidResponseRun(
+                        problem_usage_key=problem_usage_key,
+                        course_key=course_key,
+                        open=True,
+                        close_at=get_close_at(close_after_minutes),
+                    ) for problem_usage_key in to_open
+                ])
+                # Not every database backend sets primary keys on bulk-created objects
+                latest_runs = get_latest_runs(course_key, problem_usage_keys)
+        else:
+            to_close = [run for run in latest_runs.values() if run.open]
+            RapidResponseRun.objects.filter(
+                id__in=[run.id for run in to_close]
+            ).update(open=False, modified=timezone.now())
+            for run in to_close:
+                run.open = False
+
+    publish_open_runs(course_key, {
+        problem_usage_key: latest_runs.get(problem_usage_key) for problem_usage_key in problem_usage_keys
+    })
+    pin_reads_to_database(course_key, problem_usage_keys)
+    return latest_runs
+
+
+def close_expired_runs(now=None):
+    """
+    Close every open run which is past its close_at time, with one bulk update, and invalidate the
+    cached open runs of their problems
+
+    Args:
+        now (datetime): The current time, or None to use the actual current time
+
+    Returns:
+        int: The number of runs which were closed
+    """
+    now = now or timezone.now()
+    with transaction.atomic(using=get_write_database()):
+        expired_runs = RapidResponseRun.objects.filter(open=True, close_at__lte=now)
+        problems_by_course = defaultdict(set)
+        for course_key, problem_usage_key in expired_runs.values_list('course_key', 'problem_usage_key'):
+            problems_by_course[course_key].add(problem_usage_key)
+        num_closed = expired_runs.update(open=False, modified=now)
+
+    for course_key, problem_usage_keys in problems_by_course.items():
+        invalidate_open_runs(course_key, problem_usage_keys)
+        pin_reads_to_database(course_key, problem_usage_keys)
+    return num_closed
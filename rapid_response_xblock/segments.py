@@ -0,0 +1,279 @@
+"""
+Splitting submission counts by segments of learners, such as cohorts or enrollment tracks.
+
+A learner's segments are looked up once per run when their first answer is recorded, and the
+counts for each (run, segment, answer) are kept up to date as answers come in, so that the
+segmented counts can be read without joining submissions to cohort or enrollment tables.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from rapid_response_xblock.caches import make_cache_key
+from rapid_response_xblock.models import RapidResponseAnswerCount
+from rapid_response_xblock.routers import get_write_database
+
+
+SEGMENT_COHORT = 'cohort'
+SEGMENT_ENROLLMENT_TRACK = 'enrollment_track'
+SEGMENT_TYPES = (SEGMENT_COHORT, SEGMENT_ENROLLMENT_TRACK)
+# The segment for learners who aren't in a cohort or aren't enrolled
+NO_SEGMENT = ''
+# Long enough to cover any run, which is the only time the segments are needed
+SEGMENT_CACHE_TIMEOUT = 60 * 60 * 4
+
+
+def lookup_segments(user_id, course_key):
+    """
+    Look up which segments a learner belongs to for each configured segment type
+
+    Args:
+        user_id (int): The id of a user
+        course_key (CourseKey): The course
+
+    Returns:
+        dict: A mapping of segment type => segment name, empty if the user doesn't exist
+    """
+    segment_types = settings.RAPID_RESPONSE_SEGMENT_TYPES
+    if not segment_types:
+        return {}
+
+    user = get_user_model().objects.filter(id=user_id).first()
+    if user is None:
+        return {}
+
+    # Imported here so that recording submissions doesn't load these apps until a segment is first looked up
+    # pylint: disable=import-outside-toplevel
+    from common.djangoapps.student.models import CourseEnrollment
+    from openedx.core.djangoapps.course_groups.cohorts import get_cohort
+
+    segments = {}
+    if SEGMENT_COHORT in segment_types:
+        cohort = get_cohort(user, course_key, assign=False)
+        segments[SEGMENT_COHORT] = cohort.name if cohort is not None else NO_SEGMENT
+    if SEGMENT_ENROLLMENT_TRACK in segment_types:
+        mode, _ = CourseEnrollment.enrollment_mode_for_user(user, course_key)
+        segments[SEGMENT_ENROLLMENT_TRACK] = mode or NO_SEGMENT
+    return segments
+
+
+def get_segments_for_run(user_id, course_key, run_id):
+    """
+    Get the segments of a learner, looking them up only once per run
+
+    Args:
+        user_id (int): The id of a user
+        course_key (CourseKey): The course
+        run_id (int): The id of the run the learner is answering
+
+    Returns:
+        dict: A mapping of segment type => segment name
+    """
+    if not settings.RAPID_RESPONSE_SEGMENT_TYPES:
+        return {}
+
+    key = make_cache_key('segments', run_id, user_id)
+    segments = cache.get(key)
+    if segments is None:
+        segments = lookup_segments(user_id, course_key)
+        cache.set(key, segments, SEGMENT_CACHE_TIMEOUT)
+    return segments
+
+
+def lookup_many_segments(user_ids, course_key):
+    """
+    Look up which segments some learners belong to for each configured segment type, with one query
+    per segment type instead of one per learner
+
+    Args:
+        user_ids (iterable of int): The ids of existing users
+        course_key (CourseKey): The course
+
+    Returns:
+        dict: A mapping of user id => segment type => segment name
+    """
+    segment_types = settings.RAPID_RESPONSE_SEGMENT_TYPES
+    segments = {user_id: {} for user_id in user_ids}
+    if not segment_types or not segments:
+        return segments
+
+    # pylint: disable=import-outside-toplevel
+    if SEGMENT_COHORT in segment_types:
+        from openedx.core.djangoapps.course_groups.cohorts import is_course_cohorted
+        from openedx.core.djangoapps.course_groups.models import CohortMembership
+        # Like get_cohort, learners aren't in a cohort if the course isn't cohorted
+        cohorts = dict(CohortMembership.objects.filter(
+            course_id=course_key, user_id__in=list(segments),
+        ).values_list('user_id', 'course_user_group__name')) if is_course_cohorted(course_key) else {}
+        for user_id, user_segments in segments.items():
+            user_segments[SEGMENT_COHORT] = cohorts.get(user_id, NO_SEGMENT)
+    if SEGMENT_ENROLLMENT_TRACK in segment_types:
+        from common.djangoapps.student.models import CourseEnrollment
+        modes = dict(CourseEnrollment.objects.filter(
+            course_id=course_key, user_id__in=list(segments),
+        ).values_list('user_id', 'mode'))
+        for user_id, user_segments in segments.items():
+            user_segments[SEGMENT_ENROLLMENT_TRACK] = modes.get(user_id) or NO_SEGMENT
+    return segments
+
+
+def get_many_segments_for_run(user_ids, course_key, run_id):
+    """
+    Get the segments of many learners answering the same run at once, looking up the ones which
+    aren't cached in bulk
+
+    Args:
+        user_ids (iterable of int): The ids of existing users
+        course_key (CourseKey): The course
+        run_id (int): The id of the run the learners are answering
+
+    Returns:
+        dict: A mapping of user id => segment type => segment name
+    """
+    user_ids = set(user_ids)
+    if not settings.RAPID_RESPONSE_SEGMENT_TYPES:
+        return {user_id: {} for user_id in user_ids}
+
+    keys = {user_id: make_cache_key('segments', run_id, user_id) for user_id in user_ids}
+    cached = cache.get_many(list(keys.values()))
+    segments = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+    missing_user_ids = user_ids - set(segments)
+    if missing_user_ids:
+        missing = lookup_many_segments(missing_user_ids, course_key)
+        cache.set_many(
+            {keys[user_id]: user_segments for user_id, user_segments in missing.items()}, SEGMENT_CACHE_TIMEOUT,
+        )
+        segments.update(missing)
+    return segments
+
+
+def get_submission_segments(submission):
+    """
+    Get the segments recorded with a submission
+
+    Args:
+        submission (dict): A submission's values, including the fields named after the segment types
+
+    Returns:
+        dict: A mapping of segment type => segment name
+    """
+    return {
+        segment_type: submission[segment_type]
+        for segment_type in SEGMENT_TYPES
+        if submission.get(segment_type) is not None
+    }
+
+
+def update_answer_counts(run_id, segments, answer_id, delta):
+    """
+    Add to the count of an answer for each of a learner's segments
+
+    Args:
+        run_id (int): The id of a run
+        segments (dict): A mapping of segment type => segment name
+        answer_id (str): The answer
+        delta (int): The number to add to each count, which is negative when an answer is replaced
+    """
+    for segment_type, segment in segments.items():
+        counts = RapidResponseAnswerCount.objects.filter(
+            run_id=run_id,
+            segment_type=segment_type,
+            segment=segment,
+            answer_id=answer_id,
+        )
+        if counts.update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic(using=get_write_database()):
+                RapidResponseAnswerCount.objects.create(
+                    run_id=run_id,
+                    segment_type=segment_type,
+                    segment=segment,
+                    answer_id=answer_id,
+                    count=delta,
+                )
+        except IntegrityError:
+            # Another process created the row first
+            counts.update(count=F('count') + delta)
+
+
+def get_course_segments(course_key):
+    """
+    Look up every segment a learner in a course can belong to for each configured segment type
+
+    Args:
+        course_key (CourseKey): The course
+
+    Returns:
+        dict: A mapping of segment type => list of segment names
+    """
+    segment_types = settings.RAPID_RESPONSE_SEGMENT_TYPES
+    # pylint: disable=import-outside-toplevel
+    course_segments = {}
+    if SEGMENT_COHORT in segment_types:
+        from openedx.core.djangoapps.course_groups.cohorts import get_course_cohorts
+        course_segments[SEGMENT_COHORT] = [NO_SEGMENT] + [
+            cohort.name for cohort in get_course_cohorts(course_id=course_key)
+        ]
+    if SEGMENT_ENROLLMENT_TRACK in segment_types:
+        from common.djangoapps.course_modes.models import CourseMode
+        course_segments[SEGMENT_ENROLLMENT_TRACK] = [NO_SEGMENT] + [
+            mode.slug for mode in CourseMode.modes_for_course(course_key, include_expired=True, only_selectable=False)
+        ]
+    return course_segments
+
+
+def seed_answer_counts(course_key, run_answer_ids):
+    """
+    Create a zero count for every answer of some runs in each segment of the course, so that the
+    answers recorded once the runs are opened only need to update their counts
+
+    Args:
+        course_key (CourseKey): The course of the runs
+        run_answer_ids (dict): A mapping of run id => the answer ids of the run's problem
+    """
+    if not settings.RAPID_RESPONSE_SEGMENT_TYPES or not run_answer_ids:
+        return
+
+    course_segments = get_course_segments(course_key)
+    RapidResponseAnswerCount.objects.bulk_create(
+        [
+            RapidResponseAnswerCount(
+                run_id=run_id,
+                segment_type=segment_type,
+                segment=segment,
+                answer_id=answer_id,
+                count=0,
+            )
+            for run_id, answer_ids in run_answer_ids.items()
+            for segment_type, segments in course_segments.items()
+            for segment in segments
+            for answer_id in answer_ids
+        ],
+        # Counts which already exist, e.g. for a run which was already open, are left alone
+        ignore_conflicts=True,
+    )
+
+
+def get_segmented_counts(run_ids):
+    """
+    Produce the counts for each answer split by segment
+
+    Args:
+        run_ids (list of int): Run ids
+
+    Returns:
+        dict: A mapping of segment type => segment name => answer id => run id => count, empty if segmenting is off
+    """
+    if not settings.RAPID_RESPONSE_SEGMENT_TYPES:
+        return {}
+    segmented_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+    for item in RapidResponseAnswerCount.objects.filter(run_id__in=run_ids, count__gt=0).values(
+        'run_id', 'segment_type', 'segment', 'answer_id', 'count'
+    ):
+        segmented_counts[item['segment_type']][item['segment']][item['answer_id']][item['run_id']] = item['count']
+    return segmented_counts
@@ -11,5 +11,33 @@ def plugin_settings(settings):
             'name': 'rapid_response',
         }
     }
+    # Dotted path to the storage class used for course-wide exports. The default storage is used if this is None.
+    settings.RAPID_RESPONSE_EXPORT_STORAGE = None
+    # The database alias for the rapid response tables, and the alias of a replica to send read-only queries to.
+    # These are only used if 'rapid_response_xblock.routers.RapidResponseRouter' is in DATABASE_ROUTERS.
+    settings.RAPID_RESPONSE_DATABASE = 'default'
+    settings.RAPID_RESPONSE_READ_DATABASE = None
+    # How long reads for a problem go to the database instead of the replica after it's opened or closed
+    settings.RAPID_RESPONSE_READ_PIN_SECONDS = 10
+    # Runs closed more than this many days ago are archived by the archive_rapid_response_runs command
+    settings.RAPID_RESPONSE_ARCHIVE_AFTER_DAYS = 365
+    # Dotted path to the storage class used for archived runs. The default storage is used if this is None.
+    settings.RAPID_RESPONSE_ARCHIVE_STORAGE = None
+    # The segments which submission counts are split by, from 'cohort' and 'enrollment_track'. Segmenting is off
+    # by default since it looks up the cohort and enrollment of each learner when they first answer in a run.
+    settings.RAPID_RESPONSE_SEGMENT_TYPES = []
+    # Dotted path to the SubmissionBackend which stores submissions, and the file used by LogSubmissionBackend
+    settings.RAPID_RESPONSE_SUBMISSION_BACKEND = 'rapid_response_xblock.backends.DatabaseSubmissionBackend'
+    settings.RAPID_RESPONSE_SUBMISSION_LOG_PATH = None
+    # How many responses, timeline, latency and transitions requests each process computes at once, and how many
+    # every process together computes for any one problem. Requests past the limits get the last good payload,
+    # marked as stale. The count for a problem is kept in the cache, and given back if no request for the problem
+    # has started for RAPID_RESPONSE_AGGREGATE_SLOT_SECONDS, in case a process died while computing one. Two per
+    # problem lets two instructors watch the same problem without either being turned away.
+    settings.RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES = 4
+    settings.RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES_PER_PROBLEM = 2
+    settings.RAPID_RESPONSE_AGGREGATE_SLOT_SECONDS = 60
+    # How long a request which wasn't admitted is told to wait before trying again
+    settings.RAPID_RESPONSE_RETRY_AFTER_SECONDS = 10
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
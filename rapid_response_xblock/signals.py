@@ -0,0 +1,14 @@
+"""Signal handlers for rapid response"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rapid_response_xblock.caches import invalidate_open_runs, pin_reads_to_database
+from rapid_response_xblock.models import RapidResponseRun
+
+
+@receiver(post_save, sender=RapidResponseRun)
+@receiver(post_delete, sender=RapidResponseRun)
+def invalidate_open_run_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Clear the cached open run whenever a run is opened, closed or removed"""
+    invalidate_open_runs(instance.course_key, [instance.problem_usage_key])
+    pin_reads_to_database(instance.course_key, [instance.problem_usage_key])
@@ -1,12 +1,15 @@
 (function($, _, MathJax) {
   'use strict';
 
-  // time between polls of responses API
-  var POLLING_MILLIS = 3000;
+  // time between polls of responses API, unless the server recommends a different interval
+  var DEFAULT_POLLING_MILLIS = 3000;
+  // Each poll is moved randomly by up to this fraction of the interval, so that the tabs of several
+  // instructors watching the same problem don't poll at the same moment
+  var POLLING_JITTER = 0.2;
   // time between timer rendering updates
   var TIMER_MILLIS = 250;
   // Timeout (in ms) for AJAX requests
-  var REQUEST_TIMEOUT_MILLIS = (POLLING_MILLIS * 3) + 100;
+  var REQUEST_TIMEOUT_MILLIS = 9100;
   // Timeout (in ms) for the initial AJAX request to fetch responses and the current problem state.
   var INIT_REQUEST_TIMEOUT_MILLIS = REQUEST_TIMEOUT_MILLIS * 2;
   // The number of times that the responses endpoint should be polled unsuccessfully before showing
@@ -32,6 +35,8 @@
   // this sentinel value means no data should be shown
   var NONE_SELECTION = 'None';
   var GENERAL_ERROR_MESSAGE = 'There was an error. Please reload the page or try again later.';
+  var ARCHIVED_TRANSITIONS_MESSAGE = 'The answers to these runs were archived, so the changes between them ' +
+    'can only be seen in an export.';
 
   // An object that maps UI state names to the UI artifacts that should be shown when the UI is in
   // that state.
@@ -99,13 +104,69 @@
     timerVis: false
   });
 
+  // Typesetting math is slow, so each expression is typeset once per page load and shared by every chart.
+  // Maps the math in an answer label => {svg, width, height}, with svg null if typesetting failed.
+  var mathLabelCache = {};
+  // Maps the math in an answer label => the callbacks waiting for it to be typeset
+  var pendingMathLabels = {};
+  // Maps answer text => the typeset HTML of the tooltip title for that answer
+  var mathTooltipCache = {};
+
+  /**
+   * Get the hidden element where math is typeset before being copied into the charts
+   * @returns {Object} jQuery object for the element
+   */
+  function getMathContainer() {
+    var $mathContainer = $('.rapid-response-math-container');
+    if ($mathContainer.length === 0) {
+      $mathContainer = $('<div class="rapid-response-math-container"></div>');
+      $("body").append($mathContainer);
+    }
+    return $mathContainer;
+  }
+
+  /**
+   * Typeset some math for an answer label, or reuse it if it was typeset already
+   * @param {string} mathText The math, including its delimiters
+   * @param {Function} callback Called with {svg, width, height} once the math is typeset
+   */
+  function typesetMathLabel(mathText, callback) {
+    if (_.has(mathLabelCache, mathText)) {
+      callback(mathLabelCache[mathText]);
+      return;
+    }
+    if (_.has(pendingMathLabels, mathText)) {
+      pendingMathLabels[mathText].push(callback);
+      return;
+    }
+    pendingMathLabels[mathText] = [callback];
+
+    var $label = $('<div></div>').text(mathText).appendTo(getMathContainer());
+    MathJax.Hub.Queue(["Typeset", MathJax.Hub, $label[0]], function() {
+      var svg = $label.find(".MathJax_SVG svg")[0];
+      var label = {svg: null, width: 0, height: 0};
+      if (svg) {
+        // Measured once here, instead of in every chart the label is used in
+        var rect = svg.getBoundingClientRect();
+        label = {svg: svg.cloneNode(true), width: rect.width, height: rect.height};
+      }
+      $label.remove();
+      mathLabelCache[mathText] = label;
+      var callbacks = pendingMathLabels[mathText];
+      delete pendingMathLabels[mathText];
+      _.each(callbacks, function(waiting) { waiting(label); });
+    });
+  }
+
 
   function RapidResponseAsideView(runtime, element) {
     var toggleStatusUrl = runtime.handlerUrl(element, 'toggle_block_open_status');
     var responsesUrl = runtime.handlerUrl(element, 'responses');
+    var transitionsUrl = runtime.handlerUrl(element, 'transitions');
     var $element = $(element);
 
     var rapidBlockResultsSel = '.rapid-response-results';
+    var rapidBlockResultsContainerSel = '.rapid-response-results-container';
     var problemStatusBtnSel = '.problem-status-toggle';
     var buttonsRowSel = '.buttons-row';
     var timerSel = '.timer-readout';
@@ -143,8 +204,19 @@
       responsesPollingTimeout: null,
       responsesAbortableRequest: null,
       responsesRequestAttemptCount: 0,
+      poll_interval_millis: DEFAULT_POLLING_MILLIS,  // recommended by the server with each poll
+      stale: false,  // true if the server was too busy and sent the responses from an earlier poll
+      isPollingPaused: false,  // true while polling is stopped because the page is hidden
+      transitions: null,  // the transition matrix between the two runs being compared
+      transitionsAbortableRequest: null,
+      transitionsRequestedRuns: null,  // the runs which the last transitions request was for
+      renderKey: null,  // describes what the charts last rendered, so that unchanged poll results can be skipped
       ui: ""
     };
+    // The position and size each bar was last rendered with, so that only changed bars are animated
+    var barLayouts = d3.local();
+    // What each axis was last rendered for, so that tick labels are only laid out again when they change
+    var axisLayouts = d3.local();
 
     // TODO: These values are guesses, maybe we want to calculate based on browser width/height? Not sure
     var ChartSettings = {
@@ -181,7 +253,7 @@
       request.then(function (result) {
         deferred.resolve(result);
       }).fail(function (jqXHR, textStatus) {
-        deferred.reject(textStatus);
+        deferred.reject(textStatus, jqXHR);
       });
       var promise = deferred.promise();
       var isPending = function() {
@@ -263,7 +335,7 @@
         var rootY = rootText.attr("y");
         var rootDy = parseFloat(rootText.attr("dy"));
         rootText.remove();
-        root.select("g").remove();
+        root.selectAll("g").remove();
 
         var radians = LABEL_ANGLE * Math.PI / 180;
         // yay trig
@@ -292,10 +364,9 @@
           } else if (_.includes(text, "$")) {
             middle = "$";
           }
-          words = [
-            textTrimmed.slice(0, textTrimmed.indexOf(middle)).trim(),
-            textTrimmed.slice(textTrimmed.indexOf(middle), textTrimmed.length).trim()
-          ];
+          // The text goes on the first line and the typeset math below it
+          words = [textTrimmed.slice(0, textTrimmed.indexOf(middle)).trim()];
+          renderMathLabel(root, textTrimmed.slice(textTrimmed.indexOf(middle), textTrimmed.length).trim());
         }
 
         var currentLine = 0;
@@ -338,6 +409,56 @@
       });
     }
 
+    /**
+     * Add typeset math below the text of an x axis label, typesetting it first if it hasn't been already
+     *
+     * @param {selector} tick A D3 selector for the g.tick element of the label
+     * @param {string} mathText The math, including its delimiters
+     */
+    function renderMathLabel(tick, mathText) {
+      typesetMathLabel(mathText, function(label) {
+        tick.selectAll(".math-label").remove();
+        var container = tick.append("g")
+          .classed("math-label", true)
+          .attr("transform", LABEL_ROTATE_VALUE);
+        if (!label.svg) {
+          container.append("text")
+            .attr("fill", "#000")
+            .attr("text-anchor", "start")
+            .attr("x", 0)
+            .attr("y", 9)
+            .attr("dy", "2em")
+            .text(mathText);
+          return;
+        }
+        container.append(function() { return label.svg.cloneNode(true); })
+          .attr("width", label.width)
+          .attr("height", label.height)
+          .attr("x", 25)
+          .attr("y", 9);
+      });
+    }
+
+    /**
+     * Typeset the title of the tooltip, reusing the typeset title from the last time the tooltip was shown
+     * for the same answer
+     *
+     * @param {string} answerText The text of the answer the tooltip is for
+     */
+    function renderMathTooltipTitle(answerText) {
+      var $title = $tooltipContainer.find(".tooltip-title");
+      if (_.has(mathTooltipCache, answerText)) {
+        $title.html(mathTooltipCache[answerText]);
+        return;
+      }
+      MathJax.Hub.Queue(["Typeset", MathJax.Hub, $title[0]], function() {
+        // Only cache the title if the tooltip wasn't replaced before typesetting finished
+        if ($.contains(document.documentElement, $title[0])) {
+          mathTooltipCache[answerText] = $title.html();
+        }
+      });
+    }
+
     /**
      * Click handler to close this chart
      * @param {number} chartIndex The index of the chart
@@ -470,40 +591,165 @@
       containers.exit().remove();
     }
 
-    function renderMathHJax(chart) {
-      MathJax.Hub.Register.StartupHook("End", function() {
-        setTimeout(function() {
-          chart.select(".xaxis").selectAll(".tick").each(function() {
-            var tick = d3.select(this);
-            var g = tick.select(".MathJax_SVG").select("svg");
-            if (!g.empty()) {
-              var node = g.node();
-              g.remove();
-              var newG = tick.append("g").attr("transform", LABEL_ROTATE_VALUE);
-              newG.append(function () {
-                var selectedNode = d3.select(node)
-                  .attr("width", "18.778ex")
-                  .attr("height", "3.161ex")
-                  .attr("x", 25)
-                  .attr("y", 9)
-                  .attr("dy", "50em");
-                return selectedNode.node();
-              });
-            }
-          });
-        }, 1);
+    //---------------------
+
+    /**
+     * Get the two runs being compared, earlier run first, or null if two runs aren't selected
+     *
+     * @returns {Array|null} The ids of the earlier and later run
+     */
+    function getComparedRuns() {
+      if (state.selectedRuns.length !== 2) {
+        return null;
+      }
+      var runIds = [getSelectedRun(0), getSelectedRun(1)];
+      if (_.includes(runIds, NONE_SELECTION) || _.includes(runIds, undefined) || runIds[0] === runIds[1]) {
+        return null;
+      }
+      // Run ids increase over time, so the smaller id is the earlier run
+      return _.sortBy(runIds);
+    }
+
+    /**
+     * Fetch the transition matrix for the compared runs, then render it. The matrix is fetched again with each poll
+     * while either run is open, since it changes as answers come in, and is only kept once both runs are closed.
+     */
+    function fetchTransitionsAndRender() {
+      var comparedRuns = getComparedRuns();
+      var transitions = state.transitions;
+      if (comparedRuns === null) {
+        return;
+      }
+      var isLoaded = transitions && transitions.from_run === comparedRuns[0] && transitions.to_run === comparedRuns[1];
+      var isCollecting = _.some(state.runs, function(run) {
+        return run.open && _.includes(comparedRuns, run.id);
+      });
+      if (isLoaded && !isCollecting) {
+        return;
+      }
+      if (state.transitionsAbortableRequest && state.transitionsAbortableRequest.isPending()) {
+        // Let a slow request for the same runs finish rather than starting over with every poll
+        if (_.isEqual(state.transitionsRequestedRuns, comparedRuns)) {
+          return;
+        }
+        state.transitionsAbortableRequest.abort();
+      }
+      state.transitionsRequestedRuns = comparedRuns;
+      state.transitionsAbortableRequest = makeAbortableRequest(transitionsUrl, {
+        data: {from_run: comparedRuns[0], to_run: comparedRuns[1]}
+      });
+      state.transitionsAbortableRequest.promise.then(function(transitions) {
+        state.transitions = transitions;
+        renderTransitions();
+      }).fail(function(errorTextStatus, jqXHR) {
+        // The submissions of archived runs are no longer available, so say so instead of showing an empty matrix
+        if (jqXHR && jqXHR.status === 410) {
+          state.transitions = {from_run: comparedRuns[0], to_run: comparedRuns[1], archived: true};
+          renderTransitions();
+        }
       });
-      MathJax.Hub.Queue(["Typeset", MathJax.Hub, chart.node()]);
     }
 
-    //---------------------
+    /**
+     * Renders a table showing how many students moved from each answer in the earlier run to each answer
+     * in the later run, below the compared charts
+     */
+    function renderTransitions() {
+      var comparedRuns = getComparedRuns();
+      var transitions = state.transitions;
+      var isCurrent = comparedRuns !== null && transitions !== null &&
+        transitions.from_run === comparedRuns[0] && transitions.to_run === comparedRuns[1];
+
+      var containers = d3.select(element)
+        .select(rapidBlockResultsContainerSel)
+        .selectAll(".transition-matrix")
+        .data(isCurrent ? [transitions] : []);
+      containers.exit().remove();
+      if (!isCurrent) {
+        return;
+      }
+
+      var newContainers = containers.enter()
+        .append("div")
+        .classed("transition-matrix", true);
+      newContainers.append("div").classed("transition-matrix-title", true);
+      newContainers.append("table");
+      var container = newContainers.merge(containers);
+
+      if (transitions.archived) {
+        container.select(".transition-matrix-title").text(ARCHIVED_TRANSITIONS_MESSAGE);
+        container.select("table").selectAll("*").remove();
+        return;
+      }
+      container.select(".transition-matrix-title").text(
+        transitions.total + (transitions.total === 1 ? " student" : " students") +
+        " answered in both runs. Rows are answers in the earlier run, columns are answers in the later run."
+      );
+
+      var choices = transitions.choices;
+      var table = container.select("table");
+      table.selectAll("thead").data([null]).enter().append("thead").append("tr");
+      table.selectAll("tbody").data([null]).enter().append("tbody");
+      var headerCells = table.select("thead tr").selectAll("th").data([null].concat(choices));
+      headerCells.enter()
+        .append("th")
+        .merge(headerCells)
+        .text(function(choice) { return choice ? choice.answer_text : ""; });
+      headerCells.exit().remove();
+
+      var rows = table.select("tbody").selectAll("tr").data(choices, function(choice) { return choice.answer_id; });
+      rows.exit().remove();
+      rows = rows.enter().append("tr").merge(rows);
+      var cells = rows.selectAll("td").data(function(fromChoice) {
+        return [fromChoice.answer_text].concat(choices.map(function(toChoice) {
+          return transitions.matrix[fromChoice.answer_id][toChoice.answer_id];
+        }));
+      });
+      cells.enter()
+        .append("td")
+        .merge(cells)
+        .classed("same-answer", function(value, index, nodes) {
+          var fromChoice = d3.select(nodes[index].parentNode).datum();
+          return index > 0 && choices[index - 1].answer_id === fromChoice.answer_id;
+        })
+        .text(function(value) { return value; });
+      cells.exit().remove();
+
+      if (_.some(choices, function(choice) { return hasMathExpression(choice.answer_text); })) {
+        MathJax.Hub.Queue(["Typeset", MathJax.Hub, container.node()]);
+      }
+    }
+
+    /**
+     * Describe everything the charts depend on, so that a render can be skipped if nothing changed
+     *
+     * @returns {string} A key which changes whenever the charts would be rendered differently
+     */
+    function makeRenderKey() {
+      return JSON.stringify([
+        state.ui,
+        state.selectedRuns,
+        state.runs,
+        state.choices,
+        state.counts,
+        state.total_counts,
+        calcChartWidth(),
+        calcChartHeight()
+      ]);
+    }
 
     /**
      * Render template
      */
     function renderAll() {
       renderControls();
-      renderChartContainer();
+      var renderKey = makeRenderKey();
+      if (renderKey !== state.renderKey) {
+        state.renderKey = renderKey;
+        renderChartContainer();
+        renderTransitions();
+      }
+      fetchTransitionsAndRender();
     }
 
     /**
@@ -622,7 +868,7 @@
           };
           $tooltipContainer.html(tooltipTemplate(templateState));
           if (hasMathExpression(item.answer_text)) {
-            MathJax.Hub.Queue(["Typeset", MathJax.Hub, $tooltipContainer.el]);
+            renderMathTooltipTitle(item.answer_text);
           }
         })
         .on("mousemove", function() {
@@ -636,6 +882,13 @@
         .attr("fill", function(item) {
           return color(item.answer_id);
         })
+        // Only animate the bars whose count or position changed
+        .filter(function(item) {
+          var layout = [x(item.answer_id), x.bandwidth(), y(item.count), innerHeight - y(item.count)];
+          var changed = !_.isEqual(barLayouts.get(this), layout);
+          barLayouts.set(this, layout);
+          return changed;
+        })
         .transition()
         // Set a transition for bars so that we have a slick update.
         .attr("x", function(item) { return x(item.answer_id); })
@@ -643,15 +896,46 @@
         .attr("y", function(item) { return y(item.count); })
         .attr("height", function(item) {
           return innerHeight - y(item.count);
-        })
+        });
 
       // If the responses disappear from the API such that there is no information for the bar
       // (probably shouldn't happen),
       // remove the corresponding rect element.
       bars.exit().remove();
 
-      // Update the X axis
-      chart.select(".xaxis")
+      // Update the X axis. Wrapping and typesetting the labels is expensive, so it's only done when the answers
+      // or the size of the chart change.
+      var xAxis = chart.select(".xaxis");
+      var xAxisLayout = JSON.stringify([
+        _.map(histogram, function(item) { return [item.answer_id, item.answer_text]; }),
+        innerWidth,
+        innerHeight
+      ]);
+      if (axisLayouts.get(xAxis.node()) !== xAxisLayout) {
+        axisLayouts.set(xAxis.node(), xAxisLayout);
+        renderXAxis(xAxis, x, histogramLookup);
+      }
+
+      // Update the Y axis.
+      // By default it assumes a continuous scale, but we just want to show integers so we need to create the ticks
+      // manually.
+      var yAxis = chart.select(".yaxis");
+      var yAxisLayout = JSON.stringify([yDomainMax, innerWidth, innerHeight]);
+      if (axisLayouts.get(yAxis.node()) !== yAxisLayout) {
+        axisLayouts.set(yAxis.node(), yAxisLayout);
+        renderYAxis(yAxis, y, yDomainMax, innerWidth, innerHeight);
+      }
+    }
+
+    /**
+     * Render the X axis of a chart, with a wrapped label below each bar
+     *
+     * @param {Object} xAxis D3 selector for the X axis
+     * @param {Function} x The D3 band scale for the bars
+     * @param {Object} histogramLookup A mapping of answer id to the histogram item for that answer
+     */
+    function renderXAxis(xAxis, x, histogramLookup) {
+      xAxis
         .transition()
         .call(
           d3.axisBottom(x).tickFormat(function() {
@@ -669,12 +953,20 @@
           var answerText = response ? response.answer_text : "";
           wrapText(d3.select(nodes[i]), x.bandwidth(), answerText);
         });
+    }
 
-      // Update the Y axis.
-      // By default it assumes a continuous scale, but we just want to show integers so we need to create the ticks
-      // manually.
+    /**
+     * Render the Y axis of a chart, with a dashed line across the chart for each tick
+     *
+     * @param {Object} yAxis D3 selector for the Y axis
+     * @param {Function} y The D3 linear scale for the bar heights
+     * @param {number} yDomainMax The largest count in the chart
+     * @param {number} innerWidth The width of the chart inside the axes
+     * @param {number} innerHeight The height of the chart inside the axes
+     */
+    function renderYAxis(yAxis, y, yDomainMax, innerWidth, innerHeight) {
       var yTickValues = makeIntegerTicks(yDomainMax);
-      chart.select(".yaxis")
+      yAxis
         .transition() // transition to match the bar update
         .call(
           d3.axisLeft(y)
@@ -694,18 +986,16 @@
 
       // strangely, the default path has a line at the side and one at the top
       // we just want the one on the side
-      chart.select(".yaxis .domain").remove();
+      yAxis.select(".domain").remove();
       // Render a vertical line at x=0
-      chart.select(".yaxis")
+      yAxis.selectAll(".line").data([null]).enter()
         .append("line")
         .classed("line", true)
         .attr("stroke", "#000")
         .attr("x2", 0.5);
-      chart.select(".yaxis .line")
+      yAxis.select(".line")
         .transition()
         .attr("y2", innerHeight);
-
-      renderMathHJax(chart);
     }
 
     /**
@@ -758,13 +1048,14 @@
      * @returns {Function} Error handling function
      */
     function generateErrorHandler(timeoutUiState) {
-      return function(errorTextStatus) {
+      return function(errorTextStatus, jqXHR) {
         // Don't do anything if the error text is 'abort' - that indicates that the request
         // was intentionally aborted.
         if (errorTextStatus === "abort") {
           return;
         }
-        if (errorTextStatus === "timeout") {
+        // A 503 means the server was too busy to answer, which is handled like a timeout
+        if (errorTextStatus === "timeout" || (jqXHR && jqXHR.status === 503)) {
           state.ui = timeoutUiState;
         } else {
           state.ui = "unknownError";
@@ -776,12 +1067,26 @@
       }
     }
 
+    /**
+     * Schedule the next poll after the interval the server recommended, moved by a random jitter
+     */
+    function scheduleNextPoll() {
+      var interval = state.poll_interval_millis || DEFAULT_POLLING_MILLIS;
+      var jitter = interval * POLLING_JITTER * ((Math.random() * 2) - 1);
+      state.responsesPollingTimeout = setTimeout(pollForResponses, interval + jitter);
+    }
+
     /**
      * Poll responses API. If the problem is open, schedule another poll using this function.
+     * Polling pauses while the page is hidden, and resumes when it's shown again.
      */
     function pollForResponses() {
       if (state.is_open) {
-        state.responsesPollingTimeout = setTimeout(pollForResponses, POLLING_MILLIS);
+        if (document.hidden) {
+          state.isPollingPaused = true;
+          return;
+        }
+        scheduleNextPoll();
       }
       if (state.responsesAbortableRequest.isPending()) {
         state.responsesRequestAttemptCount += 1;
@@ -800,10 +1105,14 @@
     function fetchResponsesAndRender() {
       state.responsesAbortableRequest = makeAbortableRequest(responsesUrl);
       state.responsesAbortableRequest.promise.then(function(newState) {
-        _.assign(state, newState, {
+        _.assign(state, {stale: false}, newState, {
           lastFetch: moment()
         });
-        state.ui = state.is_open ? "open" : "closed";
+        if (state.is_open) {
+          state.ui = state.stale ? "openDelayed" : "open";
+        } else {
+          state.ui = "closed";
+        }
         renderAll();
       }).fail(
         generateErrorHandler("openTimedOut")
@@ -838,6 +1147,38 @@
       $timer.text(formatTime(0));
     }
 
+    /**
+     * Fetch the responses, trying again after the delay the server asked for if it was too busy to answer.
+     * @param {Object} opts Options for the request, e.g. a timeout
+     * @param {boolean} retryStale If true, also try again if the server sent the responses from an earlier poll
+     * @returns {Promise} A promise which resolves with the responses
+     */
+    function fetchResponsesWithRetry(opts, retryStale) {
+      var deferred = new $.Deferred();
+      var retryLater = function(retryAfterSeconds) {
+        var delaySeconds = parseInt(retryAfterSeconds, 10);
+        setTimeout(attempt, (isNaN(delaySeconds) ? DEFAULT_POLLING_MILLIS / 1000 : delaySeconds) * 1000);
+      };
+      var attempt = function() {
+        state.responsesAbortableRequest = makeAbortableRequest(responsesUrl, _.assign({}, opts));
+        state.responsesAbortableRequest.promise.then(function(newState) {
+          if (retryStale && newState.stale) {
+            retryLater(newState.retry_after_seconds);
+          } else {
+            deferred.resolve(newState);
+          }
+        }).fail(function(errorTextStatus, jqXHR) {
+          if (jqXHR && jqXHR.status === 503) {
+            retryLater(jqXHR.getResponseHeader("Retry-After"));
+          } else {
+            deferred.reject(errorTextStatus, jqXHR);
+          }
+        });
+      };
+      attempt();
+      return deferred.promise();
+    }
+
     function handleProblemStatusClick(e) {
       if (state.is_open) {
         state.ui = "closing";
@@ -877,8 +1218,8 @@
         if (state.is_open) { return true; }
         state.ui = "fetchingFinal";
         renderControls();
-        state.responsesAbortableRequest = makeAbortableRequest(responsesUrl);
-        return state.responsesAbortableRequest.promise;
+        // The responses from an earlier poll may not have the last answers, so only fresh ones will do
+        return fetchResponsesWithRetry({}, true);
       });
 
       // Show a failure message if either the problem status toggle request fails or the final
@@ -886,6 +1227,8 @@
       finalResponsesRequestPromise.then(function (newState) {
         if (!state.is_open) {
           _.assign(state, newState, {
+            is_open: false,
+            stale: false,
             lastFetch: moment()
           });
           state.ui = "closed";
@@ -926,11 +1269,8 @@
       state.ui = "initial";
       renderControls();
 
-      state.responsesAbortableRequest = makeAbortableRequest(
-        responsesUrl,
-        {timeout: INIT_REQUEST_TIMEOUT_MILLIS}
-      );
-      state.responsesAbortableRequest.promise.then(function(newState) {
+      // Another instructor may be viewing the same problem, in which case the server can be too busy to answer
+      fetchResponsesWithRetry({timeout: INIT_REQUEST_TIMEOUT_MILLIS}, false).then(function(newState) {
         _.assign(state, newState, {
           lastFetch: moment(),
           responsesRequestAttemptCount: 0
@@ -949,6 +1289,16 @@
         }
       }).fail(generateErrorHandler("loadingTimedOut"));
 
+      // Resume polling as soon as the page is shown again
+      document.addEventListener('visibilitychange', function() {
+        if (!document.hidden && state.isPollingPaused) {
+          state.isPollingPaused = false;
+          if (state.is_open) {
+            pollForResponses();
+          }
+        }
+      });
+
       // adjust graph for each rerender
       window.addEventListener('resize', function() {
         renderAll();
@@ -0,0 +1,30 @@
+"""Celery tasks for rapid response"""
+from celery import shared_task
+
+from rapid_response_xblock.exports import process_export_job
+from rapid_response_xblock.models import RapidResponseExportJob
+from rapid_response_xblock.runs import close_expired_runs
+
+
+# Each task writes this many chunks and then queues another task to continue, so that a worker
+# restart only loses a small amount of work and long exports don't hit task time limits
+EXPORT_CHUNKS_PER_TASK = 20
+
+
+@shared_task
+def export_course_runs(job_id):
+    """
+    Export the submissions for a RapidResponseExportJob, continuing in a new task until it's done
+
+    Args:
+        job_id (int): The id of a RapidResponseExportJob
+    """
+    job = process_export_job(job_id, max_chunks=EXPORT_CHUNKS_PER_TASK)
+    if job.status == RapidResponseExportJob.STATUS_RUNNING:
+        export_course_runs.delay(job_id)
+
+
+@shared_task
+def close_expired_rapid_response_runs():
+    """Close the runs which are past their closing time. This is meant to be run periodically by celery beat."""
+    return close_expired_runs()
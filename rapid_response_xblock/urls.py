@@ -4,8 +4,30 @@ External checkout API endpoint urls.
 
 from django.urls import re_path
 
-from rapid_response_xblock.views import toggle_rapid_response
+from rapid_response_xblock.views import (
+    bulk_toggle_rapid_response,
+    course_export_status,
+    course_rapid_response_problems,
+    start_course_export,
+    toggle_rapid_response,
+)
 
 urlpatterns = [
+    re_path(r"^bulk/$", bulk_toggle_rapid_response, name="bulk_toggle_rapid_response"),
+    re_path(
+        r"^problems/(?P<course_id>[^/]+)/$",
+        course_rapid_response_problems,
+        name="course_rapid_response_problems",
+    ),
+    re_path(
+        r"^exports/(?P<course_id>[^/]+)/$",
+        start_course_export,
+        name="start_course_export",
+    ),
+    re_path(
+        r"^exports/(?P<course_id>[^/]+)/(?P<job_id>[0-9]+)/$",
+        course_export_status,
+        name="course_export_status",
+    ),
     re_path(r"^", toggle_rapid_response, name="toggle_rapid_response"),
 ]
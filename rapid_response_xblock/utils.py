@@ -1,20 +1,147 @@
 """Utils methods for instructor dashboard"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
 
-from rapid_response_xblock.models import RapidResponseRun, RapidResponseSubmission
+from rapid_response_xblock.archives import read_archived_submissions
+from rapid_response_xblock.backends import get_submission_backend
+from rapid_response_xblock.caches import is_read_pinned
+from rapid_response_xblock.models import RapidResponseRun, RapidResponseRunArchive
+from rapid_response_xblock.routers import get_read_database, read_from_replica
+
+
+RUN_INDEX_PAGE_SIZE = 100
+RUN_INDEX_MAX_PAGE_SIZE = 1000
 
 
 def get_run_data_for_course(course_key):
     """Util method to return problem runs corresponding to given course key"""
-    return RapidResponseRun.objects.filter(course_key=course_key).values('id', 'created', 'problem_usage_key')
+    return RapidResponseRun.objects.using(get_read_database(pinned=is_read_pinned(course_key))).filter(
+        course_key=course_key
+    ).values('id', 'created', 'problem_usage_key')
+
+
+def make_run_index_cursor(run):
+    """
+    Make the cursor which points just past a run in the run index
+
+    Args:
+        run (dict): A run returned by get_run_index_for_course
+
+    Returns:
+        str: A cursor which can be passed to get_run_index_for_course to get the next page
+    """
+    return f"{run['created'].isoformat()}|{run['id']}"
+
+
+def parse_run_index_cursor(cursor):
+    """
+    Parse a cursor made by make_run_index_cursor
+
+    Args:
+        cursor (str): A cursor
+
+    Returns:
+        tuple: The creation time and id of the last run on the previous page
+    """
+    try:
+        created, run_id = cursor.rsplit("|", 1)
+        created = parse_datetime(created)
+        run_id = int(run_id)
+    except (AttributeError, TypeError, ValueError) as ex:
+        raise ValueError(f"Invalid cursor: {cursor}") from ex
+    if created is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return created, run_id
+
+
+def get_run_index_for_course(
+        course_key,
+        problem_usage_key=None,
+        created_after=None,
+        created_before=None,
+        cursor=None,
+        page_size=RUN_INDEX_PAGE_SIZE,
+):
+    """
+    List the runs of a course, newest first, along with their submission counts. The counts
+    for all runs on a page are computed in a single aggregate query, and pages are fetched
+    with keyset pagination so that later pages are as cheap as the first one. The counts for
+    archived runs come from their snapshots.
+
+    Args:
+        course_key (CourseKey): The course key
+        problem_usage_key (UsageKey): If set, only list runs for this problem
+        created_after (datetime): If set, only list runs created at or after this time
+        created_before (datetime): If set, only list runs created before this time
+        cursor (str): The next_cursor returned with the previous page, or None for the first page
+        page_size (int): The maximum number of runs to return
+
+    Returns:
+        tuple: A list of run dicts and the cursor for the next page (None if this is the last page)
+    """
+    page_size = max(1, min(page_size, RUN_INDEX_MAX_PAGE_SIZE))
+    runs = RapidResponseRun.objects.filter(course_key=course_key)
+    if problem_usage_key is not None:
+        runs = runs.filter(problem_usage_key=problem_usage_key)
+    if created_after is not None:
+        runs = runs.filter(created__gte=created_after)
+    if created_before is not None:
+        runs = runs.filter(created__lt=created_before)
+    if cursor is not None:
+        cursor_created, cursor_id = parse_run_index_cursor(cursor)
+        runs = runs.filter(Q(created__lt=cursor_created) | Q(created=cursor_created, id__lt=cursor_id))
+
+    runs = list(
+        runs.values('id', 'created', 'problem_usage_key', 'open').annotate(
+            num_submissions=Count('rapidresponsesubmission'),
+            num_users=Count('rapidresponsesubmission__user', distinct=True),
+            num_correct=Count('rapidresponsesubmission', filter=Q(rapidresponsesubmission__correct=True)),
+        ).order_by('-created', '-id')[:page_size + 1]
+    )
+
+    next_cursor = None
+    if len(runs) > page_size:
+        runs = runs[:page_size]
+        next_cursor = make_run_index_cursor(runs[-1])
+    archived_counts = {
+        archive['run_id']: archive for archive in RapidResponseRunArchive.objects.filter(
+            run_id__in=[run['id'] for run in runs]
+        ).values('run_id', 'num_submissions', 'num_users', 'num_correct')
+    }
+    for run in runs:
+        if run['id'] in archived_counts:
+            archive = archived_counts[run['id']]
+            run.update(
+                num_submissions=archive['num_submissions'],
+                num_users=archive['num_users'],
+                num_correct=archive['num_correct'],
+            )
+        run['percent_correct'] = (
+            round(100 * run['num_correct'] / run['num_submissions'], 1) if run['num_submissions'] else None
+        )
+    return runs, next_cursor
 
 
 def get_run_submission_data(run_id):
     """
     Return data required to generate csv file corresponding to given run_id
     """
-    submissions = RapidResponseSubmission.objects.filter(run_id=run_id)
+    archive = RapidResponseRunArchive.objects.filter(run_id=run_id).first()
+    if archive is not None:
+        submissions = list(read_archived_submissions(archive))
+    else:
+        with read_from_replica():
+            submissions = get_submission_backend().list_submissions([run_id])
+    users = get_user_model().objects.in_bulk({submission['user_id'] for submission in submissions})
     return [
-        [s.created, s.answer_text, s.user.username, s.user.email, get_answer_result(s.event)]
+        [
+            s['created'],
+            s['answer_text'],
+            users[s['user_id']].username if s['user_id'] in users else None,
+            users[s['user_id']].email if s['user_id'] in users else None,
+            get_answer_result(s['event']),
+        ]
         for s in submissions
     ]
 
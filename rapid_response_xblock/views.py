@@ -1,18 +1,80 @@
 """Views for Rapid Response xBlock"""
 
+import json
 import logging
 from django.contrib.auth.decorators import login_required
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_http_methods
-from opaque_keys.edx.keys import UsageKey
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from openedx.core.lib.xblock_utils import get_aside_from_xblock
 from xmodule.modulestore.django import modulestore
 
 from django.http import JsonResponse
 
+from common.djangoapps.student.auth import has_course_author_access
+from rapid_response_xblock.block import RAPID_RESPONSE_ASIDE_TYPE, RapidResponseAside
+from rapid_response_xblock.exports import serialize_export_job, start_export_job
+from rapid_response_xblock.models import RapidResponseExportJob
+from rapid_response_xblock.problems import get_course_problems, get_eligible_problems
+
 
 log = logging.getLogger(__name__)
 
 
+def update_and_publish(block, aside, user_id):
+    """
+    Save the aside changes for a block and publish the block
+
+    Args:
+        block (XBlock): The problem block which is wrapped by the aside
+        aside (RapidResponseAside): The aside with the updated field values
+        user_id (int): The id of the user making the change
+    """
+    if update_aside(block, aside, user_id):
+        publish(block.location, user_id)
+
+
+def update_aside(block, aside, user_id):
+    """
+    Save the aside changes for a block without publishing it
+
+    Args:
+        block (XBlock): The problem block which is wrapped by the aside
+        aside (RapidResponseAside): The aside with the updated field values
+        user_id (int): The id of the user making the change
+
+    Returns:
+        bool: True if the changes were saved
+    """
+    try:
+        modulestore().update_item(block, user_id, asides=[aside])
+    except Exception as ex:  # pylint: disable=broad-except
+        # Updating item might throw errors when the initial state of a block is draft (Unpublished).
+        # Let them flow silently
+        log.exception("Something went wrong with updating rapid response block."
+                      " Most likely the block is in draft %s", ex)
+        return False
+    return True
+
+
+def publish(location, user_id):
+    """
+    Publish a block along with everything below it
+
+    Args:
+        location (UsageKey): The block to publish
+        user_id (int): The id of the user making the change
+    """
+    try:
+        modulestore().publish(location, user_id)
+    except Exception as ex:  # pylint: disable=broad-except
+        # Publishing item might throw errors when the initial state of a block is draft (Unpublished).
+        # Let them flow silently
+        log.exception("Something went wrong with publishing rapid response block."
+                      " Most likely the block is in draft %s", ex)
+
+
 @login_required
 @require_http_methods(
     [
@@ -50,13 +112,238 @@ def toggle_rapid_response(request):
     handler_block = get_aside_from_xblock(block, usage_key.aside_type)
 
     handler_block.enabled = not handler_block.enabled
-    try:
-        modulestore().update_item(block, request.user.id, asides=[handler_block])
-        modulestore().publish(block.location, request.user.id)
-    except Exception as ex:  # pylint: disable=broad-except
-        # Updating and publishing item might throw errors when the initial state of a block is draft (Unpublished).
-        # Let them flow silently
-        log.exception("Something went wrong with updating/publishing rapid response block."
-                      " Most likely the block is in draft %s", ex)
+    update_and_publish(block, handler_block, request.user.id)
 
     return JsonResponse({"is_enabled": handler_block.enabled})
+
+
+@login_required
+@require_http_methods(
+    [
+        "POST",
+    ]
+)
+def bulk_toggle_rapid_response(request):
+    """
+    An API View to set the rapid response enabled status for many problems of a course at once.
+    All changes are made inside a single modulestore bulk operation, and only the changed problems are
+    published, so that other unpublished changes in the course stay unpublished.
+
+    **Example Requests**
+
+    POST:
+     toggle-rapid-response/bulk/
+     {"enabled": true, "usage_keys": ["block-v1:Org+Course+Run+type@problem+block@<key>", ...]}
+
+     toggle-rapid-response/bulk/
+     {"enabled": true, "section": "block-v1:Org+Course+Run+type@chapter+block@<key>"}
+
+    **Example Responses**
+
+    200 with the lists of problems which were updated and skipped. Problems are skipped if they don't exist,
+    if rapid response can't be applied to them or if they already had the requested status.
+
+    400 if the request body is invalid or the problems belong to more than one course
+
+    403 if the user is not a course author
+    """
+    try:
+        body = json.loads(request.body)
+        enabled = body['enabled']
+        if not isinstance(enabled, bool):
+            raise ValueError("enabled must be a boolean")
+        usage_keys = [UsageKey.from_string(key) for key in body.get('usage_keys', [])]
+        section_key = UsageKey.from_string(body['section']) if body.get('section') else None
+    except (AttributeError, ValueError, TypeError, KeyError, InvalidKeyError) as ex:
+        return JsonResponse({"error": f"Invalid request: {ex}"}, status=400)
+
+    course_keys = {usage_key.course_key for usage_key in usage_keys + [section_key] if usage_key is not None}
+    if len(course_keys) != 1:
+        return JsonResponse({"error": "Problems from exactly one course must be provided"}, status=400)
+    course_key = course_keys.pop()
+
+    if not has_course_author_access(request.user, course_key):
+        return JsonResponse({"error": "Unauthorized (course authors only)"}, status=403)
+
+    store = modulestore()
+    updated = []
+    skipped = []
+    with store.bulk_operations(course_key):
+        blocks = []
+        for usage_key in usage_keys:
+            if store.has_item(usage_key):
+                blocks.append(store.get_item(usage_key))
+            else:
+                skipped.append(usage_key)
+        if section_key is not None:
+            if store.has_item(section_key):
+                blocks += get_eligible_problems(store.get_item(section_key))
+            else:
+                skipped.append(section_key)
+
+        for block in blocks:
+            if not RapidResponseAside.should_apply_to_block(block):
+                skipped.append(block.location)
+                continue
+            aside = get_aside_from_xblock(block, RAPID_RESPONSE_ASIDE_TYPE)
+            if aside.enabled == enabled:
+                skipped.append(block.location)
+                continue
+            aside.enabled = enabled
+            if update_aside(block, aside, request.user.id):
+                updated.append(block.location)
+            else:
+                skipped.append(block.location)
+
+        for location in updated:
+            publish(location, request.user.id)
+
+    return JsonResponse({
+        "is_enabled": enabled,
+        "updated": [str(location) for location in updated],
+        "skipped": [str(location) for location in skipped],
+    })
+
+
+@login_required
+@require_http_methods(
+    [
+        "GET",
+    ]
+)
+def course_rapid_response_problems(request, course_id):
+    """
+    An API View to list the problems of a course which rapid response can be applied to
+
+    **Example Requests**
+
+    GET:
+     toggle-rapid-response/problems/course-v1:Org+Course+Run/
+
+    **Example Responses**
+
+    200 with the eligible problems and whether each one has rapid response enabled:
+     {"course_id": "course-v1:Org+Course+Run", "problems": [
+         {"usage_key": "block-v1:Org+Course+Run+type@problem+block@<key>", "display_name": "...", "enabled": true}
+     ]}
+
+    400 if the course key is invalid
+
+    403 if the user is not a course author
+    """
+    try:
+        course_key = CourseKey.from_string(course_id)
+    except InvalidKeyError as ex:
+        return JsonResponse({"error": f"Invalid request: {ex}"}, status=400)
+
+    if not has_course_author_access(request.user, course_key):
+        return JsonResponse({"error": "Unauthorized (course authors only)"}, status=403)
+
+    return JsonResponse({"course_id": str(course_key), "problems": get_course_problems(course_key)})
+
+
+def parse_datetime_param(body, name):
+    """
+    Parse an optional ISO 8601 datetime from a request body
+
+    Args:
+        body (dict): The parsed request body
+        name (str): The name of the value
+
+    Returns:
+        datetime: The parsed value, or None if it wasn't given
+    """
+    value = body.get(name)
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be an ISO 8601 datetime")
+    return parsed
+
+
+@login_required
+@require_http_methods(
+    [
+        "POST",
+    ]
+)
+def start_course_export(request, course_id):
+    """
+    An API View to start exporting the rapid response submissions of a course in the background
+
+    **Example Requests**
+
+    POST:
+     toggle-rapid-response/exports/course-v1:Org+Course+Run/
+     {"runs_created_after": "2024-01-01T00:00:00Z", "runs_created_before": "2024-06-01T00:00:00Z"}
+
+    Both dates are optional, and the body can be left out to export every run of the course.
+
+    **Example Responses**
+
+    201 with the new export job, whose progress can be polled at toggle-rapid-response/exports/<course key>/<job id>/:
+     {"id": 12, "course_key": "course-v1:Org+Course+Run", "status": "pending", "progress": 0.0, "processed_rows": 0,
+      "total_rows": null, "archive_path": "", "error": ""}
+
+    400 if the course key or the request body is invalid
+
+    403 if the user is not a course author
+    """
+    try:
+        course_key = CourseKey.from_string(course_id)
+        body = json.loads(request.body) if request.body else {}
+        runs_created_after = parse_datetime_param(body, 'runs_created_after')
+        runs_created_before = parse_datetime_param(body, 'runs_created_before')
+    except (AttributeError, ValueError, TypeError, InvalidKeyError) as ex:
+        return JsonResponse({"error": f"Invalid request: {ex}"}, status=400)
+
+    if not has_course_author_access(request.user, course_key):
+        return JsonResponse({"error": "Unauthorized (course authors only)"}, status=403)
+
+    job = start_export_job(
+        course_key,
+        runs_created_after=runs_created_after,
+        runs_created_before=runs_created_before,
+    )
+    return JsonResponse(serialize_export_job(job), status=201)
+
+
+@login_required
+@require_http_methods(
+    [
+        "GET",
+    ]
+)
+def course_export_status(request, course_id, job_id):
+    """
+    An API View to poll the progress of an export started with start_course_export
+
+    **Example Requests**
+
+    GET:
+     toggle-rapid-response/exports/course-v1:Org+Course+Run/12/
+
+    **Example Responses**
+
+    200 with the export job. Once its status is "complete", archive_path is the path of the archive in the export
+    storage.
+
+    400 if the course key is invalid
+
+    403 if the user is not a course author
+
+    404 if the course has no export job with that id
+    """
+    try:
+        course_key = CourseKey.from_string(course_id)
+    except InvalidKeyError as ex:
+        return JsonResponse({"error": f"Invalid request: {ex}"}, status=400)
+
+    if not has_course_author_access(request.user, course_key):
+        return JsonResponse({"error": "Unauthorized (course authors only)"}, status=403)
+
+    job = RapidResponseExportJob.objects.filter(id=job_id, course_key=course_key).first()
+    if job is None:
+        return JsonResponse({"error": "Export job not found"}, status=404)
+    return JsonResponse(serialize_export_job(job))
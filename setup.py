@@ -29,7 +29,8 @@ setup(
         'django>=2.2,<5.0',
         'XBlock',
         'xblock-utils',
-        'edx-opaque-keys'
+        'edx-opaque-keys',
+        'cachetools',
     ],
     packages=find_packages(),
     package_data=package_data("rapid_response_xblock", ["static"]),
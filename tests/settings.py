@@ -0,0 +1,13 @@
+"""
+Settings for the test suite, which add a second SQLite database for the tests of reading from a replica
+"""
+from lms.envs.test import *  # pylint: disable=wildcard-import,unused-wildcard-import
+
+
+# Stands in for a replica of the rapid response database. It isn't used unless a test sets
+# RAPID_RESPONSE_READ_DATABASE to this alias.
+DATABASES['rapid_response_replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': ':memory:',
+}
+DATABASE_ROUTERS = [*DATABASE_ROUTERS, 'rapid_response_xblock.routers.RapidResponseRouter']
@@ -0,0 +1,92 @@
+"""Tests for admission control of the aggregate handlers"""
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from rapid_response_xblock.admission import AdmissionController
+from rapid_response_xblock.caches import make_cache_key
+
+
+@override_settings(RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES=2, RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES_PER_PROBLEM=1)
+class AdmissionControllerTests(TestCase):
+    """Tests for AdmissionController"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_limits(self):
+        """Computations should be refused past the limit for a problem and the limit for the process"""
+        controller = AdmissionController()
+        with controller.admit('problem1') as first:
+            assert first is True
+            with controller.admit('problem1') as same_problem:
+                assert same_problem is False
+            with controller.admit('problem2') as other_problem:
+                assert other_problem is True
+                with controller.admit('problem3') as over_process_limit:
+                    assert over_process_limit is False
+            with controller.admit('problem3') as after_release:
+                assert after_release is True
+        with controller.admit('problem1') as again:
+            assert again is True
+
+    def test_release_on_error(self):
+        """A computation which raises an exception should still be released"""
+        controller = AdmissionController()
+        try:
+            with controller.admit('problem1'):
+                raise ValueError()
+        except ValueError:
+            pass
+        assert controller.try_acquire('problem1') is True
+
+    def test_shared_problem_limit(self):
+        """The limit for a problem should be shared by the controllers of every process"""
+        first_process, second_process = AdmissionController(), AdmissionController()
+        with first_process.admit('problem1') as first:
+            assert first is True
+            with second_process.admit('problem1') as same_problem:
+                assert same_problem is False
+            with second_process.admit('problem2') as other_problem:
+                assert other_problem is True
+        with second_process.admit('problem1') as after_release:
+            assert after_release is True
+
+    @override_settings(RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES=8, RAPID_RESPONSE_MAX_CONCURRENT_AGGREGATES_PER_PROBLEM=2)
+    def test_concurrent_requests(self):
+        """Only as many computations as the limit for a problem should be admitted when requests arrive at once"""
+        controllers = [AdmissionController(), AdmissionController()]
+        thread_count = 6
+        started = threading.Barrier(thread_count)
+        tried = threading.Barrier(thread_count)
+        admitted = []
+
+        def request(controller):
+            """Try to compute while every other request is trying too"""
+            started.wait()
+            with controller.admit('problem1') as was_admitted:
+                tried.wait()
+                admitted.append(was_admitted)
+
+        threads = [
+            threading.Thread(target=request, args=(controllers[index % 2],)) for index in range(thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert admitted.count(True) == 2
+        assert AdmissionController().try_acquire('problem1') is True
+
+    def test_expired_slots(self):
+        """Slots held by a process which died should be given back once the count expires"""
+        controller = AdmissionController()
+        assert controller.try_acquire('problem1') is True
+        assert AdmissionController().try_acquire('problem1') is False
+
+        cache.delete(make_cache_key('aggregate_slots', 'problem1'))
+        assert AdmissionController().try_acquire('problem1') is True
+        # Releasing the slot taken before the count expired shouldn't fail
+        controller.release('problem1')
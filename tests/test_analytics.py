@@ -0,0 +1,120 @@
+"""Tests for the course-wide summaries of submissions"""
+import csv
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from opaque_keys.edx.keys import UsageKey
+import pytest
+
+from tests.utils import RuntimeEnabledTestCase
+from rapid_response_xblock.analytics import load_course_submissions, summarize_submissions
+from rapid_response_xblock.archives import archive_run
+from rapid_response_xblock.models import RapidResponseRun, RapidResponseSubmission
+from common.djangoapps.student.tests.factories import UserFactory
+
+
+class CourseSummaryTests(RuntimeEnabledTestCase):
+    """Tests for summarizing every run of a course"""
+
+    def setUp(self):
+        super().setUp()
+        self.problems = [
+            UsageKey.from_string(f"block-v1:SGAU+SGA101+2017_SGA+type@problem+block@problem{index}")
+            for index in range(2)
+        ]
+        self.users = [UserFactory.create() for _ in range(4)]
+        self.first_run, self.last_run, self.other_run = [
+            RapidResponseRun.objects.create(problem_usage_key=problem_usage_key, course_key=self.course_id)
+            for problem_usage_key in [self.problems[0], self.problems[0], self.problems[1]]
+        ]
+        # Nobody answers correctly in the first run of problem0 and everybody does in the second one
+        answers = [
+            (self.first_run, 'choice_0', False),
+            (self.first_run, 'choice_0', False),
+            (self.first_run, 'choice_2', False),
+            (self.first_run, 'choice_2', False),
+            (self.last_run, 'choice_1', True),
+            (self.last_run, 'choice_1', True),
+            (self.other_run, 'choice_0', True),
+            (self.other_run, 'choice_1', False),
+        ]
+        for index, (run, answer_id, correct) in enumerate(answers):
+            RapidResponseSubmission.objects.create(
+                run=run,
+                user=self.users[index % len(self.users)],
+                answer_id=answer_id,
+                answer_text=answer_id,
+                correct=correct,
+                event={},
+            )
+
+    def test_load(self):
+        """The submissions should be read into one array per column"""
+        submissions = load_course_submissions(self.course_id, chunk_size=3)
+        assert submissions.problems == self.problems
+        assert submissions.run_problem.tolist() == [0, 0, 1]
+        assert submissions.answer_ids == ['choice_0', 'choice_2', 'choice_1']
+        assert submissions.run_index.tolist() == [0, 0, 0, 0, 1, 1, 2, 2]
+        assert submissions.answer_index.tolist() == [0, 0, 1, 1, 2, 2, 0, 2]
+        assert submissions.correct.tolist() == [0, 0, 0, 0, 1, 1, 1, 0]
+        assert submissions.user_id.tolist() == [self.users[index % 4].id for index in range(8)]
+
+    def test_summarize(self):
+        """Each problem should get its participation, correctness, entropy and shift between runs"""
+        first, other = summarize_submissions(load_course_submissions(self.course_id))
+        assert first == {
+            'problem_usage_key': str(self.problems[0]),
+            'num_runs': 2,
+            'num_submissions': 6,
+            'num_participants': 4,
+            'percent_correct': pytest.approx(100 / 3, abs=1e-4),
+            'choice_entropy': pytest.approx(1.585, abs=1e-3),
+            'first_run_percent_correct': 0.0,
+            'last_run_percent_correct': 100.0,
+            'percent_correct_shift': 100.0,
+            'answer_shift': 1.0,
+        }
+        assert other == {
+            'problem_usage_key': str(self.problems[1]),
+            'num_runs': 1,
+            'num_submissions': 2,
+            'num_participants': 2,
+            'percent_correct': 50.0,
+            'choice_entropy': 1.0,
+            'first_run_percent_correct': None,
+            'last_run_percent_correct': None,
+            'percent_correct_shift': None,
+            'answer_shift': None,
+        }
+
+    def test_summarize_archived_runs(self):
+        """Submissions of archived runs should be read from their archives"""
+        expected = summarize_submissions(load_course_submissions(self.course_id))
+        storage_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(storage_dir))
+        storage = FileSystemStorage(location=storage_dir)
+        with patch('rapid_response_xblock.archives.get_archive_storage', return_value=storage):
+            archive_run(self.first_run)
+            assert summarize_submissions(load_course_submissions(self.course_id)) == expected
+
+    def test_summarize_empty_course(self):
+        """A course without runs should have an empty summary"""
+        RapidResponseRun.objects.all().delete()
+        assert summarize_submissions(load_course_submissions(self.course_id)) == []
+
+    def test_command(self):
+        """The management command should write a CSV row for each problem"""
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(output_dir))
+        output_path = os.path.join(output_dir, 'summary.csv')
+        call_command('summarize_rapid_response_course', str(self.course_id), '--output', output_path)
+
+        with open(output_path, encoding='utf-8') as summary_file:
+            rows = list(csv.DictReader(summary_file))
+        assert [row['problem_usage_key'] for row in rows] == [str(problem) for problem in self.problems]
+        assert rows[0]['answer_shift'] == '1.0'
+        assert rows[1]['answer_shift'] == ''
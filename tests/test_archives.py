@@ -0,0 +1,171 @@
+"""Tests for archiving closed runs"""
+from datetime import timedelta
+import shutil
+import tempfile
+from unittest.mock import Mock, PropertyMock, patch
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.utils import timezone
+from opaque_keys.edx.keys import UsageKey
+
+from tests.utils import RuntimeEnabledTestCase, make_scope_ids
+from rapid_response_xblock.archives import (
+    archive_run,
+    get_archivable_runs,
+    read_archived_submissions,
+)
+from rapid_response_xblock.block import RapidResponseAside
+from rapid_response_xblock.exports import process_export_job
+from rapid_response_xblock.models import (
+    RapidResponseExportJob,
+    RapidResponseRun,
+    RapidResponseRunArchive,
+    RapidResponseSubmission,
+)
+from rapid_response_xblock.utils import get_run_index_for_course, get_run_submission_data
+from common.djangoapps.student.tests.factories import UserFactory
+
+
+class ArchiveTests(RuntimeEnabledTestCase):
+    """Tests for archiving the submissions of closed runs"""
+
+    def setUp(self):
+        super().setUp()
+        storage_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(storage_dir))
+        self.storage = FileSystemStorage(location=storage_dir)
+        storage_patcher = patch('rapid_response_xblock.archives.get_archive_storage', return_value=self.storage)
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+
+        problem_usage_key = UsageKey.from_string("block-v1:SGAU+SGA101+2017_SGA+type@problem+block@problem0")
+        self.old_run, self.new_run = [
+            RapidResponseRun.objects.create(
+                problem_usage_key=problem_usage_key,
+                course_key=self.course_id,
+            ) for _ in range(2)
+        ]
+        RapidResponseRun.objects.filter(id=self.old_run.id).update(modified=timezone.now() - timedelta(days=400))
+        self.old_run.refresh_from_db()
+        self.submissions = [
+            RapidResponseSubmission.objects.create(
+                run=run,
+                user=UserFactory.create(),
+                answer_id=answer_id,
+                answer_text='an answer',
+                correct=answer_id == 'choice_1',
+                event={'event': {'submission': {'input_2_1': {'correct': answer_id == 'choice_1'}}}},
+            ) for run in [self.old_run, self.new_run] for answer_id in ['choice_0', 'choice_1', 'choice_1']
+        ]
+
+    def test_archive_run(self):
+        """The submissions of a run should be moved to storage and a snapshot of the counts kept"""
+        archive = archive_run(self.old_run)
+
+        assert archive.num_submissions == 3
+        assert archive.num_users == 3
+        assert archive.num_correct == 2
+        assert archive.answer_counts == {'choice_0': 1, 'choice_1': 2}
+        assert not RapidResponseSubmission.objects.filter(run=self.old_run).exists()
+        assert RapidResponseSubmission.objects.filter(run=self.new_run).count() == 3
+
+        archived = list(read_archived_submissions(archive))
+        assert [submission['id'] for submission in archived] == [
+            submission.id for submission in self.submissions[:3]
+        ]
+        assert archived[0]['created'] == self.submissions[0].created
+        assert archived[0]['event'] == self.submissions[0].event
+
+    def test_get_archivable_runs(self):
+        """Only closed runs which were closed long enough ago and aren't archived yet should be archivable"""
+        assert list(get_archivable_runs(365)) == [self.old_run]
+        assert list(get_archivable_runs(500)) == []
+        archive_run(self.old_run)
+        assert list(get_archivable_runs(365)) == []
+
+    def test_archived_counts(self):
+        """Counts for archived runs should come from the snapshot"""
+        archive_run(self.old_run)
+        run_ids = [self.new_run.id, self.old_run.id]
+        counts = RapidResponseAside.get_counts_for_problem(run_ids, [{'answer_id': 'choice_1'}])
+        assert counts == {'choice_1': {self.new_run.id: 2, self.old_run.id: 2}}
+
+        runs, _ = get_run_index_for_course(self.course_id)
+        assert [(run['id'], run['num_submissions'], run['num_correct']) for run in runs] == [
+            (self.new_run.id, 3, 2),
+            (self.old_run.id, 3, 2),
+        ]
+
+    def test_archived_report(self):
+        """The report for an archived run should be read from the archive"""
+        expected = get_run_submission_data(self.old_run.id)
+        archive_run(self.old_run)
+        assert get_run_submission_data(self.old_run.id) == expected
+
+    def test_archived_handlers(self):
+        """Handlers which read individual submissions should say that a run was archived rather than return nothing"""
+        aside = RapidResponseAside(
+            scope_ids=make_scope_ids(UsageKey.from_string(
+                "aside-usage-v2:block-v1$:SGAU+SGA101+2017_SGA+type@problem+block@problem0::rapid_response_xblock"
+            )),
+            runtime=self.runtime,
+        )
+        archive_run(self.old_run)
+        with patch('rapid_response_xblock.block.RapidResponseAside.choices', new_callable=PropertyMock, return_value=[]):
+            responses = [
+                aside.timeline(Mock(params={'run_id': str(self.old_run.id)})),
+                aside.latency(Mock(params={'run_id': str(self.old_run.id)})),
+                aside.transitions(Mock(params={'from_run': str(self.old_run.id), 'to_run': str(self.new_run.id)})),
+            ]
+            assert aside.timeline(Mock(params={'run_id': str(self.new_run.id)})).status_code == 200
+        for resp in responses:
+            assert resp.status_code == 410
+            assert resp.json['archived_runs'] == [self.old_run.id]
+
+    def test_export_archived_runs(self):
+        """Exports should include the submissions of archived runs"""
+        archive_run(self.old_run)
+        job = RapidResponseExportJob.objects.create(course_key=self.course_id)
+        job = process_export_job(job.id, storage=self.storage, chunk_size=2)
+
+        assert job.status == RapidResponseExportJob.STATUS_COMPLETE
+        assert job.processed_rows == job.total_rows == len(self.submissions)
+        # Two chunks for the submissions in the database and two for the archived run
+        assert job.num_parts == 4
+        assert job.last_archived_run_id == self.old_run.id
+        assert job.last_archived_submission_id == 0
+
+    def test_export_archived_runs_resume(self):
+        """An interrupted export should resume within the archive of a run"""
+        archive_run(self.old_run)
+        job = RapidResponseExportJob.objects.create(course_key=self.course_id)
+        job = process_export_job(job.id, storage=self.storage, chunk_size=2, max_chunks=3)
+        assert job.last_archived_run_id == 0
+        assert job.last_archived_submission_id == self.submissions[1].id
+        assert job.processed_rows == 5
+
+        job = process_export_job(job.id, storage=self.storage, chunk_size=2)
+        assert job.status == RapidResponseExportJob.STATUS_COMPLETE
+        assert job.processed_rows == job.total_rows == len(self.submissions)
+
+    def test_command(self):
+        """The management command should archive runs which were closed long enough ago"""
+        call_command('archive_rapid_response_runs', '--dry-run')
+        assert not RapidResponseRunArchive.objects.exists()
+
+        call_command('archive_rapid_response_runs', '--days', '30')
+        assert list(RapidResponseRunArchive.objects.values_list('run_id', flat=True)) == [self.old_run.id]
+
+    @override_settings(RAPID_RESPONSE_SUBMISSION_BACKEND='rapid_response_xblock.backends.LogSubmissionBackend')
+    def test_log_backend(self):
+        """Runs shouldn't be archived when the submissions aren't stored in the database"""
+        with pytest.raises(ImproperlyConfigured):
+            archive_run(self.old_run)
+        with pytest.raises(CommandError):
+            call_command('archive_rapid_response_runs', '--days', '30')
+        assert not RapidResponseRunArchive.objects.exists()
+        assert RapidResponseSubmission.objects.filter(run=self.old_run).count() == 3
@@ -6,23 +6,37 @@ from unittest.mock import Mock, patch, PropertyMock
 from ddt import data, ddt, unpack
 
 from dateutil.parser import parse as parse_datetime
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
 import pytz
 from opaque_keys.edx.keys import UsageKey
+from xblock.fields import ScopeIds
 
 from tests.utils import (
     make_scope_ids,
     RuntimeEnabledTestCase,
 )
+from rapid_response_xblock.admission import aggregate_admission, last_good_payloads
+from rapid_response_xblock.caches import get_open_run
 from rapid_response_xblock.models import (
     RapidResponseRun,
     RapidResponseSubmission,
 )
+from rapid_response_xblock.segments import lookup_many_segments
 from rapid_response_xblock.block import (
+    get_poll_interval_millis,
     RapidResponseAside,
     BLOCK_PROBLEM_CATEGORY,
     MULTIPLE_CHOICE_TYPE,
+    POLL_ACTIVE_SECONDS,
+    POLL_INTERVAL_ACTIVE_MILLIS,
+    POLL_INTERVAL_BUSY_MILLIS,
+    POLL_INTERVAL_IDLE_MILLIS,
+    should_apply_cache,
 )
-from common.djangoapps.student.tests.factories import UserFactory
+from rapid_response_xblock.utils import get_answer_result
+from common.djangoapps.student.tests.factories import CourseEnrollmentFactory, UserFactory
 
 
 @ddt
@@ -62,22 +76,22 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
             assert bool(fragment.content) is should_render_aside
             assert (fragment.js_init_fn == 'RapidResponseAsideInit') is should_render_aside
 
-    @data(True, False)
-    def test_student_view_context(self, is_open):
+    def test_student_view_context(self):
         """
-        Test that the aside student view has the proper context variables
+        Test that the aside student view renders without looking up the open run,
+        which rapid.js loads from the responses handler instead
         """
         self.aside_instance.enabled = True
         with patch(
-            'rapid_response_xblock.block.RapidResponseAside.has_open_run',
-            new_callable=PropertyMock,
-        ) as has_open_run_mock, patch(
+            'rapid_response_xblock.block.get_open_run',
+        ) as get_open_run_mock, patch(
             'rapid_response_xblock.block.RapidResponseAside.enabled',
             new=True
-        ):
-            has_open_run_mock.return_value = is_open
+        ), self.assertNumQueries(0):
             fragment = self.aside_instance.student_view_aside(Mock())
-        assert f'data-open="{is_open}"' in fragment.content
+        assert 'rapid-response-block' in fragment.content
+        assert 'data-open' not in fragment.content
+        get_open_run_mock.assert_not_called()
 
     @data(*[
         [BLOCK_PROBLEM_CATEGORY, {MULTIPLE_CHOICE_TYPE}, None, True],
@@ -100,6 +114,33 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
                 delattr(block, block_attr)
         assert self.aside_instance.should_apply_to_block(block) is should_apply
 
+    def test_should_apply_to_block_cached(self):
+        """
+        Test that should_apply_to_block only checks the problem types once for each version of a block
+        """
+        should_apply_cache.clear()
+        problem_types_mock = PropertyMock(return_value={MULTIPLE_CHOICE_TYPE})
+        block = Mock(
+            category=BLOCK_PROBLEM_CATEGORY,
+            scope_ids=ScopeIds('user', BLOCK_PROBLEM_CATEGORY, 'def_1', self.aside_usage_key.usage_key),
+            edited_on=None,
+        )
+        del block.descriptor
+        type(block).problem_types = problem_types_mock
+
+        assert RapidResponseAside.should_apply_to_block(block) is True
+        num_reads = problem_types_mock.call_count
+        for _ in range(3):
+            assert RapidResponseAside.should_apply_to_block(block) is True
+        assert problem_types_mock.call_count == num_reads
+
+        # A new version of the problem should be checked again
+        block.scope_ids = block.scope_ids._replace(def_id='def_2')
+        problem_types_mock.return_value = {'invalid_problem_type'}
+        for _ in range(3):
+            assert RapidResponseAside.should_apply_to_block(block) is False
+        assert problem_types_mock.call_count == 2 * num_reads
+
     @data(True, False)
     def test_studio_view(self, enabled_value):
         """
@@ -140,7 +181,7 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
         )
         assert run.open is False
 
-        self.aside_instance.toggle_block_open_status(Mock())
+        self.aside_instance.toggle_block_open_status(Mock(params={}))
         assert RapidResponseRun.objects.count() == 2
         assert RapidResponseRun.objects.filter(
             problem_usage_key=usage_key,
@@ -148,7 +189,7 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
             open=True
         ).exists() is True
 
-        self.aside_instance.toggle_block_open_status(Mock())
+        self.aside_instance.toggle_block_open_status(Mock(params={}))
         assert RapidResponseRun.objects.count() == 2
         assert RapidResponseRun.objects.filter(
             problem_usage_key=usage_key,
@@ -156,7 +197,7 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
             open=True
         ).exists() is False
 
-        self.aside_instance.toggle_block_open_status(Mock())
+        self.aside_instance.toggle_block_open_status(Mock(params={}))
         assert RapidResponseRun.objects.count() == 3
         assert RapidResponseRun.objects.filter(
             problem_usage_key=usage_key,
@@ -164,6 +205,36 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
             open=True,
         ).exists() is True
 
+    def test_toggle_block_open_close_after(self):
+        """toggle_block_open_status should set a closing time when close_after is given"""
+        resp = self.aside_instance.toggle_block_open_status(Mock(params={'close_after': '15'}))
+        assert resp.status_code == 200
+        run = RapidResponseRun.objects.get()
+        assert run.open is True
+        assert timedelta(minutes=14) < run.close_at - timezone.now() <= timedelta(minutes=15)
+        assert parse_datetime(resp.json['close_at']) == run.close_at
+
+        resp = self.aside_instance.toggle_block_open_status(Mock(params={'close_after': 'soon'}))
+        assert resp.status_code == 400
+        assert RapidResponseRun.objects.get().open is True
+
+    def test_toggle_block_open_expired(self):
+        """A run which is past its closing time should count as closed, so toggling opens a new run"""
+        expired = RapidResponseRun.objects.create(
+            problem_usage_key=self.aside_instance.wrapped_block_usage_key,
+            course_key=self.aside_instance.course_key,
+            open=True,
+            close_at=timezone.now() - timedelta(minutes=1),
+        )
+        with self.patch_modulestore():
+            assert self.aside_instance.responses().json['is_open'] is False
+
+        resp = self.aside_instance.toggle_block_open_status(Mock(params={}))
+        assert resp.json['is_open'] is True
+        expired.refresh_from_db()
+        assert expired.open is False
+        assert RapidResponseRun.objects.filter(open=True).exclude(id=expired.id).count() == 1
+
     def test_toggle_block_open_duplicate(self):
         """Test that toggle_block_open_status only looks at the last run's open status"""
         usage_key = self.aside_instance.wrapped_block_usage_key
@@ -179,13 +250,220 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
             open=False,
         )
 
-        self.aside_instance.toggle_block_open_status(Mock())
+        self.aside_instance.toggle_block_open_status(Mock(params={}))
         assert RapidResponseRun.objects.count() == 3
         assert RapidResponseRun.objects.filter(
             problem_usage_key=usage_key,
             course_key=course_key,
         ).order_by('-created').first().open is True
 
+    def test_toggle_block_open_warm_up(self):
+        """Opening a problem should parse its choices, seed its counts and publish its open run"""
+        usage_key = self.aside_instance.wrapped_block_usage_key
+        with self.patch_modulestore(), patch(
+            'rapid_response_xblock.block.seed_answer_counts'
+        ) as seed_mock, self.captureOnCommitCallbacks(execute=True):
+            self.aside_instance.toggle_block_open_status(Mock(params={}))
+        run = RapidResponseRun.objects.get()
+        seed_mock.assert_called_once_with(
+            self.aside_instance.course_key, {run.id: ['choice_0', 'choice_1', 'choice_2']}
+        )
+        with self.assertNumQueries(0):
+            assert get_open_run(self.aside_instance.course_key, usage_key).id == run.id
+
+        with patch('rapid_response_xblock.block.warm_up_open_runs') as warm_up_mock:
+            self.aside_instance.toggle_block_open_status(Mock(params={}))
+        warm_up_mock.assert_not_called()
+
+    def test_toggle_block_open_warm_up_error(self):
+        """A problem which can't be parsed should still be opened"""
+        with patch('rapid_response_xblock.block.get_problem_choices', side_effect=ValueError), patch(
+            'rapid_response_xblock.block.seed_answer_counts'
+        ) as seed_mock:
+            resp = self.aside_instance.toggle_block_open_status(Mock(params={}))
+        assert resp.status_code == 200
+        assert RapidResponseRun.objects.get().open is True
+        seed_mock.assert_called_once_with(self.aside_instance.course_key, {})
+
+    @data(*[
+        ['unit', 1],
+        ['sequential', 2],
+    ])
+    @unpack
+    def test_set_problems_open_status_scope(self, scope, num_parents):
+        """set_problems_open_status should open every enabled problem in the unit or sequential"""
+        problem_keys = [
+            self.aside_instance.wrapped_block_usage_key,
+            self.aside_instance.wrapped_block_usage_key.replace(block_id='second_problem'),
+        ]
+        problems = [Mock(location=problem_key) for problem_key in problem_keys]
+        request = Mock(json={'open': True, 'scope': scope})
+
+        with patch('rapid_response_xblock.block.modulestore') as modulestore_mock, patch(
+            'rapid_response_xblock.problems.get_enabled_problems', return_value=problems,
+        ) as get_enabled_mock:
+            resp = self.aside_instance.set_problems_open_status(request)
+
+        container = modulestore_mock.return_value.get_item.return_value
+        for _ in range(num_parents):
+            container = container.get_parent.return_value
+        get_enabled_mock.assert_called_once_with(container)
+
+        assert resp.status_code == 200
+        assert resp.json['is_open'] is True
+        runs = RapidResponseRun.objects.filter(open=True)
+        assert resp.json['runs'] == {str(run.problem_usage_key): run.id for run in runs}
+        assert {run.problem_usage_key for run in runs} == set(problem_keys)
+
+    def test_set_problems_open_status_usage_keys(self):
+        """set_problems_open_status should close the runs of the given problems"""
+        usage_key = self.aside_instance.wrapped_block_usage_key
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=usage_key,
+            course_key=self.aside_instance.course_key,
+            open=True,
+        )
+        request = Mock(json={'open': False, 'usage_keys': [str(usage_key)]})
+
+        with patch('rapid_response_xblock.problems.is_enabled_problem', return_value=True):
+            resp = self.aside_instance.set_problems_open_status(request)
+        assert resp.status_code == 200
+        assert resp.json == {'is_open': False, 'runs': {str(usage_key): run.id}, 'skipped': []}
+        run.refresh_from_db()
+        assert run.open is False
+
+    def test_set_problems_open_status_not_enabled(self):
+        """set_problems_open_status should skip problems which don't exist or don't have rapid response enabled"""
+        usage_key = self.aside_instance.wrapped_block_usage_key
+        missing_key = usage_key.replace(block_id='missing')
+        request = Mock(json={'open': True, 'usage_keys': [str(usage_key), str(missing_key)]})
+
+        with patch('rapid_response_xblock.problems.is_enabled_problem', return_value=False) as is_enabled_mock:
+            resp = self.aside_instance.set_problems_open_status(request)
+        assert resp.status_code == 200
+        assert resp.json == {'is_open': True, 'runs': {}, 'skipped': [str(usage_key), str(missing_key)]}
+        is_enabled_mock.assert_called_once()
+        assert RapidResponseRun.objects.count() == 0
+
+    @data(*[
+        {'scope': 'unit'},
+        {'open': 'yes'},
+        {'open': True, 'scope': 'chapter'},
+        {'open': True, 'usage_keys': ['not a key']},
+        {'open': True, 'usage_keys': ['block-v1:a+b+c+type@problem+block@d']},
+    ])
+    def test_set_problems_open_status_invalid(self, body):
+        """set_problems_open_status should reject invalid requests"""
+        resp = self.aside_instance.set_problems_open_status(Mock(json=body))
+        assert resp.status_code == 400
+        assert RapidResponseRun.objects.count() == 0
+
+    def test_course_problems(self):
+        """course_problems should list the rapid response problems of the course"""
+        problems = [{'usage_key': 'block-v1:a+b+c+type@problem+block@d', 'display_name': 'd', 'enabled': True}]
+        with patch(
+            'rapid_response_xblock.problems.get_course_problems', return_value=problems,
+        ) as get_problems_mock:
+            resp = self.aside_instance.course_problems(Mock())
+        assert resp.status_code == 200
+        assert resp.json == {'problems': problems}
+        get_problems_mock.assert_called_once_with(self.aside_instance.course_key)
+
+    def test_submit_external_answers(self):
+        """submit_external_answers should record a batch of answers in the open run"""
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=self.aside_instance.wrapped_block_usage_key,
+            course_key=self.aside_instance.course_key,
+            open=True,
+        )
+        users = [UserFactory.create() for _ in range(3)]
+        for user in users[:2]:
+            CourseEnrollmentFactory.create(user=user, course_id=self.aside_instance.course_key)
+        choices = [
+            {'answer_id': 'choice_0', 'answer_text': 'an incorrect answer', 'correct': False},
+            {'answer_id': 'choice_1', 'answer_text': 'the correct answer', 'correct': True},
+        ]
+        request = Mock(json={'source': 'clickers', 'answers': [
+            {'user': users[0].username, 'answer_id': 'choice_0'},
+            {'user': users[1].email, 'answer_id': 'choice_0'},
+            {'user': 'nobody', 'answer_id': 'choice_0'},
+            {'user': users[1].username, 'answer_id': 'choice_9'},
+            {'user': users[0].username, 'answer_id': 'choice_1'},
+            {'user': users[2].username, 'answer_id': 'choice_1'},
+        ]})
+
+        with patch(
+            'rapid_response_xblock.block.RapidResponseAside.get_choices_with_correctness', return_value=choices,
+        ):
+            resp = self.aside_instance.submit_external_answers(request)
+
+        assert resp.status_code == 200
+        assert resp.json['run_id'] == run.id
+        assert resp.json['recorded'] == 3
+        assert [error['index'] for error in resp.json['errors']] == [2, 3, 5]
+        assert resp.json['errors'][2]['error'] == f"User {users[2].username} is not enrolled in the course"
+        submissions = {
+            submission.user_id: submission for submission in RapidResponseSubmission.objects.filter(run=run)
+        }
+        assert {user_id: submission.answer_id for user_id, submission in submissions.items()} == {
+            users[0].id: 'choice_1',
+            users[1].id: 'choice_0',
+        }
+        assert submissions[users[0].id].correct is True
+        assert get_answer_result(submissions[users[0].id].event) is True
+
+    @override_settings(RAPID_RESPONSE_SEGMENT_TYPES=['cohort', 'enrollment_track'])
+    def test_submit_external_answers_segments(self):
+        """The segments of the learners in a batch should be looked up together, once per run"""
+        cache.clear()
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=self.aside_instance.wrapped_block_usage_key,
+            course_key=self.aside_instance.course_key,
+            open=True,
+        )
+        users = [UserFactory.create() for _ in range(2)]
+        for user, mode in zip(users, ['verified', 'audit']):
+            CourseEnrollmentFactory.create(user=user, course_id=self.aside_instance.course_key, mode=mode)
+        choices = [{'answer_id': 'choice_0', 'answer_text': 'an answer', 'correct': False}]
+        request = Mock(json={'answers': [{'user': user.username, 'answer_id': 'choice_0'} for user in users]})
+
+        with patch(
+            'rapid_response_xblock.block.RapidResponseAside.get_choices_with_correctness', return_value=choices,
+        ), patch(
+            'rapid_response_xblock.segments.lookup_many_segments', side_effect=lookup_many_segments,
+        ) as lookup_mock:
+            self.aside_instance.submit_external_answers(request)
+            self.aside_instance.submit_external_answers(request)
+        lookup_mock.assert_called_once_with({user.id for user in users}, self.aside_instance.course_key)
+
+        submissions = {
+            submission.user_id: submission for submission in RapidResponseSubmission.objects.filter(run=run)
+        }
+        # The course isn't cohorted
+        assert {user_id: submission.cohort for user_id, submission in submissions.items()} == {
+            users[0].id: '',
+            users[1].id: '',
+        }
+        assert {user_id: submission.enrollment_track for user_id, submission in submissions.items()} == {
+            users[0].id: 'verified',
+            users[1].id: 'audit',
+        }
+
+    @data(*[
+        {},
+        {'answers': 'not a list'},
+        {'answers': [{'user': 'someone'}]},
+        {'answers': ['not a dict']},
+    ])
+    def test_submit_external_answers_invalid(self, body):
+        """submit_external_answers should reject invalid requests and problems which aren't open"""
+        resp = self.aside_instance.submit_external_answers(Mock(json=body))
+        assert resp.status_code == 400
+
+        resp = self.aside_instance.submit_external_answers(Mock(json={'answers': []}))
+        assert resp.status_code == 400
+        assert resp.json == "Problem is not open"
+
     @pytest.mark.skip(reason="Somehow the test runtime doesn't allow accessing xblock keys")
     def test_toggle_block_enabled(self):
         """
@@ -239,6 +517,68 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
         assert resp.status_code == 200
         assert resp.json['is_open'] == is_open
 
+    def test_responses_not_admitted(self):
+        """
+        Polls which aren't admitted should get the last good payload marked as stale, or a 503 if there isn't one
+        """
+        last_good_payloads.clear()
+        RapidResponseRun.objects.create(
+            problem_usage_key=self.aside_instance.wrapped_block_usage_key,
+            course_key=self.aside_instance.course_key,
+            open=True,
+        )
+        with self.patch_modulestore(), patch.object(aggregate_admission, 'try_acquire', return_value=False):
+            resp = self.aside_instance.responses()
+        assert resp.status_code == 503
+        assert resp.headers['Retry-After'] == '10'
+
+        with self.patch_modulestore():
+            good_resp = self.aside_instance.responses()
+        with self.patch_modulestore(), patch.object(aggregate_admission, 'try_acquire', return_value=False):
+            resp = self.aside_instance.responses()
+        assert resp.status_code == 200
+        assert resp.headers['Retry-After'] == '10'
+        assert resp.json['stale'] is True
+        assert resp.json['retry_after_seconds'] == 10
+        assert resp.json['poll_interval_millis'] == 10000
+        assert resp.json['runs'] == good_resp.json['runs']
+        assert resp.json['counts'] == good_resp.json['counts']
+        assert resp.json['is_open'] is True
+
+    def test_responses_not_admitted_closed(self):
+        """
+        A stale payload should have the current open status, and closing the problem should drop the stale payloads
+        """
+        last_good_payloads.clear()
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=self.aside_instance.wrapped_block_usage_key,
+            course_key=self.aside_instance.course_key,
+            open=True,
+        )
+        with self.patch_modulestore():
+            good_resp = self.aside_instance.responses()
+        assert good_resp.json['is_open'] is True
+        assert good_resp.json['runs'][0]['open'] is True
+
+        # Closed by another process, which can't drop this process's payloads
+        RapidResponseRun.objects.filter(id=run.id).update(open=False)
+        cache.clear()
+        with self.patch_modulestore(), patch.object(aggregate_admission, 'try_acquire', return_value=False):
+            resp = self.aside_instance.responses()
+        assert resp.status_code == 200
+        assert resp.json['stale'] is True
+        assert resp.json['is_open'] is False
+        assert resp.json['runs'][0]['open'] is False
+
+        RapidResponseRun.objects.filter(id=run.id).update(open=True)
+        cache.clear()
+        with self.patch_modulestore():
+            self.aside_instance.responses()
+        self.aside_instance.toggle_block_open_status(Mock(params={}))
+        with self.patch_modulestore(), patch.object(aggregate_admission, 'try_acquire', return_value=False):
+            resp = self.aside_instance.responses()
+        assert resp.status_code == 503
+
     @data(True, False)
     def test_responses(self, has_runs):
         """
@@ -290,7 +630,9 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
         ) as get_counts_mock, patch(
             'rapid_response_xblock.block.RapidResponseAside.choices',
             new_callable=PropertyMock
-        ) as get_choices_mock:
+        ) as get_choices_mock, patch(
+            'rapid_response_xblock.backends.DatabaseSubmissionBackend.count_segmented_answers',
+        ) as count_segmented_mock:
             get_choices_mock.return_value = choices
             resp = self.aside_instance.responses()
 
@@ -306,6 +648,10 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
         }
         assert resp.json['counts'] == counts_with_str_keys
         assert resp.json['total_counts'] == expected_total_counts
+        assert resp.json['segmented_counts'] == {}
+        assert resp.json['poll_interval_millis'] == (
+            POLL_INTERVAL_ACTIVE_MILLIS if has_runs else POLL_INTERVAL_IDLE_MILLIS
+        )
 
         now = datetime.now(tz=pytz.utc)
         minute = timedelta(minutes=1)
@@ -313,6 +659,21 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
 
         get_choices_mock.assert_called_once_with()
         get_counts_mock.assert_called_once_with([run.id for run in run_queryset], choices)
+        # Segmenting is off by default, so the segmented counts aren't looked up
+        count_segmented_mock.assert_not_called()
+
+    def test_poll_interval(self):
+        """The recommended poll interval should depend on whether answers are arriving and how busy the server is"""
+        cache.clear()
+        assert get_poll_interval_millis(None, 0, 0.01) == POLL_INTERVAL_IDLE_MILLIS
+        assert get_poll_interval_millis(1, 0, 5) == POLL_INTERVAL_BUSY_MILLIS
+
+        with patch('rapid_response_xblock.block.time.time', return_value=1000):
+            assert get_poll_interval_millis(1, 3, 0.01) == POLL_INTERVAL_ACTIVE_MILLIS
+        with patch('rapid_response_xblock.block.time.time', return_value=1000 + POLL_ACTIVE_SECONDS):
+            assert get_poll_interval_millis(1, 3, 0.01) == POLL_INTERVAL_IDLE_MILLIS
+            # A new answer makes the run active again
+            assert get_poll_interval_millis(1, 4, 0.01) == POLL_INTERVAL_ACTIVE_MILLIS
 
     def test_choices(self):
         """
@@ -379,6 +740,141 @@ class RapidResponseAsideTests(RuntimeEnabledTestCase):
 
         assert RapidResponseAside.get_counts_for_problem(run_ids, choices) == counts_dict
 
+    def test_timeline(self):
+        """
+        The timeline API should return per-answer counts for each time bucket of the latest run
+        """
+        course_id = self.aside_instance.course_key
+        problem_id = self.aside_instance.wrapped_block_usage_key
+        RapidResponseRun.objects.create(course_key=course_id, problem_usage_key=problem_id, open=False)
+        run = RapidResponseRun.objects.create(course_key=course_id, problem_usage_key=problem_id, open=True)
+        run_start = run.created.replace(microsecond=0)
+        for seconds, answer_id in [
+                (1, 'choice_0'), (2, 'choice_0'), (5, 'choice_1'), (12, 'choice_0'), (25, 'choice_1'),
+        ]:
+            submission = RapidResponseSubmission.objects.create(
+                run=run,
+                user_id=UserFactory.create().id,
+                answer_id=answer_id,
+                event={},
+            )
+            RapidResponseSubmission.objects.filter(id=submission.id).update(
+                created=run_start + timedelta(seconds=seconds)
+            )
+
+        resp = self.aside_instance.timeline(Mock(params={}))
+        assert resp.status_code == 200
+        assert resp.json['run_id'] == run.id
+        assert resp.json['is_open'] is True
+        assert resp.json['bucket_seconds'] == 10
+        assert resp.json['buckets'] == [
+            [0, 'choice_0', 2],
+            [0, 'choice_1', 1],
+            [1, 'choice_0', 1],
+            [2, 'choice_1', 1],
+        ]
+
+        resp = self.aside_instance.timeline(Mock(params={'bucket_seconds': '20', 'since': '1', 'run_id': str(run.id)}))
+        assert resp.json['buckets'] == [[1, 'choice_1', 1]]
+
+    @data(
+        [{'bucket_seconds': 'ten'}, 400],
+        [{'run_id': '0'}, 404],
+    )
+    @unpack
+    def test_timeline_invalid(self, params, expected_status):
+        """The timeline API should reject invalid parameters and unknown runs"""
+        RapidResponseRun.objects.create(
+            course_key=self.aside_instance.course_key,
+            problem_usage_key=self.aside_instance.wrapped_block_usage_key,
+        )
+        resp = self.aside_instance.timeline(Mock(params=params))
+        assert resp.status_code == expected_status
+
+    def test_latency(self):
+        """
+        The latency API should return percentiles and a histogram of seconds_to_answer, overall and per answer
+        """
+        course_id = self.aside_instance.course_key
+        problem_id = self.aside_instance.wrapped_block_usage_key
+        run = RapidResponseRun.objects.create(course_key=course_id, problem_usage_key=problem_id, open=True)
+        for seconds, answer_id in [(1.5, 'choice_0'), (2.2, 'choice_0'), (5.9, 'choice_1'), (12, 'choice_0')]:
+            RapidResponseSubmission.objects.create(
+                run=run,
+                user_id=UserFactory.create().id,
+                answer_id=answer_id,
+                seconds_to_answer=seconds,
+                event={},
+            )
+
+        resp = self.aside_instance.latency(Mock(params={}))
+        assert resp.status_code == 200
+        assert resp.json['run_id'] == run.id
+        assert resp.json['bin_seconds'] == 10
+        assert resp.json['overall'] == {
+            'count': 4,
+            'percentiles': {'25': 1, '50': 2, '75': 5, '90': 12, '95': 12},
+            'histogram': [[0, 3], [1, 1]],
+        }
+        assert resp.json['choices']['choice_0']['count'] == 3
+        assert resp.json['choices']['choice_0']['percentiles']['50'] == 2
+        assert resp.json['choices']['choice_1']['histogram'] == [[0, 1]]
+
+        resp = self.aside_instance.latency(Mock(params={'bin_seconds': 'ten'}))
+        assert resp.status_code == 400
+
+    def test_transitions(self):
+        """
+        The transitions API should count the students moving between each pair of answers from one run to another
+        """
+        course_id = self.aside_instance.course_key
+        problem_id = self.aside_instance.wrapped_block_usage_key
+        run1 = RapidResponseRun.objects.create(course_key=course_id, problem_usage_key=problem_id, open=False)
+        run2 = RapidResponseRun.objects.create(course_key=course_id, problem_usage_key=problem_id, open=False)
+        choices = [
+            {'answer_id': 'choice_0', 'answer_text': 'an incorrect answer'},
+            {'answer_id': 'choice_1', 'answer_text': 'the correct answer'},
+        ]
+        # The last two students only answered in one of the runs
+        for first_answer, second_answer in [
+                ('choice_0', 'choice_1'),
+                ('choice_0', 'choice_1'),
+                ('choice_1', 'choice_1'),
+                ('choice_0', None),
+                (None, 'choice_0'),
+        ]:
+            user = UserFactory.create()
+            for run, answer_id in [(run1, first_answer), (run2, second_answer)]:
+                if answer_id is not None:
+                    RapidResponseSubmission.objects.create(run=run, user_id=user.id, answer_id=answer_id, event={})
+
+        with patch(
+            'rapid_response_xblock.block.RapidResponseAside.choices', new_callable=PropertyMock, return_value=choices,
+        ):
+            resp = self.aside_instance.transitions(Mock(params={'from_run': str(run1.id), 'to_run': str(run2.id)}))
+        assert resp.status_code == 200
+        assert resp.json == {
+            'from_run': run1.id,
+            'to_run': run2.id,
+            'choices': choices,
+            'matrix': {
+                'choice_0': {'choice_0': 0, 'choice_1': 2},
+                'choice_1': {'choice_0': 0, 'choice_1': 1},
+            },
+            'total': 3,
+        }
+
+    @data(
+        [{'from_run': '1'}, 400],
+        [{'from_run': 'one', 'to_run': '2'}, 400],
+        [{'from_run': '0', 'to_run': '0'}, 404],
+    )
+    @unpack
+    def test_transitions_invalid(self, params, expected_status):
+        """The transitions API should reject missing or invalid parameters and unknown runs"""
+        resp = self.aside_instance.transitions(Mock(params=params))
+        assert resp.status_code == expected_status
+
     def test_serialize_runs(self):
         """
         serialize_runs should return a serialized representation of runs for a problem
@@ -0,0 +1,210 @@
+"""Tests for the submission backends"""
+import os
+import shutil
+import tempfile
+
+from ddt import data, ddt
+from django.test import TestCase, override_settings
+from opaque_keys.edx.keys import UsageKey
+
+from rapid_response_xblock.backends import (
+    DatabaseSubmissionBackend,
+    LogSubmissionBackend,
+    SubmissionRecord,
+    SUBMISSION_FIELDS,
+)
+from rapid_response_xblock.models import RapidResponseRun
+from common.djangoapps.student.tests.factories import UserFactory
+
+
+@ddt
+class SubmissionBackendTests(TestCase):
+    """Tests which every submission backend should pass"""
+
+    def setUp(self):
+        super().setUp()
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(log_dir))
+        self.log_path = os.path.join(log_dir, 'submissions.log')
+
+        problem_usage_key = UsageKey.from_string("block-v1:SGAU+SGA101+2017_SGA+type@problem+block@problem0")
+        self.runs = [
+            RapidResponseRun.objects.create(
+                problem_usage_key=problem_usage_key,
+                course_key=problem_usage_key.course_key,
+            ) for _ in range(2)
+        ]
+        self.users = [UserFactory.create() for _ in range(3)]
+
+    def make_backend(self, backend_class):
+        """Create a backend which stores submissions somewhere private to the test"""
+        if backend_class is LogSubmissionBackend:
+            return LogSubmissionBackend(path=self.log_path)
+        return backend_class()
+
+    def record(self, backend, run, user, answer_id, segments=None):
+        """Record a submission with a backend"""
+        backend.record_submission(SubmissionRecord(
+            run_id=run.id,
+            user_id=user.id,
+            answer_id=answer_id,
+            answer_text=f"text for {answer_id}",
+            correct=answer_id == 'choice_1',
+            seconds_to_answer=1.5,
+            segments=segments or {},
+            event={'name': 'problem_check'},
+        ))
+
+    @data(DatabaseSubmissionBackend, LogSubmissionBackend)
+    def test_count_answers(self, backend_class):
+        """Submissions should be counted per answer and run, with a new submission replacing the old one"""
+        backend = self.make_backend(backend_class)
+        self.record(backend, self.runs[0], self.users[0], 'choice_0')
+        self.record(backend, self.runs[0], self.users[1], 'choice_0')
+        self.record(backend, self.runs[0], self.users[0], 'choice_1')
+        self.record(backend, self.runs[1], self.users[2], 'choice_1')
+
+        assert backend.count_answers([self.runs[0].id]) == {
+            ('choice_0', self.runs[0].id): 1,
+            ('choice_1', self.runs[0].id): 1,
+        }
+        assert backend.count_answers([run.id for run in self.runs]) == {
+            ('choice_0', self.runs[0].id): 1,
+            ('choice_1', self.runs[0].id): 1,
+            ('choice_1', self.runs[1].id): 1,
+        }
+
+    @data(DatabaseSubmissionBackend, LogSubmissionBackend)
+    @override_settings(RAPID_RESPONSE_SEGMENT_TYPES=['cohort'])
+    def test_count_segmented_answers(self, backend_class):
+        """Segmented counts should follow the latest submission of each learner"""
+        backend = self.make_backend(backend_class)
+        run_id = self.runs[0].id
+        self.record(backend, self.runs[0], self.users[0], 'choice_0', {'cohort': 'A'})
+        self.record(backend, self.runs[0], self.users[1], 'choice_0', {'cohort': 'B'})
+        self.record(backend, self.runs[0], self.users[0], 'choice_1', {'cohort': 'A'})
+
+        assert backend.count_segmented_answers([run_id]) == {
+            'cohort': {
+                'A': {'choice_1': {run_id: 1}},
+                'B': {'choice_0': {run_id: 1}},
+            },
+        }
+
+    def test_count_segmented_answers_off(self):
+        """The database shouldn't be queried for segmented counts when segmenting is off"""
+        backend = self.make_backend(DatabaseSubmissionBackend)
+        self.record(backend, self.runs[0], self.users[0], 'choice_0', {'cohort': 'A'})
+        with self.assertNumQueries(0):
+            assert backend.count_segmented_answers([self.runs[0].id]) == {}
+
+    @data(DatabaseSubmissionBackend, LogSubmissionBackend)
+    def test_list_submissions(self, backend_class):
+        """Submissions should be listed in order of id, a chunk at a time, leaving out replaced submissions"""
+        backend = self.make_backend(backend_class)
+        for user in self.users:
+            self.record(backend, self.runs[0], user, 'choice_0')
+        self.record(backend, self.runs[1], self.users[0], 'choice_0')
+        self.record(backend, self.runs[0], self.users[0], 'choice_1')
+
+        submissions = backend.list_submissions([self.runs[0].id])
+        assert [(s['user_id'], s['answer_id']) for s in submissions] == [
+            (self.users[1].id, 'choice_0'),
+            (self.users[2].id, 'choice_0'),
+            (self.users[0].id, 'choice_1'),
+        ]
+        assert set(submissions[0]) == set(SUBMISSION_FIELDS)
+        assert submissions[0]['answer_text'] == 'text for choice_0'
+        assert submissions[0]['created'] is not None
+
+        ids = [s['id'] for s in submissions]
+        assert ids == sorted(ids)
+        first_chunk = backend.list_submissions([self.runs[0].id], limit=2)
+        assert [s['id'] for s in first_chunk] == ids[:2]
+        second_chunk = backend.list_submissions([self.runs[0].id], after_id=first_chunk[-1]['id'], limit=2)
+        assert [s['id'] for s in second_chunk] == ids[2:]
+        assert backend.list_submissions([self.runs[0].id], after_id=ids[-1]) == []
+        assert backend.list_submissions([self.runs[0].id], limit=1, fields=['id', 'answer_id']) == [
+            {'id': ids[0], 'answer_id': 'choice_0'},
+        ]
+
+    @data(DatabaseSubmissionBackend, LogSubmissionBackend)
+    def test_iter_submission_values(self, backend_class):
+        """Some of the values of each current submission should be read in order of id, a chunk at a time"""
+        backend = self.make_backend(backend_class)
+        for user in self.users:
+            self.record(backend, self.runs[0], user, 'choice_0')
+        self.record(backend, self.runs[0], self.users[0], 'choice_1')
+
+        values = list(backend.iter_submission_values([self.runs[0].id], ['user_id', 'answer_id'], chunk_size=2))
+        assert values == [
+            (self.users[1].id, 'choice_0'),
+            (self.users[2].id, 'choice_0'),
+            (self.users[0].id, 'choice_1'),
+        ]
+
+    @data(DatabaseSubmissionBackend, LogSubmissionBackend)
+    @override_settings(RAPID_RESPONSE_SEGMENT_TYPES=['cohort'])
+    def test_record_submissions(self, backend_class):
+        """A batch of submissions should replace earlier ones, keeping the last one for a user in the batch"""
+        backend = self.make_backend(backend_class)
+        run_id = self.runs[0].id
+        self.record(backend, self.runs[0], self.users[0], 'choice_0', {'cohort': 'A'})
+        records = [
+            SubmissionRecord(
+                run_id=run_id,
+                user_id=user.id,
+                answer_id=answer_id,
+                answer_text=answer_id,
+                correct=False,
+                seconds_to_answer=2.0,
+                segments={'cohort': 'A'},
+                event={},
+            ) for user, answer_id in [
+                (self.users[0], 'choice_1'),
+                (self.users[1], 'choice_1'),
+                (self.users[1], 'choice_2'),
+            ]
+        ]
+        backend.record_submissions(records)
+
+        assert backend.count_answers([run_id]) == {('choice_1', run_id): 1, ('choice_2', run_id): 1}
+        assert backend.count_segmented_answers([run_id]) == {
+            'cohort': {'A': {'choice_1': {run_id: 1}, 'choice_2': {run_id: 1}}},
+        }
+
+    @data(DatabaseSubmissionBackend, LogSubmissionBackend)
+    @override_settings(RAPID_RESPONSE_SEGMENT_TYPES=['cohort'])
+    def test_duplicate_event(self, backend_class):
+        """A submission from the same event as the user's current submission should be skipped"""
+        backend = self.make_backend(backend_class)
+        record = SubmissionRecord(
+            run_id=self.runs[0].id,
+            user_id=self.users[0].id,
+            answer_id='choice_0',
+            answer_text='choice_0',
+            correct=False,
+            seconds_to_answer=1.0,
+            segments={'cohort': 'A'},
+            event={},
+            event_id='event-1',
+        )
+        assert backend.record_submission(record) is True
+        assert backend.record_submission(record) is False
+        assert backend.record_submissions([record, record._replace(user_id=self.users[1].id)]) == 1
+        assert backend.record_submission(record._replace(answer_id='choice_1', event_id='event-2')) is True
+
+        run_id = self.runs[0].id
+        assert backend.count_answers([run_id]) == {('choice_0', run_id): 1, ('choice_1', run_id): 1}
+        assert backend.count_segmented_answers([run_id]) == {
+            'cohort': {'A': {'choice_0': {run_id: 1}, 'choice_1': {run_id: 1}}},
+        }
+
+    def test_log_shared_between_processes(self):
+        """Each LogSubmissionBackend should see the submissions another one appended to the same log"""
+        writer = self.make_backend(LogSubmissionBackend)
+        reader = self.make_backend(LogSubmissionBackend)
+        self.record(writer, self.runs[0], self.users[0], 'choice_0')
+        assert reader.count_answers([self.runs[0].id]) == {('choice_0', self.runs[0].id): 1}
+        self.record(writer, self.runs[0], self.users[0], 'choice_1')
+        assert reader.count_answers([self.runs[0].id]) == {('choice_1', self.runs[0].id): 1}
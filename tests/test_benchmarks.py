@@ -0,0 +1,247 @@
+"""
+Benchmarks for the hot paths of rapid response.
+
+These run as part of the regular test suite so that they stay working, but they only
+print their results (run pytest with -s to see them) rather than asserting on timings.
+"""
+import copy
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+import pytest
+from opaque_keys.edx.keys import UsageKey
+from xmodule.modulestore.django import modulestore
+
+from tests.utils import make_scope_ids, measure_rate, RuntimeEnabledTestCase
+from rapid_response_xblock.backends import DatabaseSubmissionBackend, LogSubmissionBackend, SubmissionRecord
+from rapid_response_xblock.block import RapidResponseAside, should_apply_cache
+from rapid_response_xblock.logger import SubmissionRecorder
+from rapid_response_xblock.models import RapidResponseRun, RapidResponseSubmission
+from common.djangoapps.student.tests.factories import UserFactory
+
+
+NUM_BENCHMARK_EVENTS = 5000
+NUM_BENCHMARK_RENDERS = 200
+# Modules which are only needed to render the aside, and which the submission recorder shouldn't import.
+# django.template isn't here since django.setup() always loads it.
+RENDERING_MODULES = [
+    'pkg_resources',
+    'xblock.core',
+    'web_fragments',
+    'webob',
+    'xmodule.modulestore',
+]
+# Written to stderr between setting up Django and importing the module being measured
+IMPORT_TIME_MARKER = 'rapid-response-import-time'
+# Only the apps which the submission recorder needs, since the other LMS apps load the rendering modules
+MINIMAL_IMPORT_SETTINGS = {
+    'INSTALLED_APPS': ['django.contrib.auth', 'django.contrib.contenttypes', 'rapid_response_xblock'],
+    'DATABASES': {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+}
+# Rough proportions of event types seen by tracking backends during a live lecture
+NON_SUBMISSION_EVENT_NAMES = [
+    '/courses/course-v1:ReplaceStatic+ReplaceStatic+2018_T1/courseware',
+    'play_video',
+    'pause_video',
+    'seq_goto',
+    'problem_show',
+    'edx.ui.lms.sequence.tab_selected',
+    'problem_graded',
+    'showanswer',
+]
+
+
+# pylint: disable=no-member
+@pytest.mark.usefixtures("example_event")
+class SubmissionRecorderBenchmark(RuntimeEnabledTestCase):
+    """Measure how many tracking events per second SubmissionRecorder.send can handle"""
+
+    def setUp(self):
+        super().setUp()
+        usage_key = UsageKey.from_string(self.example_event['data']['problem_id'])
+        self.run = RapidResponseRun.objects.create(
+            problem_usage_key=usage_key,
+            course_key=usage_key.course_key,
+            open=True,
+        )
+        self.users = [UserFactory.create() for _ in range(20)]
+
+    def make_events(self):
+        """
+        Build a mix of events: mostly non-submission events, some submissions for problems
+        which are not open for rapid response, and some submissions for the open problem
+        """
+        closed_problem_event = copy.deepcopy(self.example_event)
+        closed_problem_event['data']['problem_id'] = closed_problem_event['data']['problem_id'].replace(
+            '2582bbb68672426297e525b49a383eb8', 'closedproblem'
+        )
+        templates = [{'name': name, 'data': {}, 'context': {}} for name in NON_SUBMISSION_EVENT_NAMES]
+        templates += [closed_problem_event, self.example_event]
+
+        events = []
+        for index, template in enumerate(itertools.islice(itertools.cycle(templates), NUM_BENCHMARK_EVENTS)):
+            event = copy.deepcopy(template)
+            event['context']['user_id'] = self.users[(index // len(templates)) % len(self.users)].id
+            # Every event happens at a different time, so none of them are dropped as duplicates
+            event['context']['time'] = f"2018-02-06T17:06:44.{index:06d}Z"
+            events.append(event)
+        return events
+
+    def test_send_throughput(self):
+        """Benchmark events per second through SubmissionRecorder.send"""
+        recorder = SubmissionRecorder()
+        rate = measure_rate(recorder.send, self.make_events(), "SubmissionRecorder.send")
+        assert rate > 0
+        assert RapidResponseSubmission.objects.filter(run=self.run).count() == len(self.users)
+
+
+class AsideRenderBenchmark(RuntimeEnabledTestCase):
+    """Measure the cost of rendering the aside for every block of the test course"""
+
+    def render(self, aside, block):
+        """Render the aside for a block the way the runtime does, if it applies to the block"""
+        if RapidResponseAside.should_apply_to_block(block):
+            return aside.student_view_aside(block)
+        return None
+
+    def test_render_course(self):
+        """Benchmark rendering the aside for repeated renders of the 2017_SGA course, with and without caching"""
+        blocks = modulestore().get_items(self.course.id)
+        aside = RapidResponseAside(
+            scope_ids=make_scope_ids(UsageKey.from_string(
+                "aside-usage-v2:block-v1$:SGAU+SGA101+2017_SGA+type@problem+block"
+                "@2582bbb68672426297e525b49a383eb8::rapid_response_xblock"
+            )),
+            runtime=self.runtime,
+        )
+        renders = blocks * NUM_BENCHMARK_RENDERS
+
+        def uncached(block):
+            """Render the aside for a block with the cache cleared first"""
+            should_apply_cache.clear()
+            self.render(aside, block)
+
+        with patch('rapid_response_xblock.block.RapidResponseAside.enabled', new=True):
+            fragments = [self.render(aside, block) for block in blocks]
+            assert any(fragment is not None and fragment.content for fragment in fragments)
+            measure_rate(uncached, renders, "render aside (uncached)")
+            should_apply_cache.clear()
+            measure_rate(lambda block: self.render(aside, block), renders, "render aside (cached)")
+        assert len(should_apply_cache) > 0
+
+
+class SubmissionBackendBenchmark(RuntimeEnabledTestCase):
+    """Compare how many submissions per second each submission backend can record and count"""
+
+    def setUp(self):
+        super().setUp()
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(log_dir))
+        self.log_path = os.path.join(log_dir, 'submissions.log')
+        usage_key = UsageKey.from_string("block-v1:SGAU+SGA101+2017_SGA+type@problem+block@problem0")
+        self.run = RapidResponseRun.objects.create(
+            problem_usage_key=usage_key,
+            course_key=usage_key.course_key,
+            open=True,
+        )
+        self.users = [UserFactory.create() for _ in range(20)]
+
+    def make_records(self):
+        """Build submissions which repeatedly replace the answers of a class of learners"""
+        return [
+            SubmissionRecord(
+                run_id=self.run.id,
+                user_id=self.users[index % len(self.users)].id,
+                answer_id=f"choice_{index % 3}",
+                answer_text='an answer',
+                correct=index % 3 == 0,
+                seconds_to_answer=float(index),
+                segments={},
+                event={'name': 'problem_check'},
+            ) for index in range(NUM_BENCHMARK_EVENTS // 5)
+        ]
+
+    def test_record_throughput(self):
+        """Benchmark recording submissions and counting the answers after each one"""
+        for backend in [DatabaseSubmissionBackend(), LogSubmissionBackend(path=self.log_path)]:
+            name = type(backend).__name__
+
+            def record_and_count(record, backend=backend):
+                """Record a submission then count the answers, as a poll of the chart would"""
+                backend.record_submission(record)
+                backend.count_answers([self.run.id])
+
+            measure_rate(backend.record_submission, self.make_records(), f"{name}.record_submission")
+            measure_rate(record_and_count, self.make_records(), f"{name} record and count")
+            assert sum(backend.count_answers([self.run.id]).values()) == len(self.users)
+
+
+def measure_import(module_name, minimal_settings=True):
+    """
+    Import a module in a new interpreter with -X importtime, after setting up Django
+
+    Args:
+        module_name (str): The module to import
+        minimal_settings (bool): If True Django is set up with MINIMAL_IMPORT_SETTINGS, so that the modules
+            loaded by the other apps of the LMS don't hide what importing the module loads. Otherwise the
+            settings of the test suite are used.
+
+    Returns:
+        (float, set of str, set of str): The cumulative import time in seconds, the modules which were loaded
+            while setting up Django, and the modules which were newly loaded by importing the module
+    """
+    setup = f"settings.configure(**{MINIMAL_IMPORT_SETTINGS!r}); " if minimal_settings else ""
+    code = (
+        "import json, sys, django; from django.conf import settings; "
+        f"{setup}django.setup(); "
+        "loaded = set(sys.modules); "
+        f"sys.stderr.write({IMPORT_TIME_MARKER!r} + '\\n'); sys.stderr.flush(); "
+        f"import {module_name}; "
+        "print(json.dumps([sorted(loaded), sorted(set(sys.modules) - loaded)]))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = result.stderr.split(IMPORT_TIME_MARKER, 1)[1].splitlines()
+    cumulative_times = {}
+    for line in lines:
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            cumulative_times[name.strip()] = int(cumulative)
+    loaded, imported = json.loads(result.stdout.splitlines()[-1])
+    return cumulative_times.get(module_name, 0) / 1000000, set(loaded), set(imported)
+
+
+def find_rendering_modules(modules):
+    """Find the modules which belong to RENDERING_MODULES"""
+    return sorted(
+        name for name in modules
+        if any(name == module or name.startswith(f"{module}.") for module in RENDERING_MODULES)
+    )
+
+
+class ImportTimeBenchmark(RuntimeEnabledTestCase):
+    """Measure how long it takes a process which loads the tracking backends to import the submission recorder"""
+
+    def test_logger_import_time(self):
+        """Benchmark importing the submission recorder against importing the aside"""
+        logger_seconds, loaded, imported = measure_import('rapid_response_xblock.logger')
+        block_seconds, _, _ = measure_import('rapid_response_xblock.block', minimal_settings=False)
+        print(f"import rapid_response_xblock.logger: {logger_seconds:.3f}s")
+        print(f"import rapid_response_xblock.block: {block_seconds:.3f}s")
+        # Otherwise the check below would pass no matter what the recorder imports
+        assert find_rendering_modules(loaded) == []
+        assert 'rapid_response_xblock.logger' in imported
+        assert 'rapid_response_xblock.block' not in imported
+        assert find_rendering_modules(imported) == []
@@ -1,9 +1,12 @@
 """Just here to verify tests are running"""
+import copy
 from unittest import mock
 import pytest
 
 from ddt import data, ddt, unpack
+from django.core.cache import cache
 from django.http.request import HttpRequest
+from django.test import override_settings
 
 from opaque_keys.edx.keys import UsageKey
 from opaque_keys.edx.locator import CourseLocator
@@ -13,10 +16,15 @@ from tests.utils import (
     RuntimeEnabledTestCase,
 )
 from rapid_response_xblock.models import (
+    RapidResponseAnswerCount,
     RapidResponseRun,
     RapidResponseSubmission,
 )
-from rapid_response_xblock.logger import SubmissionRecorder
+from rapid_response_xblock.logger import (
+    parse_course_key,
+    parse_usage_key,
+    SubmissionRecorder,
+)
 from xmodule.modulestore.django import modulestore
 from lms.djangoapps.courseware.block_render import load_single_xblock
 
@@ -167,6 +175,8 @@ class TestEvents(RuntimeEnabledTestCase):
         # Answer is the first one clicked
         assert obj.answer_text == 'an incorrect answer'
         assert obj.answer_id == 'choice_0'
+        assert obj.correct is False
+        assert 0 <= obj.seconds_to_answer <= (obj.created - obj.run.created).total_seconds()
         assert obj.event == example_event_data
 
     def assert_unsuccessful_event_parsing(self):
@@ -220,6 +230,97 @@ class TestEvents(RuntimeEnabledTestCase):
         SubmissionRecorder().send(self.example_event)
         self.assert_unsuccessful_event_parsing()
 
+    @data('play_video', 'problem_graded', None)
+    def test_non_submission_event(self, event_name):
+        """
+        Events which are not answer submissions should be rejected before any parsing happens
+        """
+        self.example_event['name'] = event_name
+        with mock.patch.object(SubmissionRecorder, 'parse_submission_event') as parse_mock:
+            SubmissionRecorder().send(self.example_event)
+        parse_mock.assert_not_called()
+        self.assert_unsuccessful_event_parsing()
+
+    def test_parsed_keys_are_cached(self):
+        """
+        Repeated problem and course ids should only be parsed once
+        """
+        problem_id = self.example_event['data']['problem_id']
+        course_id = self.example_event['context']['course_id']
+        assert parse_usage_key(problem_id) is parse_usage_key(problem_id)
+        assert parse_usage_key(problem_id) == UsageKey.from_string(problem_id)
+        assert parse_course_key(course_id) is parse_course_key(course_id)
+        assert parse_course_key(course_id) == CourseLocator.from_string(course_id)
+
+    @override_settings(RAPID_RESPONSE_SEGMENT_TYPES=['cohort', 'enrollment_track'])
+    def test_segmented_counts(self):
+        """
+        Each submission should be counted for the learner's segments, and a replaced answer should be uncounted
+        """
+        cache.clear()
+        segments = {'cohort': 'Blue', 'enrollment_track': 'verified'}
+        answer_key = list(self.example_event['data']['answers'].keys())[0]
+        recorder = SubmissionRecorder()
+        with mock.patch('rapid_response_xblock.segments.lookup_segments', return_value=segments) as lookup_mock:
+            recorder.send(self.example_event)
+            self.example_event['data']['answers'][answer_key] = 'choice_1'
+            recorder.send(self.example_event)
+        # The segments are only looked up once for the run
+        lookup_mock.assert_called_once()
+
+        submission = RapidResponseSubmission.objects.get()
+        assert submission.cohort == 'Blue'
+        assert submission.enrollment_track == 'verified'
+        counts = {
+            (count.segment_type, count.segment, count.answer_id): count.count
+            for count in RapidResponseAnswerCount.objects.filter(run=self.example_status)
+        }
+        assert counts == {
+            ('cohort', 'Blue', 'choice_0'): 0,
+            ('cohort', 'Blue', 'choice_1'): 1,
+            ('enrollment_track', 'verified', 'choice_0'): 0,
+            ('enrollment_track', 'verified', 'choice_1'): 1,
+        }
+
+    def test_duplicate_events(self):
+        """
+        A copy of an event which was already recorded should be dropped without touching the database
+        """
+        recorder = SubmissionRecorder()
+        recorder.send(self.example_event)
+        submission = RapidResponseSubmission.objects.get()
+        assert submission.event_id is not None
+
+        with self.assertNumQueries(0):
+            recorder.send(copy.deepcopy(self.example_event))
+        assert recorder.suppressed_duplicates == 1
+        assert RapidResponseSubmission.objects.get().id == submission.id
+
+    def test_duplicate_events_other_process(self):
+        """
+        A copy of an event which another process recorded should be recognized from the stored submission
+        """
+        SubmissionRecorder().send(self.example_event)
+        submission = RapidResponseSubmission.objects.get()
+
+        recorder = SubmissionRecorder()
+        recorder.send(copy.deepcopy(self.example_event))
+        assert recorder.suppressed_duplicates == 1
+        assert RapidResponseSubmission.objects.get().id == submission.id
+
+    def test_resubmitted_same_answer(self):
+        """
+        Submitting the same answer again later is a new event, which replaces the old submission
+        """
+        recorder = SubmissionRecorder()
+        recorder.send(self.example_event)
+        submission = RapidResponseSubmission.objects.get()
+
+        self.example_event['context']['time'] = '2018-02-06T17:07:02.512Z'
+        recorder.send(self.example_event)
+        assert recorder.suppressed_duplicates == 0
+        assert RapidResponseSubmission.objects.get().id != submission.id
+
     def test_missing_event_data(self):
         """
         If the event data is missing no event should be recorded
@@ -0,0 +1,146 @@
+"""Tests for course-wide exports"""
+import csv
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+import zipfile
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from opaque_keys.edx.keys import UsageKey
+
+from tests.utils import RuntimeEnabledTestCase
+from rapid_response_xblock.backends import DatabaseSubmissionBackend
+from rapid_response_xblock.exports import (
+    EXPORT_COLUMNS,
+    EXPORT_SUBMISSION_FIELDS,
+    get_export_runs,
+    process_export_job,
+    serialize_export_job,
+    start_export_job,
+)
+from rapid_response_xblock.models import (
+    RapidResponseExportJob,
+    RapidResponseRun,
+    RapidResponseSubmission,
+)
+from common.djangoapps.student.tests.factories import UserFactory
+
+
+class ExportTests(RuntimeEnabledTestCase):
+    """Tests for exporting the runs of a course"""
+
+    def setUp(self):
+        super().setUp()
+        storage_dir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(storage_dir))
+        self.storage = FileSystemStorage(location=storage_dir)
+
+        self.runs = [
+            RapidResponseRun.objects.create(
+                problem_usage_key=UsageKey.from_string(
+                    f"block-v1:SGAU+SGA101+2017_SGA+type@problem+block@problem{index}"
+                ),
+                course_key=self.course_id,
+            ) for index in range(2)
+        ]
+        self.submissions = [
+            RapidResponseSubmission.objects.create(
+                run=run,
+                user=UserFactory.create(),
+                answer_id='choice_0',
+                answer_text='an incorrect answer',
+                correct=False,
+                event={},
+            ) for run in self.runs for _ in range(4)
+        ]
+
+    def read_archive(self, job):
+        """Read the rows of the CSV file in an export archive"""
+        with self.storage.open(job.archive_path, 'rb') as archive_file:
+            with zipfile.ZipFile(archive_file) as archive:
+                with archive.open('submissions.csv') as csv_file:
+                    return list(csv.reader(io.TextIOWrapper(csv_file, encoding='utf-8')))
+
+    def test_export(self):
+        """Every submission of the course should be written to the archive, one chunk at a time"""
+        job = RapidResponseExportJob.objects.create(course_key=self.course_id)
+        with patch(
+            'rapid_response_xblock.exports.get_export_runs', wraps=get_export_runs,
+        ) as get_runs_mock, patch(
+            'rapid_response_xblock.backends.DatabaseSubmissionBackend.list_submissions', autospec=True,
+            side_effect=DatabaseSubmissionBackend.list_submissions,
+        ) as list_mock:
+            job = process_export_job(job.id, storage=self.storage, chunk_size=3)
+
+        assert job.status == RapidResponseExportJob.STATUS_COMPLETE
+        # The runs should be looked up once for the whole job, and the events shouldn't be read
+        get_runs_mock.assert_called_once_with(job)
+        assert all(call.kwargs['fields'] == EXPORT_SUBMISSION_FIELDS for call in list_mock.call_args_list)
+        assert job.num_parts == 3
+        assert job.processed_rows == job.total_rows == len(self.submissions)
+        rows = self.read_archive(job)
+        assert rows[0] == [column for _, column in EXPORT_COLUMNS]
+        assert [int(row[0]) for row in rows[1:]] == [submission.id for submission in self.submissions]
+        first = self.submissions[0]
+        assert rows[1][7:] == [first.user.username, first.user.email, 'False']
+        # The part files should have been cleaned up
+        assert not any(self.storage.exists(f"{job.archive_path[:-4]}/part-{part:05d}.csv") for part in range(3))
+
+    def test_export_resume(self):
+        """An interrupted export should resume after the last chunk that was written"""
+        job = RapidResponseExportJob.objects.create(course_key=self.course_id)
+        job = process_export_job(job.id, storage=self.storage, chunk_size=3, max_chunks=2)
+        assert job.status == RapidResponseExportJob.STATUS_RUNNING
+        assert job.processed_rows == 6
+        assert serialize_export_job(job)['progress'] == 0.75
+
+        job = process_export_job(job.id, storage=self.storage, chunk_size=3)
+        assert job.status == RapidResponseExportJob.STATUS_COMPLETE
+        assert serialize_export_job(job)['progress'] == 1.0
+        rows = self.read_archive(job)
+        assert [int(row[0]) for row in rows[1:]] == [submission.id for submission in self.submissions]
+
+    def test_export_date_range(self):
+        """Only runs created in the date range should be exported"""
+        job = RapidResponseExportJob.objects.create(
+            course_key=self.course_id,
+            runs_created_after=self.runs[1].created,
+        )
+        job = process_export_job(job.id, storage=self.storage)
+        rows = self.read_archive(job)
+        assert {int(row[1]) for row in rows[1:]} == {self.runs[1].id}
+
+    def test_export_failure(self):
+        """A failure should be recorded on the job so it can be resumed later"""
+        job = RapidResponseExportJob.objects.create(course_key=self.course_id)
+        with patch(
+            'rapid_response_xblock.exports.write_export_archive', side_effect=IOError("disk full"),
+        ), pytest.raises(IOError):
+            process_export_job(job.id, storage=self.storage)
+        job.refresh_from_db()
+        assert job.status == RapidResponseExportJob.STATUS_FAILED
+        assert job.error == "disk full"
+
+        job = process_export_job(job.id, storage=self.storage)
+        assert job.status == RapidResponseExportJob.STATUS_COMPLETE
+        assert len(self.read_archive(job)) == len(self.submissions) + 1
+
+    def test_start_export_job(self):
+        """start_export_job should queue the export task once the job is committed"""
+        with patch('rapid_response_xblock.tasks.export_course_runs.delay') as delay_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                job = start_export_job(self.course_id)
+                delay_mock.assert_not_called()
+        delay_mock.assert_called_once_with(job.id)
+        assert job.status == RapidResponseExportJob.STATUS_PENDING
+
+    def test_command(self):
+        """The management command should run an export to completion"""
+        with patch('rapid_response_xblock.exports.get_export_storage', return_value=self.storage):
+            call_command('export_rapid_response_runs', str(self.course_id), '--chunk-size', '5')
+        job = RapidResponseExportJob.objects.get()
+        assert job.status == RapidResponseExportJob.STATUS_COMPLETE
+        assert len(self.read_archive(job)) == len(self.submissions) + 1
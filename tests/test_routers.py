@@ -0,0 +1,162 @@
+"""Tests for the database router"""
+from unittest.mock import PropertyMock, patch
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from opaque_keys.edx.keys import UsageKey
+
+from tests.utils import make_scope_ids, RuntimeEnabledTestCase
+from rapid_response_xblock.admission import last_good_payloads
+from rapid_response_xblock.block import RapidResponseAside
+from rapid_response_xblock.caches import is_read_pinned
+from rapid_response_xblock.models import RapidResponseRun, RapidResponseSubmission
+from rapid_response_xblock.routers import APP_LABEL, RapidResponseRouter, read_from_replica
+from rapid_response_xblock.runs import set_runs_open_status
+from rapid_response_xblock.utils import get_run_data_for_course
+
+
+REPLICA = 'rapid_response_replica'
+
+
+@override_settings(RAPID_RESPONSE_DATABASE='rapid_response', RAPID_RESPONSE_READ_DATABASE='rapid_response_replica')
+class RouterTests(TestCase):
+    """Tests for routing rapid response queries between databases"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.router = RapidResponseRouter()
+        self.problem_usage_key = UsageKey.from_string(
+            "block-v1:SGAU+SGA101+2017_SGA+type@problem+block@2582bbb68672426297e525b49a383eb8"
+        )
+        self.course_key = self.problem_usage_key.course_key
+
+    def test_writes(self):
+        """Writes of rapid response models should go to the rapid response database"""
+        assert self.router.db_for_write(RapidResponseSubmission) == 'rapid_response'
+        assert self.router.db_for_write(get_user_model()) is None
+
+    def test_reads(self):
+        """Reads should only go to the replica inside read_from_replica, and not if the reads are pinned"""
+        assert self.router.db_for_read(RapidResponseRun) == 'rapid_response'
+        with read_from_replica():
+            assert self.router.db_for_read(RapidResponseRun) == 'rapid_response_replica'
+            assert self.router.db_for_read(get_user_model()) is None
+        with read_from_replica(pinned=True):
+            assert self.router.db_for_read(RapidResponseRun) == 'rapid_response'
+        assert self.router.db_for_read(RapidResponseRun) == 'rapid_response'
+
+    @override_settings(RAPID_RESPONSE_READ_DATABASE=None)
+    def test_no_replica(self):
+        """Without a replica every read should go to the rapid response database"""
+        with read_from_replica():
+            assert self.router.db_for_read(RapidResponseRun) == 'rapid_response'
+
+    def test_migrate(self):
+        """The rapid response tables should only be created in the rapid response database"""
+        assert self.router.allow_migrate('rapid_response', 'rapid_response_xblock') is True
+        assert self.router.allow_migrate('default', 'rapid_response_xblock') is False
+        assert self.router.allow_migrate('default', 'auth') is None
+
+    def test_relation(self):
+        """Submissions should be allowed to refer to users in another database"""
+        submission = RapidResponseSubmission(answer_id='choice_0')
+        assert self.router.allow_relation(submission, get_user_model()()) is True
+        assert self.router.allow_relation(get_user_model()(), get_user_model()()) is None
+
+    @override_settings(RAPID_RESPONSE_DATABASE='default')
+    def test_pinned_after_toggle(self):
+        """Reads for a problem should stay off the replica right after it's opened or closed"""
+        assert is_read_pinned(self.course_key, self.problem_usage_key) is False
+        set_runs_open_status(self.course_key, [self.problem_usage_key], True)
+        assert is_read_pinned(self.course_key, self.problem_usage_key) is True
+
+        cache.clear()
+        RapidResponseRun.objects.create(problem_usage_key=self.problem_usage_key, course_key=self.course_key)
+        assert is_read_pinned(self.course_key, self.problem_usage_key) is True
+
+
+@override_settings(RAPID_RESPONSE_DATABASE='default', RAPID_RESPONSE_READ_DATABASE=REPLICA)
+class ReplicaTests(RuntimeEnabledTestCase):
+    """
+    Tests which write through the app and read through the handlers, with a second database standing in
+    for a replica. Nothing is copied to the replica, so a read which returns the new data wasn't answered by it.
+    """
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        # The router only lets the tables be migrated in the rapid response database, so they are created
+        # in the replica here like replication would
+        models = list(apps.get_app_config(APP_LABEL).get_models())
+        with connections[REPLICA].schema_editor() as editor:
+            for model in models:
+                editor.create_model(model)
+
+        def drop_tables():
+            """Drop the tables created in the replica"""
+            with connections[REPLICA].schema_editor() as editor:
+                for model in reversed(models):
+                    editor.delete_model(model)
+
+        cls.addClassCleanup(drop_tables)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        last_good_payloads.clear()
+        aside_usage_key = UsageKey.from_string(
+            "aside-usage-v2:block-v1$:SGAU+SGA101+2017_SGA+type@problem+block"
+            "@2582bbb68672426297e525b49a383eb8::rapid_response_xblock"
+        )
+        self.aside_instance = RapidResponseAside(scope_ids=make_scope_ids(aside_usage_key), runtime=self.runtime)
+        self.problem_usage_key = self.aside_instance.wrapped_block_usage_key
+
+    def get_responses(self):
+        """Get the payload of the responses handler"""
+        with self.patch_modulestore(), patch(
+            'rapid_response_xblock.block.RapidResponseAside.choices', new_callable=PropertyMock, return_value=[],
+        ):
+            resp = self.aside_instance.responses()
+        assert resp.status_code == 200
+        return resp.json
+
+    def test_read_from_replica(self):
+        """Once the reads aren't pinned any more they should be answered by the replica"""
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=self.problem_usage_key,
+            course_key=self.course_id,
+            open=True,
+        )
+        assert RapidResponseRun.objects.using('default').filter(id=run.id).exists()
+        assert not RapidResponseRun.objects.using(REPLICA).exists()
+
+        cache.clear()
+        assert list(get_run_data_for_course(self.course_id)) == []
+        assert get_run_data_for_course(self.course_id).db == REPLICA
+        payload = self.get_responses()
+        assert payload['runs'] == []
+        assert payload['is_open'] is False
+
+        # The replica catches up
+        RapidResponseRun.objects.using(REPLICA).bulk_create([run])
+        assert [item['id'] for item in get_run_data_for_course(self.course_id)] == [run.id]
+        payload = self.get_responses()
+        assert [item['id'] for item in payload['runs']] == [run.id]
+        assert payload['is_open'] is True
+
+    def test_pinned_reads(self):
+        """Reads right after a problem is opened should be answered by the rapid response database"""
+        set_runs_open_status(self.course_id, [self.problem_usage_key], True)
+        run = RapidResponseRun.objects.using('default').get()
+        assert not RapidResponseRun.objects.using(REPLICA).exists()
+
+        assert get_run_data_for_course(self.course_id).db == 'default'
+        assert [item['id'] for item in get_run_data_for_course(self.course_id)] == [run.id]
+        payload = self.get_responses()
+        assert [item['id'] for item in payload['runs']] == [run.id]
+        assert payload['is_open'] is True
@@ -0,0 +1,203 @@
+"""Tests for opening and closing runs, and for the cached open runs"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from opaque_keys.edx.keys import UsageKey
+
+from tests.utils import RuntimeEnabledTestCase
+from rapid_response_xblock.caches import get_open_run
+from rapid_response_xblock.models import RapidResponseAnswerCount, RapidResponseRun
+from rapid_response_xblock.runs import close_expired_runs, get_latest_runs, set_runs_open_status
+from rapid_response_xblock.segments import seed_answer_counts, update_answer_counts
+
+
+def count_writes(queries):
+    """Count the INSERT and UPDATE statements among captured queries"""
+    return sum(
+        1 for query in queries.captured_queries
+        if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))
+    )
+
+
+PROBLEM_KEYS = [
+    UsageKey.from_string(
+        f"block-v1:SGAU+SGA101+2017_SGA+type@problem+block@{block_id}"
+    ) for block_id in ("2582bbb68672426297e525b49a383eb8", "problem2", "problem3")
+]
+
+
+class RunsTests(RuntimeEnabledTestCase):
+    """Tests for set_runs_open_status and get_open_run"""
+
+    def test_open_many(self):
+        """Problems without an open run should get a new open run, and open runs should be left alone"""
+        already_open = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[0], course_key=self.course_id, open=True,
+        )
+        closed = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[1], course_key=self.course_id, open=False,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            runs = set_runs_open_status(self.course_id, PROBLEM_KEYS, True)
+        assert count_writes(queries) == 1
+
+        assert set(runs) == set(PROBLEM_KEYS)
+        assert runs[PROBLEM_KEYS[0]].id == already_open.id
+        assert runs[PROBLEM_KEYS[1]].id != closed.id
+        assert all(run.open for run in runs.values())
+        assert RapidResponseRun.objects.count() == 4
+        for problem_usage_key in PROBLEM_KEYS:
+            assert get_open_run(self.course_id, problem_usage_key).id == runs[problem_usage_key].id
+
+    def test_close_many(self):
+        """The latest open run of each problem should be closed with a single update"""
+        for problem_usage_key in PROBLEM_KEYS[:2]:
+            RapidResponseRun.objects.create(
+                problem_usage_key=problem_usage_key, course_key=self.course_id, open=True,
+            )
+        # Populate the cache so we can check that it gets invalidated
+        assert get_open_run(self.course_id, PROBLEM_KEYS[0]) is not None
+
+        with CaptureQueriesContext(connection) as queries:
+            runs = set_runs_open_status(self.course_id, PROBLEM_KEYS, False)
+        assert count_writes(queries) == 1
+
+        assert set(runs) == set(PROBLEM_KEYS[:2])
+        assert not RapidResponseRun.objects.filter(open=True).exists()
+        assert all(run.open is False for run in runs.values())
+        for problem_usage_key in PROBLEM_KEYS:
+            assert get_open_run(self.course_id, problem_usage_key) is None
+
+    def test_latest_run_by_created(self):
+        """The latest run should be the most recently created one, as in every other lookup"""
+        newer = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[0], course_key=self.course_id, open=True,
+        )
+        older = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[0], course_key=self.course_id, open=False,
+        )
+        older.created = newer.created - timedelta(minutes=5)
+        older.save()
+
+        assert get_latest_runs(self.course_id, PROBLEM_KEYS) == {PROBLEM_KEYS[0]: newer}
+        assert get_open_run(self.course_id, PROBLEM_KEYS[0]).id == newer.id
+        # The problem is already open, so no run is created
+        set_runs_open_status(self.course_id, PROBLEM_KEYS[:1], True)
+        assert RapidResponseRun.objects.count() == 2
+
+    def test_cache_published_once(self):
+        """The new open runs should be published to the cache once for the whole batch"""
+        with patch('rapid_response_xblock.runs.publish_open_runs') as publish_mock:
+            runs = set_runs_open_status(self.course_id, PROBLEM_KEYS, True)
+        publish_mock.assert_called_once_with(self.course_id, runs)
+
+    def test_open_runs_published(self):
+        """Once the change is committed, looking up the state of the problems shouldn't need the database"""
+        RapidResponseRun.objects.create(problem_usage_key=PROBLEM_KEYS[2], course_key=self.course_id, open=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            runs = set_runs_open_status(self.course_id, PROBLEM_KEYS[:2], True, close_after_minutes=10)
+            # Nothing is published before the commit
+            with self.assertNumQueries(1):
+                assert get_open_run(self.course_id, PROBLEM_KEYS[0]).id == runs[PROBLEM_KEYS[0]].id
+
+        with self.assertNumQueries(0):
+            for problem_usage_key in PROBLEM_KEYS[:2]:
+                open_run = get_open_run(self.course_id, problem_usage_key)
+                assert open_run.id == runs[problem_usage_key].id
+                assert open_run.close_at == runs[problem_usage_key].close_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_runs_open_status(self.course_id, PROBLEM_KEYS, False)
+        with self.assertNumQueries(0):
+            for problem_usage_key in PROBLEM_KEYS:
+                assert get_open_run(self.course_id, problem_usage_key) is None
+
+    @override_settings(RAPID_RESPONSE_SEGMENT_TYPES=['cohort', 'enrollment_track'])
+    def test_seed_answer_counts(self):
+        """Opening a run should create a zero count for each answer in each segment of the course"""
+        run = RapidResponseRun.objects.create(problem_usage_key=PROBLEM_KEYS[0], course_key=self.course_id, open=True)
+        course_segments = {'cohort': ['', 'Blue'], 'enrollment_track': ['', 'audit', 'verified']}
+        with patch('rapid_response_xblock.segments.get_course_segments', return_value=course_segments):
+            seed_answer_counts(self.course_id, {run.id: ['choice_0', 'choice_1']})
+            # Seeding again leaves the counts alone
+            update_answer_counts(run.id, {'cohort': 'Blue'}, 'choice_1', 1)
+            seed_answer_counts(self.course_id, {run.id: ['choice_0', 'choice_1']})
+
+        counts = {
+            (count.segment_type, count.segment, count.answer_id): count.count
+            for count in RapidResponseAnswerCount.objects.filter(run=run)
+        }
+        assert len(counts) == 10
+        assert counts[('cohort', 'Blue', 'choice_1')] == 1
+        assert sum(counts.values()) == 1
+
+        # The first answers only update their counts
+        with CaptureQueriesContext(connection) as queries:
+            update_answer_counts(run.id, {'enrollment_track': 'verified'}, 'choice_0', 1)
+        assert [query['sql'].lstrip().split()[0].upper() for query in queries.captured_queries] == ['UPDATE']
+
+    def test_get_open_run_cached(self):
+        """get_open_run should only query the database on a cache miss"""
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[0], course_key=self.course_id, open=True,
+        )
+        with self.assertNumQueries(1):
+            assert get_open_run(self.course_id, PROBLEM_KEYS[0]).id == run.id
+            assert get_open_run(self.course_id, PROBLEM_KEYS[0]).id == run.id
+
+        # Saving a run should invalidate the cache
+        run.open = False
+        run.save()
+        assert get_open_run(self.course_id, PROBLEM_KEYS[0]) is None
+
+    def test_close_after(self):
+        """Runs opened with a time limit should stop accepting answers and be closed once it passes"""
+        runs = set_runs_open_status(self.course_id, PROBLEM_KEYS[:2], True, close_after_minutes=10)
+        untimed = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[2], course_key=self.course_id, open=True,
+        )
+        assert all(run.close_at is not None for run in runs.values())
+        assert get_open_run(self.course_id, PROBLEM_KEYS[0]).id == runs[PROBLEM_KEYS[0]].id
+
+        assert close_expired_runs() == 0
+        later = timezone.now() + timedelta(minutes=11)
+        with patch('rapid_response_xblock.caches.timezone.now', return_value=later):
+            # The cached run counts as closed as soon as it expires
+            assert get_open_run(self.course_id, PROBLEM_KEYS[0]) is None
+        assert close_expired_runs(now=later) == 2
+
+        assert list(RapidResponseRun.objects.filter(open=True)) == [untimed]
+        assert get_open_run(self.course_id, PROBLEM_KEYS[1]) is None
+
+    def test_open_expired(self):
+        """Opening a problem whose run is past its closing time should close that run and open a new one"""
+        expired = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[0],
+            course_key=self.course_id,
+            open=True,
+            close_at=timezone.now() - timedelta(minutes=1),
+        )
+        assert expired.is_open is False
+        runs = set_runs_open_status(self.course_id, PROBLEM_KEYS[:1], True)
+        assert runs[PROBLEM_KEYS[0]].id != expired.id
+        assert runs[PROBLEM_KEYS[0]].is_open is True
+        expired.refresh_from_db()
+        assert expired.open is False
+
+    def test_close_expired_command(self):
+        """The management command should close expired runs"""
+        run = RapidResponseRun.objects.create(
+            problem_usage_key=PROBLEM_KEYS[0],
+            course_key=self.course_id,
+            open=True,
+            close_at=timezone.now() - timedelta(minutes=1),
+        )
+        call_command('close_expired_rapid_response_runs')
+        run.refresh_from_db()
+        assert run.open is False
@@ -1,10 +1,16 @@
 """Tests for the util methods"""
+from datetime import timedelta
+
 import pytest
 from opaque_keys.edx.keys import UsageKey
 
 from tests.utils import RuntimeEnabledTestCase
 from rapid_response_xblock.models import RapidResponseRun, RapidResponseSubmission
-from rapid_response_xblock.utils import get_run_data_for_course, get_run_submission_data
+from rapid_response_xblock.utils import (
+    get_run_data_for_course,
+    get_run_index_for_course,
+    get_run_submission_data,
+)
 from common.djangoapps.student.tests.factories import UserFactory
 
 
@@ -53,3 +59,62 @@ class TestUtils(RuntimeEnabledTestCase):
         submissions_data = get_run_submission_data(self.problem_run.id)
 
         assert submissions_data == expected
+
+    def test_get_run_index_for_course(self):
+        """The run index should include aggregated counts and be paginated newest first"""
+        other_problem_key = UsageKey.from_string("i4x://SGAU/SGA101/problem/other")
+        runs = [self.problem_run] + [
+            RapidResponseRun.objects.create(
+                problem_usage_key=other_problem_key if index % 2 else self.problem_run.problem_usage_key,
+                course_key=self.course_id,
+            ) for index in range(4)
+        ]
+        users = [UserFactory() for _ in range(3)]
+        for user, correct in zip(users, [True, False, True]):
+            RapidResponseSubmission.objects.create(run=self.problem_run, user=user, correct=correct, event={})
+
+        pages = []
+        cursor = None
+        with self.assertNumQueries(3):
+            while True:
+                page, cursor = get_run_index_for_course(self.course_id, cursor=cursor, page_size=2)
+                pages.append(page)
+                if cursor is None:
+                    break
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        index = [run for page in pages for run in page]
+        assert [run['id'] for run in index] == [run.id for run in reversed(runs)]
+        assert index[-1] == {
+            'id': self.problem_run.id,
+            'created': self.problem_run.created,
+            'problem_usage_key': self.problem_run.problem_usage_key,
+            'open': True,
+            'num_submissions': 3,
+            'num_users': 3,
+            'num_correct': 2,
+            'percent_correct': 66.7,
+        }
+        assert all(run['percent_correct'] is None for run in index[:-1])
+
+    def test_get_run_index_for_course_filters(self):
+        """The run index should be filterable by problem and by creation time"""
+        other_run = RapidResponseRun.objects.create(
+            problem_usage_key=UsageKey.from_string("i4x://SGAU/SGA101/problem/other"),
+            course_key=self.course_id,
+        )
+        runs, _ = get_run_index_for_course(self.course_id, problem_usage_key=other_run.problem_usage_key)
+        assert [run['id'] for run in runs] == [other_run.id]
+
+        runs, _ = get_run_index_for_course(self.course_id, created_before=other_run.created)
+        assert [run['id'] for run in runs] == [self.problem_run.id]
+
+        runs, _ = get_run_index_for_course(
+            self.course_id, created_after=other_run.created + timedelta(seconds=1),
+        )
+        assert runs == []
+
+    def test_get_run_index_for_course_invalid_cursor(self):
+        """An invalid cursor should raise a ValueError"""
+        with pytest.raises(ValueError):
+            get_run_index_for_course(self.course_id, cursor="not a cursor")
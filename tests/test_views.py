@@ -0,0 +1,343 @@
+"""Tests for the rapid response Studio views"""
+from datetime import datetime
+import json
+from unittest.mock import Mock, patch
+
+from ddt import data, ddt, unpack
+from django.core.cache import cache
+from django.test import RequestFactory
+from opaque_keys.edx.keys import UsageKey
+import pytz
+
+from tests.utils import RuntimeEnabledTestCase
+from rapid_response_xblock.block import BLOCK_PROBLEM_CATEGORY, MULTIPLE_CHOICE_TYPE
+from rapid_response_xblock.exports import serialize_export_job
+from rapid_response_xblock.models import RapidResponseExportJob
+from rapid_response_xblock.problems import get_course_problems
+from rapid_response_xblock.views import (
+    bulk_toggle_rapid_response,
+    course_export_status,
+    course_rapid_response_problems,
+    start_course_export,
+)
+
+
+PROBLEM_KEYS = [
+    "block-v1:SGAU+SGA101+2017_SGA+type@problem+block@2582bbb68672426297e525b49a383eb8",
+    "block-v1:SGAU+SGA101+2017_SGA+type@problem+block@5e7bd4c2a1f34d0f9b7f3b9e3b1a2c4d",
+]
+
+
+@ddt
+class BulkToggleRapidResponseTests(RuntimeEnabledTestCase):
+    """Tests for bulk_toggle_rapid_response"""
+
+    def setUp(self):
+        super().setUp()
+        self.request_factory = RequestFactory()
+        self.asides = {}
+
+    def make_request(self, body):
+        """Make a POST request to the bulk view as a course staff user"""
+        request = self.request_factory.post(
+            "/toggle-rapid-response/bulk/",
+            data=json.dumps(body),
+            content_type="application/json",
+        )
+        request.user = self.instructor
+        return request
+
+    def make_problem(self, usage_key, problem_types=None):
+        """Make a mock problem block and the aside for it"""
+        problem = Mock(
+            category=BLOCK_PROBLEM_CATEGORY,
+            problem_types=problem_types or {MULTIPLE_CHOICE_TYPE},
+            location=UsageKey.from_string(usage_key),
+        )
+        del problem.descriptor
+        self.asides[problem.location] = Mock(enabled=False)
+        return problem
+
+    def get_aside(self, block, aside_type):  # pylint: disable=unused-argument
+        """Stand-in for get_aside_from_xblock"""
+        return self.asides[block.location]
+
+    @data(True, False)
+    def test_bulk_enable(self, enabled):
+        """All requested problems should be updated inside one bulk operation"""
+        problems = {usage_key: self.make_problem(usage_key) for usage_key in PROBLEM_KEYS}
+        for aside in self.asides.values():
+            aside.enabled = not enabled
+
+        with patch('rapid_response_xblock.views.modulestore') as modulestore_mock, patch(
+            'rapid_response_xblock.views.get_aside_from_xblock', side_effect=self.get_aside,
+        ), patch('rapid_response_xblock.views.has_course_author_access', return_value=True):
+            store = modulestore_mock.return_value
+            store.get_item.side_effect = lambda usage_key: problems[str(usage_key)]
+            resp = bulk_toggle_rapid_response(self.make_request({
+                "enabled": enabled,
+                "usage_keys": PROBLEM_KEYS,
+            }))
+
+        assert resp.status_code == 200
+        assert json.loads(resp.content) == {
+            "is_enabled": enabled,
+            "updated": PROBLEM_KEYS,
+            "skipped": [],
+        }
+        assert all(aside.enabled is enabled for aside in self.asides.values())
+        store.bulk_operations.assert_called_once_with(UsageKey.from_string(PROBLEM_KEYS[0]).course_key)
+        assert store.update_item.call_count == len(PROBLEM_KEYS)
+        # Each problem is published on its own, not the unit containing them
+        assert [call.args for call in store.publish.call_args_list] == [
+            (problem.location, self.instructor.id) for problem in problems.values()
+        ]
+
+    def test_bulk_enable_section(self):
+        """Only eligible problems which need a change should be updated"""
+        eligible = self.make_problem(PROBLEM_KEYS[0])
+        already_enabled = self.make_problem(PROBLEM_KEYS[1])
+        self.asides[already_enabled.location].enabled = True
+        section_key = "block-v1:SGAU+SGA101+2017_SGA+type@chapter+block@chapter"
+
+        with patch('rapid_response_xblock.views.modulestore') as modulestore_mock, patch(
+            'rapid_response_xblock.views.get_aside_from_xblock', side_effect=self.get_aside,
+        ), patch('rapid_response_xblock.views.has_course_author_access', return_value=True), patch(
+            'rapid_response_xblock.views.get_eligible_problems', return_value=[eligible, already_enabled],
+        ) as get_eligible_mock:
+            store = modulestore_mock.return_value
+            resp = bulk_toggle_rapid_response(self.make_request({
+                "enabled": True,
+                "section": section_key,
+            }))
+
+        assert resp.status_code == 200
+        assert json.loads(resp.content) == {
+            "is_enabled": True,
+            "updated": [PROBLEM_KEYS[0]],
+            "skipped": [PROBLEM_KEYS[1]],
+        }
+        store.get_item.assert_called_once_with(UsageKey.from_string(section_key))
+        get_eligible_mock.assert_called_once_with(store.get_item.return_value)
+        store.update_item.assert_called_once_with(
+            eligible, self.instructor.id, asides=[self.asides[eligible.location]]
+        )
+        store.publish.assert_called_once_with(eligible.location, self.instructor.id)
+
+    def test_bulk_missing_problem(self):
+        """Problems which don't exist should be skipped"""
+        problem = self.make_problem(PROBLEM_KEYS[0])
+
+        with patch('rapid_response_xblock.views.modulestore') as modulestore_mock, patch(
+            'rapid_response_xblock.views.get_aside_from_xblock', side_effect=self.get_aside,
+        ), patch('rapid_response_xblock.views.has_course_author_access', return_value=True):
+            store = modulestore_mock.return_value
+            store.has_item.side_effect = lambda usage_key: str(usage_key) == PROBLEM_KEYS[0]
+            store.get_item.return_value = problem
+            resp = bulk_toggle_rapid_response(self.make_request({
+                "enabled": True,
+                "usage_keys": PROBLEM_KEYS,
+            }))
+
+        assert resp.status_code == 200
+        assert json.loads(resp.content) == {
+            "is_enabled": True,
+            "updated": [PROBLEM_KEYS[0]],
+            "skipped": [PROBLEM_KEYS[1]],
+        }
+        store.get_item.assert_called_once_with(problem.location)
+        store.publish.assert_called_once_with(problem.location, self.instructor.id)
+
+    @data(*[
+        [{"usage_keys": PROBLEM_KEYS}, 400],
+        [{"enabled": "yes", "usage_keys": PROBLEM_KEYS}, 400],
+        [{"enabled": True, "usage_keys": ["not a key"]}, 400],
+        [{"enabled": True}, 400],
+        [{"enabled": True, "usage_keys": [PROBLEM_KEYS[0], "block-v1:a+b+c+type@problem+block@d"]}, 400],
+    ])
+    @unpack
+    def test_bulk_invalid(self, body, expected_status):
+        """Invalid requests should be rejected without touching the modulestore"""
+        with patch('rapid_response_xblock.views.modulestore') as modulestore_mock:
+            resp = bulk_toggle_rapid_response(self.make_request(body))
+        assert resp.status_code == expected_status
+        modulestore_mock.assert_not_called()
+
+    def test_bulk_authors_only(self):
+        """Only course authors may change problems in bulk"""
+        with patch('rapid_response_xblock.views.modulestore') as modulestore_mock, patch(
+            'rapid_response_xblock.views.has_course_author_access', return_value=False,
+        ):
+            resp = bulk_toggle_rapid_response(self.make_request({"enabled": True, "usage_keys": PROBLEM_KEYS}))
+        assert resp.status_code == 403
+        modulestore_mock.assert_not_called()
+
+
+class CourseProblemsTests(RuntimeEnabledTestCase):
+    """Tests for listing the rapid response problems of a course"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.course_key = UsageKey.from_string(PROBLEM_KEYS[0]).course_key
+        self.problems = [
+            Mock(
+                category=BLOCK_PROBLEM_CATEGORY,
+                problem_types={MULTIPLE_CHOICE_TYPE},
+                location=UsageKey.from_string(usage_key),
+                display_name_with_default=f"Problem {index}",
+            ) for index, usage_key in enumerate(PROBLEM_KEYS)
+        ]
+        self.problems.append(Mock(
+            category=BLOCK_PROBLEM_CATEGORY,
+            problem_types={'choiceresponse'},
+            location=UsageKey.from_string(PROBLEM_KEYS[0]).replace(block_id='checkboxes'),
+        ))
+        for problem in self.problems:
+            del problem.descriptor
+        self.asides = {
+            problem.location: Mock(enabled=index == 0) for index, problem in enumerate(self.problems)
+        }
+
+    def get_course_problems(self, course_version):
+        """Call get_course_problems with a stand-in modulestore for a version of the course"""
+        with patch('rapid_response_xblock.problems.modulestore') as modulestore_mock, patch(
+            'rapid_response_xblock.problems.get_aside_from_xblock',
+            side_effect=lambda block, aside_type: self.asides[block.location],
+        ):
+            store = modulestore_mock.return_value
+            store.get_course.return_value.course_version = course_version
+            store.get_items.return_value = self.problems
+            return get_course_problems(self.course_key), store
+
+    def test_get_course_problems(self):
+        """Eligible problems should be listed from one query inside a bulk operation"""
+        problems, store = self.get_course_problems('version1')
+        assert problems == [
+            {'usage_key': PROBLEM_KEYS[0], 'display_name': 'Problem 0', 'enabled': True},
+            {'usage_key': PROBLEM_KEYS[1], 'display_name': 'Problem 1', 'enabled': False},
+        ]
+        store.bulk_operations.assert_called_once_with(self.course_key)
+        store.get_items.assert_called_once_with(self.course_key, qualifiers={'category': BLOCK_PROBLEM_CATEGORY})
+
+    def test_cached_per_version(self):
+        """The list should only be built again for a new version of the course"""
+        self.get_course_problems('version1')
+        self.asides[self.problems[1].location].enabled = True
+
+        problems, store = self.get_course_problems('version1')
+        store.get_items.assert_not_called()
+        assert problems[1]['enabled'] is False
+
+        problems, store = self.get_course_problems('version2')
+        store.get_items.assert_called_once()
+        assert problems[1]['enabled'] is True
+
+    def test_view(self):
+        """The view should list the problems for course authors only"""
+        request = RequestFactory().get(f"/toggle-rapid-response/problems/{self.course_key}/")
+        request.user = self.instructor
+        problems = [{'usage_key': PROBLEM_KEYS[0], 'display_name': 'Problem 0', 'enabled': True}]
+
+        with patch('rapid_response_xblock.views.get_course_problems', return_value=problems), patch(
+            'rapid_response_xblock.views.has_course_author_access', return_value=True,
+        ):
+            resp = course_rapid_response_problems(request, str(self.course_key))
+        assert resp.status_code == 200
+        assert json.loads(resp.content) == {"course_id": str(self.course_key), "problems": problems}
+
+        with patch('rapid_response_xblock.views.get_course_problems') as get_problems_mock, patch(
+            'rapid_response_xblock.views.has_course_author_access', return_value=False,
+        ):
+            resp = course_rapid_response_problems(request, str(self.course_key))
+        assert resp.status_code == 403
+        get_problems_mock.assert_not_called()
+
+        assert course_rapid_response_problems(request, "not a course").status_code == 400
+
+
+@ddt
+class CourseExportViewsTests(RuntimeEnabledTestCase):
+    """Tests for starting an export and polling its progress"""
+
+    def setUp(self):
+        super().setUp()
+        self.request_factory = RequestFactory()
+        self.course_key = UsageKey.from_string(PROBLEM_KEYS[0]).course_key
+
+    def start_export(self, body, is_author=True):
+        """Call start_course_export as a course staff user"""
+        request = self.request_factory.post(
+            f"/toggle-rapid-response/exports/{self.course_key}/",
+            data=json.dumps(body) if body is not None else "",
+            content_type="application/json",
+        )
+        request.user = self.instructor
+        with patch('rapid_response_xblock.views.has_course_author_access', return_value=is_author), patch(
+            'rapid_response_xblock.tasks.export_course_runs.delay'
+        ) as delay_mock, self.captureOnCommitCallbacks(execute=True):
+            resp = start_course_export(request, str(self.course_key))
+        return resp, delay_mock
+
+    def get_status(self, course_id, job_id, is_author=True):
+        """Call course_export_status as a course staff user"""
+        request = self.request_factory.get(f"/toggle-rapid-response/exports/{course_id}/{job_id}/")
+        request.user = self.instructor
+        with patch('rapid_response_xblock.views.has_course_author_access', return_value=is_author):
+            return course_export_status(request, course_id, job_id)
+
+    def test_start_and_poll(self):
+        """Course authors should be able to start an export in the background and poll its progress"""
+        resp, delay_mock = self.start_export({"runs_created_after": "2024-01-01T00:00:00Z"})
+        assert resp.status_code == 201
+        job = RapidResponseExportJob.objects.get()
+        delay_mock.assert_called_once_with(job.id)
+        assert job.course_key == self.course_key
+        assert job.runs_created_after == datetime(2024, 1, 1, tzinfo=pytz.utc)
+        assert job.runs_created_before is None
+        assert json.loads(resp.content) == serialize_export_job(job)
+
+        job.status = RapidResponseExportJob.STATUS_RUNNING
+        job.total_rows = 10
+        job.processed_rows = 5
+        job.save()
+        resp = self.get_status(str(self.course_key), job.id)
+        assert resp.status_code == 200
+        assert json.loads(resp.content)['progress'] == 0.5
+
+    def test_start_without_body(self):
+        """Every run should be exported if the body is left out"""
+        resp, delay_mock = self.start_export(None)
+        assert resp.status_code == 201
+        delay_mock.assert_called_once()
+        job = RapidResponseExportJob.objects.get()
+        assert job.runs_created_after is None
+        assert job.runs_created_before is None
+
+    @data(
+        {"runs_created_after": "yesterday"},
+        {"runs_created_before": 5},
+        ["not", "a", "dict"],
+    )
+    def test_start_invalid(self, body):
+        """Invalid requests should be rejected without starting an export"""
+        resp, delay_mock = self.start_export(body)
+        assert resp.status_code == 400
+        delay_mock.assert_not_called()
+        assert not RapidResponseExportJob.objects.exists()
+
+    def test_authors_only(self):
+        """Only course authors may start exports or poll them"""
+        resp, delay_mock = self.start_export({}, is_author=False)
+        assert resp.status_code == 403
+        delay_mock.assert_not_called()
+
+        job = RapidResponseExportJob.objects.create(course_key=self.course_key)
+        assert self.get_status(str(self.course_key), job.id, is_author=False).status_code == 403
+
+    def test_status_not_found(self):
+        """Jobs of other courses shouldn't be found"""
+        job = RapidResponseExportJob.objects.create(course_key=self.course_key)
+        assert self.get_status("course-v1:Other+Course+Run", job.id).status_code == 404
+        assert self.get_status(str(self.course_key), job.id + 1).status_code == 404
+        assert self.get_status("not a course", job.id).status_code == 400
@@ -3,6 +3,7 @@ from contextlib import contextmanager
 import os
 import shutil
 import tempfile
+import time
 from unittest.mock import Mock, patch
 
 from django.http.request import HttpRequest
@@ -60,6 +61,28 @@ def combine_dicts(dictionary, extras):
     return ret
 
 
+def measure_rate(func, items, label):
+    """
+    Call func once per item and report how many calls per second were made
+
+    Args:
+        func (callable): The function to benchmark
+        items (iterable): The arguments to pass to func, one call per item
+        label (str): A description of what is being measured
+
+    Returns:
+        float: The number of calls per second
+    """
+    items = list(items)
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    rate = len(items) / elapsed if elapsed else float('inf')
+    print(f"{label}: {len(items)} calls in {elapsed:.3f}s ({rate:,.0f}/s)")
+    return rate
+
+
 class RuntimeEnabledTestCase(ModuleStoreTestCase):
     """
     Test class that sets up a course, instructor, runtime, and other